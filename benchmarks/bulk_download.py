@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Throughput and peak memory of utilis.bulk_download.stream_zip against a local HTTP stand-in for S3.
+
+The stand-in serves deterministic bytes of a requested size for any
+/<bucket>/<name>?size=N path, after a fixed per-request latency. Paths containing
+"missing" return 404. Each run checks that the archive holds every file with the
+right size and reports wall time, MiB/s and the peak traced Python memory.
+
+USAGE (example):
+python benchmarks/bulk_download.py --files 40 --size-mb 8 --latency-ms 50 --workers 1 4 16
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utilis.bulk_download import ERRORS_NAME, DownloadItem, stream_zip
+
+BLOCK = bytes(range(256)) * 256   # 64 KiB
+
+def info(msg: str):
+    print(f"[INFO] {msg}", flush=True)
+
+def make_handler(latency_s: float):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            time.sleep(latency_s)
+            u = urlparse(self.path)
+            if "missing" in u.path:
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            size = int(parse_qs(u.query).get("size", ["0"])[0])
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(size))
+            self.end_headers()
+            left = size
+            while left > 0:
+                n = min(left, len(BLOCK))
+                self.wfile.write(BLOCK[:n])
+                left -= n
+    return Handler
+
+def serve(latency_s: float):
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(latency_s))
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd, f"http://127.0.0.1:{httpd.server_address[1]}"
+
+def parse_args():
+    p = argparse.ArgumentParser(description="stream_zip throughput and memory against a local S3 stand-in.")
+    p.add_argument("--files", type=int, default=40)
+    p.add_argument("--size-mb", type=float, default=8.0)
+    p.add_argument("--latency-ms", type=float, default=50.0)
+    p.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16])
+    p.add_argument("--missing", type=int, default=2, help="Extra items that return 404")
+    p.add_argument("--json-out", default=None)
+    return p.parse_args()
+
+def main():
+    args = parse_args()
+    httpd, base = serve(args.latency_ms / 1000.0)
+    size = int(args.size_mb * 2**20)
+    items = [DownloadItem(f"{base}/sdmlab/site_{i:03d}/fim_{i:03d}.tif?size={size}", f"Tier_1/site_{i:03d}/fim_{i:03d}.tif")
+             for i in range(args.files)]
+    items += [DownloadItem(f"{base}/sdmlab/site_{i:03d}/fim_{i:03d}.json?size=2048", f"Tier_1/site_{i:03d}/fim_{i:03d}.json")
+              for i in range(args.files)]
+    items += [DownloadItem(f"{base}/sdmlab/missing_{i}.tif", f"Tier_1/missing_{i}.tif") for i in range(args.missing)]
+    total_mb = (args.files * size + args.files * 2048) / 2**20
+    info(f"{len(items):,} files ({args.missing} missing), {total_mb:,.0f} MiB, {args.latency_ms:g} ms latency")
+
+    results = []
+    try:
+        for w in args.workers:
+            fd, path = tempfile.mkstemp(suffix=".zip")
+            os.close(fd)
+            try:
+                tracemalloc.start()
+                res = stream_zip(items, path, workers=w)
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+
+                with zipfile.ZipFile(path) as zf:
+                    sizes = {i.filename: i.file_size for i in zf.infolist()}
+                ok = all(sizes.get(it.arcname) == size for it in items[:args.files]) and ERRORS_NAME in sizes
+                row = {
+                    "workers": w, "files": res.files, "failed": len(res.failed), "seconds": round(res.seconds, 2),
+                    "mib_s": round(res.bytes / 2**20 / res.seconds, 1), "peak_mib": round(peak / 2**20, 1),
+                    "archive_ok": ok,
+                }
+                results.append(row)
+                info(f"  workers={w:<3} {row['seconds']:>6} s  {row['mib_s']:>7} MiB/s  peak {row['peak_mib']} MiB  "
+                     f"({row['files']} files, {row['failed']} failed, archive ok: {ok})")
+            finally:
+                os.remove(path)
+    finally:
+        httpd.shutdown()
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump({"results": results}, f, indent=2)
+        info(f"Results written to {args.json_out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark of build_catalog.py against a local S3 stand-in.
+
+The stand-in is a small filesystem-backed S3 endpoint (ListObjectsV2, GetObject,
+HeadObject, PutObject) serving <data-dir>/<bucket>/<key>. Each size gets its own
+bucket, seeded once with synthetic *_metadata.json files (FIM_Geometry polygons,
+HUCs, dates, a share of files that need the lenient JSON parser) and reused on
+later runs.
+
+Every size runs the unmodified pipeline in a fresh interpreter
+(list → fetch → parse → normalize → simplify → write, no upload) with
+FIM_S3_ENDPOINT pointing at the stand-in, and records per-stage timings,
+records/s, S3 request counters and the child's peak RSS.
+
+Compare with a recorded run and fail on regressions:
+python benchmarks/catalog_build.py --sizes 1000 --baseline catalog_build.json --max-regression 0.25
+
+USAGE (example):
+python benchmarks/catalog_build.py --sizes 1000 10000 100000 --json-out catalog_build.json
+"""
+from __future__ import annotations
+import argparse
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+from urllib.parse import parse_qs, quote, unquote, urlparse
+from xml.sax.saxutils import escape
+
+ROOT = Path(__file__).resolve().parents[1]
+
+PREFIX = "FIM_Database/"
+TIERS = ["Tier_1", "Tier_2", "Tier_3", "Tier_4"]
+STATES = ["TX", "NC", "IA", "AL", "LA", "FL", "SC", "GA", "MS", "VA"]
+STAGES = ["list", "fetch", "parse", "normalize", "simplify", "write"]
+LIST_PAGE = 1000
+
+def info(msg: str):
+    print(f"[INFO] {msg}", flush=True)
+
+# SYNTHETIC METADATA
+def synthetic_metadata(i: int, rng: random.Random, vertices: int) -> Tuple[str, bytes]:
+    """(key, body) of one *_metadata.json in the shape build_catalog.py reads."""
+    tier = TIERS[i % len(TIERS)]
+    site = f"site_{i // 8:05d}"
+    name = f"fim_{i:06d}"
+    lon, lat = rng.uniform(-104, -75), rng.uniform(26, 45)
+    radius = rng.uniform(0.005, 0.05)
+    ring = [
+        [round(lon + radius * math.cos(2 * math.pi * k / vertices) * rng.uniform(0.8, 1.2), 6),
+         round(lat + radius * math.sin(2 * math.pi * k / vertices) * rng.uniform(0.8, 1.2), 6)]
+        for k in range(vertices)
+    ]
+    ring.append(ring[0])
+    huc8 = f"{rng.randint(1, 18):02d}{rng.randint(0, 999999):06d}"
+    date = (f"{rng.choice([100, 500])}-year" if tier == "Tier_4"
+            else f"{rng.randint(2010, 2024)}{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}")
+    meta = {
+        "File_Name": f"{name}.tif",
+        "Date of Flood /Synthetic Flooding Event (return period (years))": date,
+        "Location of the centroid of the flood map": [lon, lat],
+        "Extent": {"xmin": lon - radius, "ymin": lat - radius, "xmax": lon + radius, "ymax": lat + radius},
+        "Resolution in meter": rng.choice([1, 3, 10, 30]),
+        "State": rng.choice(STATES),
+        "Description": f"Synthetic flood map {i} for benchmarking",
+        "River Basin Name": f"Basin {i % 97}",
+        "Source": rng.choice(["USGS", "NOAA", "UA"]),
+        "Quality": tier,
+        "References": [f"Reference {i % 13}"],
+        "HUC2": huc8[:2], "HUC4": huc8[:4], "HUC6": huc8[:6], "HUC8": huc8,
+        "FIM_Geometry": {"type": "Polygon", "coordinates": [ring]},
+    }
+    body = json.dumps(meta, indent=1)
+    if i % 50 == 0:   # trailing comma: exercises the lenient parser
+        body = body[:-2] + ",\n}"
+    return f"{PREFIX}{tier}/{site}/{name}_metadata.json", body.encode("utf-8")
+
+def seed(data_dir: Path, bucket: str, n: int, seed_: int, vertices: int) -> float:
+    """Write `n` metadata files under data_dir/bucket unless an identical seed is there. Returns seconds."""
+    root = data_dir / bucket
+    marker = root / ".seeded"
+    spec = {"n": n, "seed": seed_, "vertices": vertices}
+    if marker.exists() and json.loads(marker.read_text()) == spec:
+        return 0.0
+    t0 = time.perf_counter()
+    rng = random.Random(seed_)
+    for i in range(n):
+        key, body = synthetic_metadata(i, rng, vertices)
+        path = root / key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(body)
+    marker.write_text(json.dumps(spec))
+    return time.perf_counter() - t0
+
+# S3 STAND-IN
+class LocalS3:
+    """Filesystem-backed S3 endpoint (path-style requests, no auth checks)."""
+    def __init__(self, data_dir: Path, latency_s: float = 0.0):
+        self.data_dir = data_dir
+        self.latency_s = latency_s
+        self._keys: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def start(self) -> "LocalS3":
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+
+    def keys(self, bucket: str) -> List[str]:
+        with self._lock:
+            if bucket not in self._keys:
+                root = self.data_dir / bucket
+                self._keys[bucket] = sorted(
+                    p.relative_to(root).as_posix() for p in root.rglob("*") if p.is_file() and p.name != ".seeded"
+                )
+            return self._keys[bucket]
+
+    def _handler(self):
+        s3 = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def setup(self):
+                super().setup()
+                # headers and body go out as separate writes; without this Nagle + delayed ACK add ~40 ms each
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def _send(self, status: int, body: bytes = b"", ctype: str = "application/xml", head: bool = False):
+                self.send_response(status)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                if status == 200 and ctype != "application/xml":
+                    self.send_header("ETag", f'"{len(body):x}"')
+                    self.send_header("Last-Modified", formatdate(usegmt=True))
+                self.end_headers()
+                if not head:
+                    self.wfile.write(body)
+
+            def _target(self) -> Tuple[str, str, Dict[str, List[str]]]:
+                u = urlparse(self.path)
+                bucket, _, key = unquote(u.path).lstrip("/").partition("/")
+                return bucket, key, parse_qs(u.query)
+
+            def _not_found(self, head: bool):
+                self._send(404, b"<Error><Code>NoSuchKey</Code></Error>", head=head)
+
+            def do_GET(self, head: bool = False):
+                time.sleep(s3.latency_s)
+                bucket, key, q = self._target()
+                if not key and "list-type" in q:
+                    return self._list(bucket, q)
+                path = s3.data_dir / bucket / key
+                if not key or not path.is_file():
+                    return self._not_found(head)
+                self._send(200, path.read_bytes(), "application/json", head=head)
+
+            def do_HEAD(self):
+                self.do_GET(head=True)
+
+            def do_PUT(self):
+                time.sleep(s3.latency_s)
+                bucket, key, _ = self._target()
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                path = s3.data_dir / bucket / key
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_bytes(body)
+                with s3._lock:
+                    s3._keys.pop(bucket, None)
+                self._send(200)
+
+            def _list(self, bucket: str, q: Dict[str, List[str]]):
+                prefix = q.get("prefix", [""])[0]
+                after = q.get("continuation-token", q.get("start-after", [""]))[0]
+                limit = min(int(q.get("max-keys", [LIST_PAGE])[0]), LIST_PAGE)
+                url_enc = q.get("encoding-type", [""])[0] == "url"
+                keys = [k for k in s3.keys(bucket) if k.startswith(prefix) and k > after]
+                page, truncated = keys[:limit], len(keys) > limit
+                enc = (lambda k: quote(k, safe="/")) if url_enc else escape
+                parts = [
+                    '<?xml version="1.0" encoding="UTF-8"?>',
+                    '<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">',
+                    f"<Name>{escape(bucket)}</Name><Prefix>{enc(prefix)}</Prefix>",
+                    f"<KeyCount>{len(page)}</KeyCount><MaxKeys>{limit}</MaxKeys>",
+                    f"<IsTruncated>{'true' if truncated else 'false'}</IsTruncated>",
+                ]
+                if url_enc:
+                    parts.append("<EncodingType>url</EncodingType>")
+                if truncated:
+                    parts.append(f"<NextContinuationToken>{escape(page[-1])}</NextContinuationToken>")
+                for k in page:
+                    size = (s3.data_dir / bucket / k).stat().st_size
+                    parts.append(f"<Contents><Key>{enc(k)}</Key><LastModified>2025-01-01T00:00:00.000Z</LastModified>"
+                                 f'<ETag>"{size:x}"</ETag><Size>{size}</Size><StorageClass>STANDARD</StorageClass></Contents>')
+                parts.append("</ListBucketResult>")
+                self._send(200, "".join(parts).encode("utf-8"))
+
+        return Handler
+
+# PIPELINE RUN
+def run_build(bucket: str, endpoint: str, workdir: Path, simplify_m: float) -> Dict[str, Any]:
+    """Run build_catalog.py in a fresh interpreter; returns its timings plus wall time and peak RSS."""
+    timings = workdir / f"{bucket}.timings.json"
+    cmd = [
+        sys.executable, str(ROOT / "build_catalog.py"), "--bucket", bucket, "--prefix", PREFIX, "--no-upload",
+        "--simplify-m", str(simplify_m),
+        "--out-core", str(workdir / f"{bucket}.catalog_core.json"),
+        "--out-gpq", str(workdir / f"{bucket}.extents.parquet"),
+        "--timings-out", str(timings),
+    ]
+    env = {
+        **os.environ, "FIM_S3_ENDPOINT": endpoint,
+        # the stand-in ignores signatures, but botocore needs credentials to sign
+        "AWS_ACCESS_KEY_ID": "benchmark", "AWS_SECRET_ACCESS_KEY": "benchmark", "AWS_DEFAULT_REGION": "us-east-1",
+    }
+    env.pop("AWS_PROFILE", None)
+    t0 = time.perf_counter()
+    log = workdir / f"{bucket}.stderr"
+    with open(log, "w") as err:
+        proc = subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=err)
+        # wait4 gives this child's own resource usage (peak RSS)
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+    wall = time.perf_counter() - t0
+    if proc.returncode != 0 or not timings.exists():
+        raise RuntimeError(f"build_catalog.py failed: {log.read_text().strip()[-600:]}")
+    out = json.loads(timings.read_text())
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    out["peak_rss_mb"] = usage.ru_maxrss / (2**20 if sys.platform == "darwin" else 2**10)
+    out["wall_s"] = wall
+    return out
+
+def parse_args():
+    p = argparse.ArgumentParser(description="build_catalog.py stage timings against a local S3 stand-in.")
+    p.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="Metadata files per run")
+    p.add_argument("--vertices", type=int, default=64, help="Vertices per synthetic FIM_Geometry polygon")
+    p.add_argument("--latency-ms", type=float, default=0.0, help="Per-request delay added by the stand-in")
+    p.add_argument("--simplify-m", type=float, default=100.0)
+    p.add_argument("--seed", type=int, default=7)
+    p.add_argument("--data-dir", default=None, help="Where seeded buckets live (reused between runs; default: a temp dir)")
+    p.add_argument("--baseline", default=None, help="JSON from an earlier --json-out to compare against")
+    p.add_argument("--max-regression", type=float, default=None,
+                   help="Exit 1 when a run's total time is slower than the baseline by more than this fraction")
+    p.add_argument("--json-out", default=None)
+    return p.parse_args()
+
+def main():
+    args = parse_args()
+    tmp = tempfile.TemporaryDirectory(prefix="catalog_build_")
+    data_dir = Path(args.data_dir) if args.data_dir else Path(tmp.name) / "s3"
+    workdir = Path(tmp.name)
+
+    s3 = LocalS3(data_dir, args.latency_ms / 1000).start()
+    info(f"S3 stand-in at {s3.url} serving {data_dir}")
+
+    results: Dict[str, Dict[str, Any]] = {}
+    try:
+        for n in args.sizes:
+            bucket = f"bench-{n}"
+            secs = seed(data_dir, bucket, n, args.seed, args.vertices)
+            info(f"{n:,} metadata files in {bucket}" + (f" (seeded in {secs:.1f} s)" if secs else " (reused)"))
+
+            r = run_build(bucket, s3.url, workdir, args.simplify_m)
+            stages = {k: round(r["stages"].get(k, 0.0), 3) for k in STAGES}
+            results[str(n)] = row = {
+                "files": n,
+                "records": r["records"],
+                "errors": r["errors"],
+                "extents": r["extents"],
+                "total_s": round(r["seconds"], 3),
+                "wall_s": round(r["wall_s"], 3),
+                "records_per_s": round(r["records"] / r["seconds"], 1) if r["seconds"] else None,
+                "peak_rss_mb": round(r["peak_rss_mb"], 1),
+                "stages_s": stages,
+                "s3": r["s3"],
+            }
+            info(f"  {n:>7,} files  total {row['total_s']:>8.2f} s  {row['records_per_s']:>8,.1f} rec/s  "
+                 f"peak RSS {row['peak_rss_mb']:>7.1f} MiB  S3 requests {r['s3']['requests']:,}")
+            info("           " + "  ".join(f"{k} {v:.2f}s" for k, v in stages.items()))
+            if r["errors"]:
+                print(f"[WARN]   {r['errors']} metadata file(s) failed to parse", flush=True)
+    finally:
+        s3.stop()
+        tmp.cleanup()
+
+    regressions: List[str] = []
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            base = json.load(f).get("runs", {})
+        for n, row in results.items():
+            old = base.get(n)
+            if not old:
+                continue
+            change = row["total_s"] / old["total_s"] - 1 if old["total_s"] else 0.0
+            info(f"  {int(n):>7,} files  total {old['total_s']:.2f} → {row['total_s']:.2f} s ({change:+.0%})")
+            for k in STAGES:
+                a, b = old["stages_s"].get(k, 0.0), row["stages_s"][k]
+                info(f"           {k:<10} {a:>8.2f} → {b:>8.2f} s")
+            if args.max_regression is not None and change > args.max_regression:
+                regressions.append(f"{n} files total {change:+.0%}")
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "vertices": args.vertices, "latency_ms": args.latency_ms,
+                       "simplify_m": args.simplify_m, "seed": args.seed, "runs": results}, f, indent=2)
+        info(f"Results written to {args.json_out}")
+
+    if regressions:
+        for r in regressions:
+            print(f"[ERROR] Catalog build regression: {r}", flush=True)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
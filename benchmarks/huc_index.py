@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Build time and lookup latency of utilis.huc_index.HucTree on synthetic catalogs.
+
+Each lookup (records under a HUC, node count/extent, HUC8 children of a HUC2)
+is compared with a linear scan of the huc8 column; the best of --reps runs is reported.
+
+USAGE (example):
+python benchmarks/huc_index.py --sizes 10000 100000
+"""
+from __future__ import annotations
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.record_memory import BUCKET, synthetic_core
+from utilis.catalog_index import CatalogIndex
+from utilis.huc_index import HucTree
+from utilis.record_store import RecordStore, column
+
+def info(msg: str):
+    print(f"[INFO] {msg}", flush=True)
+
+def best_ms(fn, reps: int) -> float:
+    best = float("inf")
+    for _ in range(reps):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000.0
+
+def parse_args():
+    p = argparse.ArgumentParser(description="HucTree build time and lookup latency.")
+    p.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    p.add_argument("--reps", type=int, default=20)
+    p.add_argument("--seed", type=int, default=7)
+    p.add_argument("--json-out", default=None)
+    return p.parse_args()
+
+def main():
+    args = parse_args()
+    results = []
+    for n in args.sizes:
+        store = RecordStore(json.loads(synthetic_core(n, args.seed))["records"], BUCKET)
+        idx = CatalogIndex(store)
+        t0 = time.perf_counter()
+        tree = HucTree(store, idx.lat, idx.lon)
+        build_s = time.perf_counter() - t0
+        info(f"{n:,} records: {len(tree):,} HUC nodes built in {build_s:.2f} s")
+
+        huc8 = np.asarray([str(v or "") for v in column(store, "huc8")], dtype=object)
+        def scan(code):
+            rows = np.flatnonzero(np.char.startswith(huc8.astype(str), code))
+            return rows, (idx.lat[rows].min(), idx.lon[rows].min(), idx.lat[rows].max(), idx.lon[rows].max())
+
+        for code in (tree.codes_at(2)[0], tree.codes_at(8)[0]):
+            row = {
+                "records": n, "huc": code, "matches": tree.node(code).count,
+                "node_ms": round(best_ms(lambda: tree.node(code), args.reps), 4),
+                "rows_ms": round(best_ms(lambda: tree.rows(code), args.reps), 3),
+                "scan_ms": round(best_ms(lambda: scan(code), args.reps), 3),
+            }
+            if len(code) == 2:
+                row["huc8_children_ms"] = round(best_ms(lambda: tree.descendants(code, 8), args.reps), 3)
+            results.append(row)
+            info(f"  HUC {code:<8} {row['matches']:>7,} records  node+extent {row['node_ms']} ms, "
+                 f"rows {row['rows_ms']} ms  (scan {row['scan_ms']} ms)"
+                 + (f", HUC8 children {row['huc8_children_ms']} ms" if "huc8_children_ms" in row else ""))
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump({"results": results}, f, indent=2)
+        info(f"Results written to {args.json_out}")
+
+if __name__ == "__main__":
+    main()
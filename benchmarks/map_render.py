@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Compare the two site rendering modes of the Interactive Map:
+
+  - "markers": one folium.CircleMarker (+ tooltip + popup objects) per site
+  - "geojson": one compact FeatureCollection on a single canvas-rendered L.geoJSON layer
+
+For each site count it reports Python build/render time, the standalone HTML size and
+the st_folium payload size. Each page also records its own browser render time
+(script start → two animation frames after the layer is added) in `window.__renderMs`
+and the document title. With --browser and Playwright installed, pages are loaded in
+headless Chromium and that number is collected; otherwise open the written HTML files.
+
+USAGE (example):
+python benchmarks/map_render.py --sites 500 2000 5000 --out-dir bench_out --json-out map_render.json
+"""
+from __future__ import annotations
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import folium
+
+from utilis.map_cache import PAYLOAD_CACHING, map_payload
+from utilis.map_layers import SitePointLayer, site_marker
+
+TIERS = ["Tier_1", "Tier_2", "Tier_3", "Tier_4"]
+
+_T0_JS = "<script>window.__t0 = performance.now();</script>"
+_DONE_JS = """<script>
+requestAnimationFrame(function(){ requestAnimationFrame(function(){
+  window.__renderMs = performance.now() - window.__t0;
+  document.title = "render " + window.__renderMs.toFixed(1) + " ms";
+}); });
+</script>"""
+
+def info(msg: str):
+    print(f"[INFO] {msg}", flush=True)
+
+def synthetic_sites(n: int, seed: int) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    out = []
+    for i in range(n):
+        tier = rng.choice(TIERS)
+        out.append({
+            "id": f"{tier}/site_{i:06d}/fim_{i:06d}",
+            "tier": tier,
+            "site": f"site_{i:06d}",
+            "centroid_lat": rng.uniform(25.0, 49.0),
+            "centroid_lon": rng.uniform(-124.0, -67.0),
+        })
+    return out
+
+def build_map(sites: List[Dict[str, Any]], mode: str) -> folium.Map:
+    m = folium.Map(location=[39.8283, -98.5795], zoom_start=5, tiles=None, prefer_canvas=True)
+    fg = folium.FeatureGroup(name="Benchmark FIM Sites", show=True)
+    if mode == "geojson":
+        fg.add_child(SitePointLayer(sites, TIERS))
+    else:
+        for r in sites:
+            site_marker(r).add_to(fg)
+    fg.add_to(m)
+    return m
+
+def standalone_html(m: folium.Map) -> str:
+    html = m.get_root().render()
+    html = html.replace("<head>", "<head>" + _T0_JS, 1)
+    i = html.rfind("</html>")
+    return html[:i] + _DONE_JS + html[i:]
+
+def payload_bytes(sites: List[Dict[str, Any]], mode: str) -> int:
+    m = folium.Map(location=[39.8283, -98.5795], zoom_start=5, tiles=None, prefer_canvas=True)
+    fg = folium.FeatureGroup(name="Benchmark FIM Sites", show=True)
+    if mode == "geojson":
+        fg.add_child(SitePointLayer(sites, TIERS))
+    else:
+        for r in sites:
+            site_marker(r).add_to(fg)
+    if not PAYLOAD_CACHING:
+        return 0   # streamlit-folium is not the pinned release: no cached payload to measure
+    p = map_payload(m, [fg])
+    return sum(len(p[k].encode("utf-8")) for k in ("script", "header", "html", "feature_group") if p[k])
+
+def browser_times(paths: List[Path], runs: int) -> Optional[Dict[str, float]]:
+    try:
+        from playwright.sync_api import sync_playwright
+    except ImportError:
+        return None
+    out: Dict[str, float] = {}
+    with sync_playwright() as pw:
+        try:
+            browser = pw.chromium.launch()
+        except Exception as e:
+            info(f"Chromium unavailable ({str(e).splitlines()[0]}); run `playwright install chromium`.")
+            return None
+        for path in paths:
+            samples = []
+            for _ in range(runs):
+                page = browser.new_page(viewport={"width": 1280, "height": 720})
+                page.goto(path.resolve().as_uri())
+                page.wait_for_function("window.__renderMs !== undefined", timeout=120000)
+                samples.append(page.evaluate("window.__renderMs"))
+                page.close()
+            samples.sort()
+            out[path.name] = round(samples[len(samples) // 2], 1)
+        browser.close()
+    return out
+
+def parse_args():
+    p = argparse.ArgumentParser(description="HTML size and render time: per-marker vs single GeoJSON layer.")
+    p.add_argument("--sites", type=int, nargs="+", default=[500, 2000, 5000])
+    p.add_argument("--out-dir", type=Path, default=Path("bench_out"))
+    p.add_argument("--browser", action="store_true", help="Measure render time in headless Chromium (Playwright)")
+    p.add_argument("--runs", type=int, default=3, help="Browser runs per page (median reported)")
+    p.add_argument("--seed", type=int, default=7)
+    p.add_argument("--json-out", default=None)
+    return p.parse_args()
+
+def main():
+    args = parse_args()
+    args.out_dir.mkdir(parents=True, exist_ok=True)
+    results = []
+    pages: List[Path] = []
+
+    for n in args.sites:
+        sites = synthetic_sites(n, args.seed)
+        for mode in ("markers", "geojson"):
+            t0 = time.perf_counter()
+            m = build_map(sites, mode)
+            html = standalone_html(m)
+            build_ms = (time.perf_counter() - t0) * 1000.0
+
+            path = args.out_dir / f"map_{mode}_{n}.html"
+            path.write_text(html, encoding="utf-8")
+            pages.append(path)
+            row = {
+                "sites": n,
+                "mode": mode,
+                "python_build_ms": round(build_ms, 1),
+                "html_bytes": len(html.encode("utf-8")),
+                "st_folium_payload_bytes": payload_bytes(sites, mode),
+                "page": str(path),
+            }
+            results.append(row)
+            info(f"{n:>6} sites {mode:<8} build {row['python_build_ms']:>8} ms  "
+                 f"html {row['html_bytes'] / 1024:>9.1f} KiB  payload {row['st_folium_payload_bytes'] / 1024:>9.1f} KiB")
+
+    if args.browser:
+        times = browser_times(pages, args.runs)
+        if times is None:
+            info("No browser timings; open the HTML files and read the page title for render time.")
+        else:
+            for row in results:
+                row["browser_render_ms"] = times.get(Path(row["page"]).name)
+                info(f"{row['sites']:>6} sites {row['mode']:<8} browser render {row['browser_render_ms']} ms")
+    else:
+        info(f"Open the pages in {args.out_dir}/ — the title shows the browser render time.")
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump({"results": results}, f, indent=2)
+        info(f"Results written to {args.json_out}")
+
+if __name__ == "__main__":
+    main()
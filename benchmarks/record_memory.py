@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Memory held by the catalog records: parsed JSON dicts vs utilis.record_store.RecordStore.
+
+Synthetic records follow the catalog_core.json schema written by fim_viz/build_catalog.py
+(ids, tier/site, dates, HUCs, S3 keys and URLs, description, references, raw date text).
+Retained memory is measured with tracemalloc after parsing the JSON body, so both sides
+include every object they keep alive.
+
+USAGE (example):
+python benchmarks/record_memory.py --sizes 10000 100000 --json-out record_memory.json
+"""
+from __future__ import annotations
+import argparse
+import gc
+import json
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utilis.record_store import RecordStore, column, s3_http_url
+
+BUCKET = "sdmlab"
+TIERS = ["Tier_1", "Tier_2", "Tier_3", "Tier_4"]
+STATES = ["TX", "NC", "IA", "AL", "LA", "FL", "SC", "GA", "MS", "VA"]
+SOURCES = ["USGS", "University of Alabama", "NOAA OWP", "Planet Labs", "Copernicus"]
+BASINS = ["Neuse River", "Mobile River", "Cedar River", "Brazos River", "Pearl River", "Savannah River"]
+
+def info(msg: str):
+    print(f"[INFO] {msg}", flush=True)
+
+def synthetic_core(n: int, seed: int) -> bytes:
+    rng = random.Random(seed)
+    recs: List[Dict[str, Any]] = []
+    for i in range(n):
+        tier = rng.choice(TIERS)
+        site = f"site_{i % max(1, n // 6):05d}"
+        folder = f"FIM_Database/{tier}/{site}"
+        file_name = f"{site}_fim_{i:06d}.tif"
+        key = f"{folder}/{site}_fim_{i:06d}_metadata.json"
+        ymd = f"20{rng.randint(10, 24):02d}{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}"
+        synthetic = tier == "Tier_4"
+        rid = f"{tier}/{site}/{site}_fim_{i:06d}"
+        huc8 = f"0{rng.randint(1, 9)}{rng.randint(0, 999999):06d}"
+        recs.append({
+            "id": rid, "feature_id": rid, "site_id": site, "tier": tier, "site": site,
+            "event_date": None if synthetic else f"{ymd[:4]}-{ymd[4:6]}-{ymd[6:]}",
+            "event_ts": None if synthetic else int(ymd),
+            "date_raw": f"{rng.choice([100, 500])} year return period" if synthetic
+                        else f"Flood event observed on {ymd} (peak stage)",
+            "return_period": rng.choice([100, 500]) if synthetic else None,
+            "metadata_url": s3_http_url(BUCKET, key), "s3_prefix": folder,
+            "tif_url": s3_http_url(BUCKET, f"{folder}/{file_name}"), "geom_version": 1,
+            "resolution_m": rng.choice([1, 3, 10, 30]), "state": rng.choice(STATES),
+            "basin": rng.choice(BASINS), "source": rng.choice(SOURCES), "access_rights": "Public",
+            "quality": tier, "huc2": huc8[:2], "huc4": huc8[:4], "huc6": huc8[:6], "huc8": huc8,
+            "centroid": [rng.uniform(-124, -67), rng.uniform(25, 49)],
+            "file_name": file_name,
+            "references": [
+                f"Reference {j}: benchmark flood inundation map study, doi:10.0000/fim.{i}.{j}"
+                for j in range(rng.randint(1, 3))
+            ],
+            "description": "Benchmark flood inundation extent derived from "
+                           + rng.choice(["aerial imagery", "satellite SAR", "HEC-RAS 1D model output"])
+                           + " for the " + rng.choice(BASINS) + " basin. " * rng.randint(1, 4),
+            "s3_key": key,
+        })
+    return json.dumps({"records": recs}).encode("utf-8")
+
+def retained(build) -> tuple:
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    t0 = time.perf_counter()
+    obj = build()
+    elapsed = time.perf_counter() - t0
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    return obj, size, elapsed
+
+def access_us(records, n_samples: int = 20000) -> float:
+    rng = random.Random(1)
+    rows = [rng.randrange(len(records)) for _ in range(n_samples)]
+    t0 = time.perf_counter()
+    for i in rows:
+        r = records[i]
+        r.get("tier"); r.get("site"); r.get("tif_url"); r.get("centroid_lat")
+    return (time.perf_counter() - t0) / n_samples * 1e6
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Catalog record memory: dicts vs RecordStore.")
+    p.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    p.add_argument("--seed", type=int, default=7)
+    p.add_argument("--json-out", default=None)
+    return p.parse_args()
+
+def main():
+    args = parse_args()
+    results = []
+    for n in args.sizes:
+        body = synthetic_core(n, args.seed)
+        info(f"{n:,} records, {len(body) / 1e6:.1f} MB JSON")
+
+        dicts, dict_bytes, dict_s = retained(lambda: json.loads(body)["records"])
+        dict_access = access_us(dicts)
+        del dicts
+
+        store, store_bytes, store_s = retained(lambda: RecordStore(json.loads(body)["records"], BUCKET))
+        store_access = access_us(store)
+        t0 = time.perf_counter()
+        column(store, "tier")
+        column_ms = (time.perf_counter() - t0) * 1000.0
+        del store
+
+        row = {
+            "records": n,
+            "json_mb": round(len(body) / 1e6, 2),
+            "dicts_mb": round(dict_bytes / 1e6, 2),
+            "store_mb": round(store_bytes / 1e6, 2),
+            "dicts_bytes_per_record": round(dict_bytes / n),
+            "store_bytes_per_record": round(store_bytes / n),
+            "reduction": round(dict_bytes / max(store_bytes, 1), 2),
+            "dicts_load_s": round(dict_s, 2),
+            "store_load_s": round(store_s, 2),
+            "dicts_get_us": round(dict_access, 2),
+            "store_get_us": round(store_access, 2),
+            "store_column_ms": round(column_ms, 1),
+        }
+        results.append(row)
+        info(f"  dicts {row['dicts_mb']:>8} MB ({row['dicts_bytes_per_record']} B/rec, load {row['dicts_load_s']} s)")
+        info(f"  store {row['store_mb']:>8} MB ({row['store_bytes_per_record']} B/rec, load {row['store_load_s']} s)"
+             f"  → {row['reduction']}x smaller")
+        info(f"  4 field reads: dicts {row['dicts_get_us']} µs, store {row['store_get_us']} µs; "
+             f"tier column {row['store_column_ms']} ms")
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump({"results": results}, f, indent=2)
+        info(f"Results written to {args.json_out}")
+
+if __name__ == "__main__":
+    main()
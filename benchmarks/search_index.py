@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Build time and query latency of utilis.search_index.SearchIndex on synthetic catalogs.
+
+Queries run uncached (the per-query cache is cleared before each repetition);
+the best of --reps runs is reported.
+
+USAGE (example):
+python benchmarks/search_index.py --sizes 10000 100000
+"""
+from __future__ import annotations
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.record_memory import BUCKET, synthetic_core
+from utilis.record_store import RecordStore
+from utilis.search_index import SearchIndex
+
+QUERIES = [
+    ("text", dict(text="satellite")),
+    ("text, 2 tokens", dict(text="hec ras")),
+    ("text prefix", dict(text="site_000")),
+    ("facets", dict(facets={"state": ["TX", "NC"]})),
+    ("HUC prefix", dict(huc_prefix="03")),
+    ("combined", dict(text="aerial", facets={"state": ["TX"], "basin": ["Neuse River"]}, huc_prefix="0")),
+]
+
+def info(msg: str):
+    print(f"[INFO] {msg}", flush=True)
+
+def parse_args():
+    p = argparse.ArgumentParser(description="SearchIndex build time and query latency.")
+    p.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    p.add_argument("--reps", type=int, default=50)
+    p.add_argument("--seed", type=int, default=7)
+    p.add_argument("--json-out", default=None)
+    return p.parse_args()
+
+def main():
+    args = parse_args()
+    results = []
+    for n in args.sizes:
+        store = RecordStore(json.loads(synthetic_core(n, args.seed))["records"], BUCKET)
+        t0 = time.perf_counter()
+        idx = SearchIndex(store)
+        build_s = time.perf_counter() - t0
+        info(f"{n:,} records: index built in {build_s:.2f} s ({len(idx.text.vocab):,} text terms)")
+
+        for name, kw in QUERIES:
+            q = SearchIndex.query_key(**kw)
+            best = float("inf")
+            for _ in range(args.reps):
+                idx._cache.clear()
+                t0 = time.perf_counter()
+                m = idx.mask(q)
+                best = min(best, time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            idx.facet_counts("state", m.nonzero()[0])
+            counts_ms = (time.perf_counter() - t0) * 1000.0
+            row = {"records": n, "query": name, "matches": int(m.sum()),
+                   "query_ms": round(best * 1000.0, 3), "facet_counts_ms": round(counts_ms, 3)}
+            results.append(row)
+            info(f"  {name:<16} {row['matches']:>7,} hits  {row['query_ms']:>7} ms  (+ state counts {row['facet_counts_ms']} ms)")
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump({"results": results}, f, indent=2)
+        info(f"Results written to {args.json_out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Cold-start cost of each Streamlit page: import time and time to first render.
+
+Every measurement runs in a fresh interpreter, like a new container:
+  - import: the page's module-level import statements only, plus the heavy
+    third-party packages they left loaded
+  - first render: AppTest.from_file(page).run(), from an empty interpreter to
+    the end of the first script run (streamlit import included)
+
+The Interactive Map reads a synthetic catalog from a local HTTP server
+(FIM_CATALOG_URL), so the numbers do not depend on the network.
+
+Compare with a recorded baseline and fail on regressions:
+python benchmarks/startup.py --baseline benchmarks/startup_baseline.json --max-regression 0.25
+
+USAGE (example):
+python benchmarks/startup.py --runs 5 --records 20000 --json-out startup.json
+"""
+from __future__ import annotations
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.record_memory import synthetic_core
+
+PAGES = ["Home.py", "pages/1_Interactive Map.py", "pages/2_Documentation.py"]
+
+# packages whose import alone costs 100 ms or more on a cold interpreter
+HEAVY = ["pandas", "geopandas", "shapely", "pyproj", "boto3", "botocore", "folium", "streamlit_folium", "pyarrow"]
+
+IMPORT_PROBE = """
+import ast, json, sys, time
+src = open({path!r}, encoding="utf-8").read()
+tree = ast.parse(src)
+body = [n for n in tree.body if isinstance(n, (ast.Import, ast.ImportFrom)) and getattr(n, "module", "") != "__future__"]
+code = compile(ast.Module(body=body, type_ignores=[]), {path!r}, "exec")
+before = set(sys.modules)
+t0 = time.perf_counter()
+exec(code, {{"__name__": "__page__"}})
+dt = time.perf_counter() - t0
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(json.dumps({{"seconds": dt, "modules": len(set(sys.modules) - before), "heavy": heavy}}))
+"""
+
+RENDER_PROBE = """
+import json, time
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({path!r}, default_timeout=600)
+at.run()
+dt = time.perf_counter() - t0
+print(json.dumps({{"seconds": dt, "exception": [str(e.value) for e in at.exception]}}))
+"""
+
+def info(msg: str):
+    print(f"[INFO] {msg}", flush=True)
+
+def serve_catalog(body: bytes):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", '"startup-bench"')
+            self.end_headers()
+            self.wfile.write(body)
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd, f"http://127.0.0.1:{httpd.server_address[1]}/catalog_core.json"
+
+def probe(code: str, env: Dict[str, str]) -> Dict[str, Any]:
+    r = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True)
+    lines = r.stdout.strip().splitlines()
+    if r.returncode != 0 or not lines:
+        raise RuntimeError(f"probe failed ({r.returncode}): {r.stderr.strip()[-400:]}")
+    return json.loads(lines[-1])
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Import time and time-to-first-render of each page.")
+    p.add_argument("--pages", nargs="+", default=PAGES)
+    p.add_argument("--runs", type=int, default=3, help="Fresh interpreters per measurement (median reported)")
+    p.add_argument("--records", type=int, default=20000, help="Synthetic catalog size for the Interactive Map")
+    p.add_argument("--seed", type=int, default=7)
+    p.add_argument("--baseline", default=None, help="JSON from an earlier --json-out to compare against")
+    p.add_argument("--max-regression", type=float, default=None,
+                   help="Exit 1 when a median is slower than the baseline by more than this fraction (e.g. 0.25)")
+    p.add_argument("--json-out", default=None)
+    return p.parse_args()
+
+def main():
+    args = parse_args()
+    httpd, url = serve_catalog(synthetic_core(args.records, args.seed))
+    env = {**os.environ, "FIM_CATALOG_URL": url, "PYTHONPATH": str(ROOT)}
+    info(f"{args.records:,} synthetic records at {url}, {args.runs} run(s) per measurement")
+
+    results: Dict[str, Dict[str, Any]] = {}
+    try:
+        for page in args.pages:
+            path = str(ROOT / page)
+            imports = [probe(IMPORT_PROBE.format(path=path, heavy=HEAVY), env) for _ in range(args.runs)]
+            renders = [probe(RENDER_PROBE.format(path=path), env) for _ in range(args.runs)]
+            errors = sorted({e for r in renders for e in r["exception"]})
+            results[page] = {
+                "import_s": round(statistics.median(r["seconds"] for r in imports), 3),
+                "modules": imports[0]["modules"],
+                "heavy": imports[0]["heavy"],
+                "first_render_s": round(statistics.median(r["seconds"] for r in renders), 3),
+                "errors": errors,
+            }
+            row = results[page]
+            info(f"  {page:<28} import {row['import_s']:>6.3f} s ({row['modules']} modules)  "
+                 f"first render {row['first_render_s']:>6.3f} s  heavy: {', '.join(row['heavy']) or '-'}")
+            for e in errors:
+                print(f"[WARN]   {page}: {e}", flush=True)
+    finally:
+        httpd.shutdown()
+
+    regressions: List[str] = []
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            base = json.load(f).get("pages", {})
+        for page, row in results.items():
+            old = base.get(page)
+            if not old:
+                continue
+            for metric in ("import_s", "first_render_s"):
+                change = row[metric] / old[metric] - 1 if old[metric] else 0.0
+                info(f"  {page:<28} {metric:<15} {old[metric]:>6.3f} → {row[metric]:>6.3f} s ({change:+.0%})")
+                if args.max_regression is not None and change > args.max_regression:
+                    regressions.append(f"{page} {metric} {change:+.0%}")
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "records": args.records, "runs": args.runs,
+                       "pages": results}, f, indent=2)
+        info(f"Results written to {args.json_out}")
+
+    if regressions:
+        for r in regressions:
+            print(f"[ERROR] Startup regression: {r}", flush=True)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,9 @@
 from __future__ import annotations
-import os, sys, json, re, argparse, datetime as dt
+import os, sys, json, re, argparse, time, datetime as dt
+from collections import defaultdict
+from contextlib import contextmanager
 from typing import Any, Dict, List, Tuple, Optional
 
-import boto3
 from botocore.exceptions import ClientError
 
 import pandas as pd
@@ -13,6 +14,8 @@ from shapely.errors import GEOSException
 from pyproj import Transformer
 import codecs
 
+from utilis.s3_client import get_client, stats as s3_stats
+
 # Config defaults
 DEFAULT_BUCKET = "sdmlab"
 DEFAULT_PREFIX = "FIM_Database/"
@@ -211,6 +214,19 @@ def normalize_record(bucket: str, meta_key: str, meta: Dict[str, Any]) -> Tuple[
     geom = meta.get("FIM_Geometry")
     return core, geom
 
+# Wall time per pipeline stage (list, fetch, parse, normalize, simplify, write)
+class StageTimer:
+    def __init__(self):
+        self.seconds: Dict[str, float] = defaultdict(float)
+
+    @contextmanager
+    def stage(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] += time.perf_counter() - t0
+
 # MAIN 
 def main():
     ap = argparse.ArgumentParser(description="Build catalog_core.json + extents.parquet (robust)")
@@ -224,12 +240,15 @@ def main():
     ap.add_argument("--no-upload", action="store_true")
     ap.add_argument("--out-core", default="catalog_core.json")
     ap.add_argument("--out-gpq", default="extents.parquet")
+    ap.add_argument("--timings-out", default=None, help="Write per-stage timings and S3 counters as JSON")
     args = ap.parse_args()
+    timer = StageTimer()
+    t_start = time.perf_counter()
 
-    session = boto3.session.Session(profile_name=args.profile) if args.profile else boto3.session.Session()
-    s3 = session.client("s3")
+    s3 = get_client(profile=args.profile)
 
-    meta_keys = list_meta_keys(s3, args.bucket, args.prefix)
+    with timer.stage("list"):
+        meta_keys = list_meta_keys(s3, args.bucket, args.prefix)
     print(f"[list] found {len(meta_keys)} metadata files under s3://{args.bucket}/{args.prefix}")
 
     core_rows: List[Dict[str, Any]] = []
@@ -241,10 +260,13 @@ def main():
         if (i % 50 == 0) or (i == len(meta_keys)):
             print(f"[read] {i}/{len(meta_keys)}: {key}")
         try:
-            raw = s3.get_object(Bucket=args.bucket, Key=key)["Body"].read().decode("utf-8", errors="replace")
-            meta = load_with_context(raw, f"s3://{args.bucket}/{key}")
+            with timer.stage("fetch"):
+                raw = s3.get_object(Bucket=args.bucket, Key=key)["Body"].read().decode("utf-8", errors="replace")
+            with timer.stage("parse"):
+                meta = load_with_context(raw, f"s3://{args.bucket}/{key}")
 
-            core, geom = normalize_record(args.bucket, key, meta)
+            with timer.stage("normalize"):
+                core, geom = normalize_record(args.bucket, key, meta)
 
             # Ensure unique id
             rid = core["id"]
@@ -257,7 +279,8 @@ def main():
             core_rows.append(core)
 
             if not args.skip_geometry and geom:
-                simp = simplify_geojson_lonlat(geom, args.simplify_m)
+                with timer.stage("simplify"):
+                    simp = simplify_geojson_lonlat(geom, args.simplify_m)
                 if simp:
                     ext_rows.append({"id": core["id"], "tier": core["tier"], "site": core["site"], "geometry": simp})
         except Exception as e:
@@ -270,20 +293,21 @@ def main():
         "records": core_rows,
         "errors": errors,
     }
-    with open(args.out_core, "w", encoding="utf-8") as f:
+    with timer.stage("write"), open(args.out_core, "w", encoding="utf-8") as f:
         json.dump(catalog_core, f, ensure_ascii=False, indent=2)
     print(f"[write] {args.out_core} ({len(core_rows)} records, {len(errors)} error(s))")
 
     # GeoParquet
     if not args.skip_geometry and ext_rows:
-        gdf = gpd.GeoDataFrame(
-            pd.DataFrame([{"id": r["id"], "tier": r["tier"], "site": r["site"]} for r in ext_rows]),
-            geometry=[shape(r["geometry"]) for r in ext_rows],
-            crs="EPSG:4326",
-        )
-        
-        gdf = gdf[~gdf.geometry.is_empty & gdf.geometry.notnull()]
-        gdf.to_parquet(args.out_gpq, index=False)
+        with timer.stage("write"):
+            gdf = gpd.GeoDataFrame(
+                pd.DataFrame([{"id": r["id"], "tier": r["tier"], "site": r["site"]} for r in ext_rows]),
+                geometry=[shape(r["geometry"]) for r in ext_rows],
+                crs="EPSG:4326",
+            )
+
+            gdf = gdf[~gdf.geometry.is_empty & gdf.geometry.notnull()]
+            gdf.to_parquet(args.out_gpq, index=False)
         print(f"[write] {args.out_gpq} ({len(gdf)} features)")
     elif args.skip_geometry:
         print("[info] --skip-geometry set; no GeoParquet will be written")
@@ -312,6 +336,18 @@ def main():
 
         print("[done] Upload finished")
 
+    s = s3_stats()
+    print(f"[s3] {s['requests']} requests, {s['retries']} retries, {s['throttles']} throttled, "
+          f"{s['bytes_in']} bytes in, {s['bytes_out']} bytes out")
+
+    if args.timings_out:
+        with open(args.timings_out, "w", encoding="utf-8") as f:
+            json.dump({
+                "records": len(core_rows), "errors": len(errors), "extents": len(ext_rows),
+                "seconds": time.perf_counter() - t_start, "stages": dict(timer.seconds), "s3": s,
+            }, f, indent=2)
+        print(f"[write] {args.timings_out}")
+
 if __name__ == "__main__":
     try:
         main()
@@ -2,7 +2,6 @@ from __future__ import annotations
 import os, sys, json, re, argparse, datetime as dt
 from typing import Any, Dict, List, Tuple, Optional
 
-import boto3
 from botocore.exceptions import ClientError
 
 import pandas as pd
@@ -13,6 +12,9 @@ from shapely.errors import GEOSException
 from pyproj import Transformer
 import codecs
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utilis.s3_client import get_client, stats as s3_stats
+
 # Config defaults
 DEFAULT_BUCKET = "sdmlab"
 DEFAULT_PREFIX = "FIM_Database/"
@@ -235,8 +237,7 @@ def main():
     ap.add_argument("--out-geojson", default="FIM_extents.geojson")
     args = ap.parse_args()
 
-    session = boto3.session.Session(profile_name=args.profile) if args.profile else boto3.session.Session()
-    s3 = session.client("s3")
+    s3 = get_client(profile=args.profile)
 
     meta_keys = list_meta_keys(s3, args.bucket, args.prefix)
     print(f"[list] found {len(meta_keys)} metadata files under s3://{args.bucket}/{args.prefix}")
@@ -340,6 +341,10 @@ def main():
     else:
         print("[warn] no geometries found; FIM_extents.geojson will not be written")
 
+    s = s3_stats()
+    print(f"[s3] {s['requests']} requests, {s['retries']} retries, {s['throttles']} throttled, "
+          f"{s['bytes_in']} bytes in, {s['bytes_out']} bytes out")
+
 if __name__ == "__main__":
     try:
         main()
@@ -0,0 +1,283 @@
+"""
+Convert the benchmark FIM rasters referenced by catalog_core.json to Cloud-Optimized GeoTIFFs.
+
+- Source raster of a record: <s3_prefix>/<file_name>
+- COG written next to it: <s3_prefix>/cog/<file_name> (S3, or under --out-root)
+- GDAL COG driver (through rasterio): 512 px internal tiles, DEFLATE/ZSTD with
+  predictor, overviews down to a single tile, nearest resampling (FIM rasters are
+  categorical)
+- Conversions run in a process pool; a source whose checksum (S3 ETag + size, or
+  sha256 with --src-root) matches cog_manifest.json and whose COG still exists is skipped
+- Every record gets cog_status / cog_url / cog_overviews / cog_checksum, and the
+  catalog is written back (run this after build_catalog.py)
+
+USAGE (example):
+python cog_convert.py \
+  --catalog catalog_core.json \
+  --bucket sdmlab \
+  --workers 8
+
+Offline (local mirror of the bucket keys, COGs written to a directory):
+python cog_convert.py --catalog catalog_core.json --src-root mirror/ --out-root cogs/
+
+Requirements:
+  - Python: rasterio built against GDAL >= 3.1 (COG driver), boto3
+    (pip install -r requirements-raster.txt; rasterio is not needed by the app)
+Test: python -m pytest -q tests/test_cog_convert.py
+"""
+from __future__ import annotations
+import argparse
+import datetime as dt
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from utilis.s3_client import get_client
+
+DEFAULT_BUCKET   = "sdmlab"
+DEFAULT_PREFIX   = "FIM_Database/"
+COG_DIR          = "cog"
+MANIFEST_VERSION = 1
+COG_CONTENT_TYPE = "image/tiff; application=geotiff; profile=cloud-optimized"
+
+# GDAL COG driver creation options
+COG_OPTIONS = {
+    "BLOCKSIZE": "512",
+    "COMPRESS": "DEFLATE",
+    "PREDICTOR": "YES",
+    "OVERVIEWS": "AUTO",
+    "RESAMPLING": "NEAREST",
+    "BIGTIFF": "IF_SAFER",
+    "NUM_THREADS": "1",          # parallelism comes from the process pool
+}
+
+def info(msg: str):
+    print(f"[INFO] {msg}", flush=True)
+
+def warn(msg: str):
+    print(f"[WARN] {msg}", flush=True)
+
+def err(msg: str):
+    print(f"[ERROR] {msg}", file=sys.stderr, flush=True)
+
+def s3_http_url(bucket: str, key: str) -> str:
+    return f"https://{bucket}.s3.amazonaws.com/{key}"
+
+def cog_key_for(src_key: str) -> str:
+    folder, _, name = src_key.rpartition("/")
+    return f"{folder}/{COG_DIR}/{name}" if folder else f"{COG_DIR}/{name}"
+
+def source_key(rec: Dict[str, Any]) -> Optional[str]:
+    folder, name = rec.get("s3_prefix"), rec.get("file_name")
+    if not folder or not name or not str(name).lower().endswith((".tif", ".tiff")):
+        return None
+    return f"{str(folder).rstrip('/')}/{name}"
+
+def sha256_file(path: str, chunk: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk), b""):
+            h.update(block)
+    return "sha256:" + h.hexdigest()
+
+# WORKER (runs in the process pool)
+_S3 = None
+
+def _init_worker(profile: Optional[str]):
+    global _S3
+    _S3 = get_client(profile=profile)
+
+def convert_one(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Fetch one source raster, write it as a COG, read back its overviews and publish it."""
+    import rasterio
+    import rasterio.shutil
+
+    t0 = time.perf_counter()
+    out = {"key": job["key"], "checksum": job["checksum"], "cog_key": job["cog_key"]}
+    with tempfile.TemporaryDirectory(prefix="cog_") as tmp:
+        try:
+            if job["src_root"]:
+                src = os.path.join(job["src_root"], job["key"])
+            else:
+                src = os.path.join(tmp, "src.tif")
+                _S3.download_file(job["bucket"], job["key"], src)
+            dst = os.path.join(tmp, "cog.tif")
+            rasterio.shutil.copy(src, dst, driver="COG", **job["options"])
+
+            with rasterio.open(dst) as ds:
+                out["overviews"] = [int(f) for f in ds.overviews(1)]
+                out["blocksize"] = list(ds.block_shapes[0])
+                out["compress"] = (ds.compression.value if ds.compression else None)
+            out["bytes"] = os.path.getsize(dst)
+
+            if job["out_root"]:
+                target = os.path.join(job["out_root"], job["cog_key"])
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.move(dst, target)
+            else:
+                _S3.upload_file(dst, job["bucket"], job["cog_key"], ExtraArgs={"ContentType": COG_CONTENT_TYPE})
+            out["status"] = "ok"
+        except Exception as e:
+            out["status"] = "failed"
+            out["error"] = f"{type(e).__name__}: {e}"
+    out["seconds"] = round(time.perf_counter() - t0, 2)
+    return out
+
+# CHECKSUMS
+def s3_listing(s3, bucket: str, prefix: str) -> Dict[str, str]:
+    """key -> 'etag:<ETag>:<size>' for every object under prefix (one paginated listing)."""
+    sums: Dict[str, str] = {}
+    for page in s3.get_paginator("list_objects_v2").paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get("Contents", []) or []:
+            sums[obj["Key"]] = f"etag:{obj['ETag'].strip(chr(34))}:{obj['Size']}"
+    return sums
+
+def local_checksums(src_root: str, keys: List[str], pool: ProcessPoolExecutor) -> Dict[str, str]:
+    paths = {k: os.path.join(src_root, k) for k in keys if os.path.isfile(os.path.join(src_root, k))}
+    return dict(zip(paths, pool.map(sha256_file, paths.values(), chunksize=8)))
+
+# MANIFEST
+def load_manifest(path: Path) -> Dict[str, Dict[str, Any]]:
+    if not path.exists():
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("version") != MANIFEST_VERSION:
+        warn(f"{path}: manifest version {data.get('version')} ignored; every raster will be converted")
+        return {}
+    return data.get("entries", {})
+
+def save_manifest(path: Path, entries: Dict[str, Dict[str, Any]], options: Dict[str, str]):
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": MANIFEST_VERSION, "options": options, "entries": entries}, f, indent=2)
+    os.replace(tmp, path)
+
+def apply_to_records(records: List[Dict[str, Any]], entries: Dict[str, Dict[str, Any]],
+                     bucket: str, out_root: Optional[str]) -> Dict[str, int]:
+    """Write cog_* fields into catalog records; returns counts per status."""
+    counts: Dict[str, int] = {}
+    for rec in records:
+        key = source_key(rec)
+        e = entries.get(key) if key else None
+        if key is None:
+            status = "no_raster"
+        elif e is None:
+            status = "missing_source"
+        else:
+            status = e["status"]
+        rec["cog_status"] = status
+        ok = status == "ok"
+        rec["cog_url"] = (
+            (Path(out_root, e["cog_key"]).resolve().as_uri() if out_root else s3_http_url(bucket, e["cog_key"])) if ok else None
+        )
+        rec["cog_overviews"] = e.get("overviews") if ok else None
+        rec["cog_checksum"] = e.get("checksum") if e else None
+        counts[status] = counts.get(status, 0) + 1
+    return counts
+
+# CLI
+def parse_args():
+    p = argparse.ArgumentParser(description="Convert catalog FIM rasters to Cloud-Optimized GeoTIFFs.")
+    p.add_argument("--catalog", type=Path, required=True, help="catalog_core.json from build_catalog.py")
+    p.add_argument("--out-core", type=Path, default=None, help="Updated catalog (default: overwrite --catalog)")
+    p.add_argument("--manifest", type=Path, default=Path("cog_manifest.json"))
+    p.add_argument("--bucket", default=DEFAULT_BUCKET)
+    p.add_argument("--prefix", default=DEFAULT_PREFIX, help="Listing prefix for S3 checksums")
+    p.add_argument("--profile", default=None, help="AWS profile (optional)")
+    p.add_argument("--src-root", default=None, help="Read sources from a local mirror of the bucket keys")
+    p.add_argument("--out-root", default=None, help="Write COGs under this directory instead of uploading")
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    p.add_argument("--compress", choices=["DEFLATE", "ZSTD", "LZW"], default=COG_OPTIONS["COMPRESS"])
+    p.add_argument("--blocksize", type=int, default=int(COG_OPTIONS["BLOCKSIZE"]))
+    p.add_argument("--force", action="store_true", help="Convert even when the checksum is unchanged")
+    p.add_argument("--dry-run", action="store_true", help="Only report what would be converted")
+    return p.parse_args()
+
+def main():
+    args = parse_args()
+    try:
+        import rasterio  # noqa: F401
+    except ImportError:
+        err("rasterio is required (pip install -r requirements-raster.txt; needs GDAL >= 3.1 for the COG driver)")
+        sys.exit(2)
+
+    with open(args.catalog, "r", encoding="utf-8") as f:
+        catalog = json.load(f)
+    records: List[Dict[str, Any]] = catalog.get("records", [])
+    keys = sorted({k for k in (source_key(r) for r in records) if k})
+    info(f"{len(records):,} records reference {len(keys):,} rasters")
+
+    options = dict(COG_OPTIONS, COMPRESS=args.compress, BLOCKSIZE=str(args.blocksize))
+    manifest = load_manifest(args.manifest)
+    local = args.src_root is not None
+
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=(args.profile,)) as pool:
+        # checksums: hashing local files in the pool, or one bucket listing
+        listing: Dict[str, str] = {}
+        if not local or not args.out_root:
+            listing = s3_listing(get_client(profile=args.profile), args.bucket, args.prefix)
+        if local:
+            sums = local_checksums(args.src_root, keys, pool)
+        else:
+            sums = {k: listing[k] for k in keys if k in listing}
+
+        def cog_exists(ck: str) -> bool:
+            return os.path.isfile(os.path.join(args.out_root, ck)) if args.out_root else ck in listing
+
+        jobs: List[Dict[str, Any]] = []
+        skipped = 0
+        for key in keys:
+            if key not in sums:
+                manifest.pop(key, None)
+                continue
+            prev = manifest.get(key)
+            if (not args.force and prev and prev.get("status") == "ok" and prev.get("checksum") == sums[key]
+                    and prev.get("options") == options and cog_exists(prev["cog_key"])):
+                skipped += 1
+                continue
+            jobs.append({
+                "key": key, "checksum": sums[key], "cog_key": cog_key_for(key), "bucket": args.bucket,
+                "src_root": args.src_root, "out_root": args.out_root, "options": options,
+            })
+        missing = len(keys) - len(sums)
+        info(f"{len(jobs):,} to convert, {skipped:,} unchanged (skipped), {missing:,} missing at source")
+
+        if args.dry_run:
+            for job in jobs[:50]:
+                info(f"  would convert {job['key']}")
+            return
+
+        t0 = time.perf_counter()
+        futures = [pool.submit(convert_one, job) for job in jobs]
+        for i, fut in enumerate(as_completed(futures), 1):
+            res = fut.result()
+            res["options"] = options
+            res["converted_at"] = dt.datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+            manifest[res["key"]] = res
+            if res["status"] != "ok":
+                warn(f"{res['key']}: {res.get('error')}")
+            if i % 25 == 0 or i == len(futures):
+                info(f"[{i}/{len(futures)}] {time.perf_counter() - t0:.1f} s — last: {res['key']} "
+                     f"({res['status']}, overviews {res.get('overviews')})")
+                save_manifest(args.manifest, manifest, options)
+    save_manifest(args.manifest, manifest, options)
+
+    counts = apply_to_records(records, manifest, args.bucket, args.out_root)
+    catalog["cog_updated_at"] = dt.datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+    out_core = args.out_core or args.catalog
+    with open(out_core, "w", encoding="utf-8") as f:
+        json.dump(catalog, f, ensure_ascii=False, indent=2)
+    info(f"Wrote {out_core}: " + ", ".join(f"{k}={v:,}" for k, v in sorted(counts.items())))
+    info(f"Manifest: {args.manifest}")
+
+if __name__ == "__main__":
+    main()
@@ -35,7 +35,9 @@ from typing import List, Dict, Any, Optional
 
 import pandas as pd
 import geopandas as gpd
-import boto3
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from utilis.s3_client import get_client
 
 def info(msg: str):
     print(f"[INFO] {msg}", flush=True)
@@ -280,7 +282,7 @@ def extract_mbtiles_to_dir(mbtiles: Path, out_dir: Path):
 
 
 def upload_to_s3(local_tiles: Path, bucket: str, prefix: str):
-    s3 = boto3.client("s3")
+    s3 = get_client()
     def guess_headers(p: Path) -> Dict[str, str]:
         if p.suffix == ".pbf":
             return {"ContentType": "application/x-protobuf", "ContentEncoding": "gzip"}
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Load-test a local vector tile server by replaying synthetic map sessions.
+
+Each virtual user opens the viewer at the same view as the Interactive Map page
+(center 39.83, -98.58, zoom 5) and then pans/zooms around CONUS. Every view is
+turned into the XYZ tiles Leaflet would request for the viewport, and only tiles
+the "browser" has not fetched yet in that session are requested.
+
+Runs fully offline against serve_tiles.py (or any server with the same URL layout).
+
+USAGE (example):
+python serve_tiles.py &
+python loadtest_tiles.py \
+  --url-template "http://localhost:8000/out_tiles/tiles/{z}/{x}/{y}.pbf" \
+  --users 16 --sessions 5 --steps 30 --json-out loadtest.json
+"""
+from __future__ import annotations
+import argparse
+import http.client
+import json
+import math
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+# Same start view as pages/1_Interactive Map.py
+START_CENTER = (39.8283, -98.5795)   # lat, lon
+START_ZOOM   = 5
+
+# CONUS extent the sessions stay inside (west, south, east, north)
+CONUS_BBOX = (-125.0, 24.0, -66.0, 50.0)
+
+MIN_ZOOM = 3
+MAX_ZOOM = 14    # maxNativeZoom of the VectorGrid layer
+TILE_SIZE = 256
+
+def info(msg: str):
+    print(f"[INFO] {msg}", flush=True)
+
+# Web Mercator tile math
+def lonlat_to_pixel(lon: float, lat: float, z: int) -> Tuple[float, float]:
+    lat = max(min(lat, 85.05112878), -85.05112878)
+    scale = TILE_SIZE * (2 ** z)
+    x = (lon + 180.0) / 360.0 * scale
+    s = math.sin(math.radians(lat))
+    y = (0.5 - math.log((1 + s) / (1 - s)) / (4 * math.pi)) * scale
+    return x, y
+
+def pixel_to_lonlat(x: float, y: float, z: int) -> Tuple[float, float]:
+    scale = TILE_SIZE * (2 ** z)
+    lon = x / scale * 360.0 - 180.0
+    n = math.pi - 2.0 * math.pi * y / scale
+    lat = math.degrees(math.atan(math.sinh(n)))
+    return lon, lat
+
+def viewport_tiles(lat: float, lon: float, z: int, width: int, height: int) -> List[Tuple[int, int, int]]:
+    """Tiles covering a width x height viewport centered on (lat, lon), center-out like Leaflet."""
+    cx, cy = lonlat_to_pixel(lon, lat, z)
+    n = 2 ** z
+    x0 = int(math.floor((cx - width / 2) / TILE_SIZE))
+    x1 = int(math.floor((cx + width / 2) / TILE_SIZE))
+    y0 = max(0, int(math.floor((cy - height / 2) / TILE_SIZE)))
+    y1 = min(n - 1, int(math.floor((cy + height / 2) / TILE_SIZE)))
+    tcx, tcy = cx / TILE_SIZE, cy / TILE_SIZE
+
+    tiles = []
+    for ty in range(y0, y1 + 1):
+        for tx in range(x0, x1 + 1):
+            d = (tx + 0.5 - tcx) ** 2 + (ty + 0.5 - tcy) ** 2
+            tiles.append((d, z, tx % n, ty))
+    tiles.sort()
+    return [(z, x, y) for _, z, x, y in tiles]
+
+# Session generation
+def _clamp_view(lat: float, lon: float) -> Tuple[float, float]:
+    w, s, e, n = CONUS_BBOX
+    return min(max(lat, s), n), min(max(lon, w), e)
+
+def generate_session(
+    rng: random.Random,
+    steps: int,
+    width: int,
+    height: int,
+) -> List[Tuple[float, float, int]]:
+    """
+    Random walk of map views (lat, lon, zoom) starting at the viewer's default view.
+    Actions are weighted roughly like real browsing: mostly pans, then zoom in/out,
+    with an occasional "Center on USA" reset.
+    """
+    lat, lon = START_CENTER
+    z = START_ZOOM
+    views = [(lat, lon, z)]
+    for _ in range(steps):
+        action = rng.choices(("pan", "zoom_in", "zoom_out", "reset"), weights=(55, 25, 15, 5))[0]
+        if action == "pan":
+            cx, cy = lonlat_to_pixel(lon, lat, z)
+            cx += rng.uniform(-0.6, 0.6) * width
+            cy += rng.uniform(-0.6, 0.6) * height
+            lon, lat = pixel_to_lonlat(cx, cy, z)
+        elif action == "zoom_in" and z < MAX_ZOOM:
+            # zoom towards a point inside the current viewport
+            cx, cy = lonlat_to_pixel(lon, lat, z)
+            cx += rng.uniform(-0.35, 0.35) * width
+            cy += rng.uniform(-0.35, 0.35) * height
+            lon, lat = pixel_to_lonlat(cx, cy, z)
+            z += rng.choice((1, 1, 2)) if z < MAX_ZOOM - 1 else 1
+        elif action == "zoom_out" and z > MIN_ZOOM:
+            z -= 1
+        elif action == "reset":
+            (lat, lon), z = START_CENTER, START_ZOOM
+        lat, lon = _clamp_view(lat, lon)
+        views.append((lat, lon, z))
+    return views
+
+def session_requests(
+    views: List[Tuple[float, float, int]],
+    width: int,
+    height: int,
+    client_cache: bool = True,
+) -> List[List[Tuple[int, int, int]]]:
+    """Tile requests per view; with client_cache, tiles already fetched in the session are skipped."""
+    seen = set()
+    out = []
+    for lat, lon, z in views:
+        batch = []
+        for t in viewport_tiles(lat, lon, z, width, height):
+            if client_cache and t in seen:
+                continue
+            seen.add(t)
+            batch.append(t)
+        out.append(batch)
+    return out
+
+# Driver
+class _Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies_ms: List[float] = []
+        self.status: Dict[str, int] = {}
+        self.bytes = 0
+        self.exceptions: Dict[str, int] = {}
+
+    def add(self, status: Optional[int], nbytes: int, ms: float, exc: Optional[str] = None):
+        with self.lock:
+            self.latencies_ms.append(ms)
+            self.bytes += nbytes
+            if exc is not None:
+                self.exceptions[exc] = self.exceptions.get(exc, 0) + 1
+            else:
+                k = str(status)
+                self.status[k] = self.status.get(k, 0) + 1
+
+def _percentile(sorted_vals: List[float], p: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    k = max(0, min(len(sorted_vals) - 1, int(math.ceil(p / 100.0 * len(sorted_vals))) - 1))
+    return sorted_vals[k]
+
+def run_user(
+    user_id: int,
+    url_template: str,
+    sessions: List[List[List[Tuple[int, int, int]]]],
+    think_ms: float,
+    timeout: float,
+    stats: _Stats,
+    seed: int,
+):
+    parts = urlsplit(url_template)
+    conn_cls = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+    path_tpl = parts.path + (f"?{parts.query}" if parts.query else "")
+    rng = random.Random(seed * 7919 + user_id)
+    conn = conn_cls(parts.hostname, parts.port, timeout=timeout)
+    try:
+        for batches in sessions:
+            for batch in batches:
+                for z, x, y in batch:
+                    path = path_tpl.replace("{z}", str(z)).replace("{x}", str(x)).replace("{y}", str(y))
+                    t0 = time.perf_counter()
+                    try:
+                        conn.request("GET", path, headers={"Accept-Encoding": "gzip"})
+                        resp = conn.getresponse()
+                        body = resp.read()
+                        stats.add(resp.status, len(body), (time.perf_counter() - t0) * 1000.0)
+                        if resp.will_close:
+                            conn.close()
+                    except (OSError, http.client.HTTPException) as e:
+                        stats.add(None, 0, (time.perf_counter() - t0) * 1000.0, exc=type(e).__name__)
+                        conn.close()
+                if think_ms > 0:
+                    time.sleep(rng.expovariate(1.0 / think_ms) / 1000.0)
+    finally:
+        conn.close()
+
+def build_report(stats: _Stats, wall_s: float, args: argparse.Namespace) -> Dict[str, Any]:
+    lat = sorted(stats.latencies_ms)
+    total = len(lat)
+    ok = sum(n for s, n in stats.status.items() if s.startswith("2") or s == "304")
+    missing = stats.status.get("404", 0)
+    failed = total - ok - missing
+    return {
+        "config": {
+            "url_template": args.url_template,
+            "users": args.users,
+            "sessions_per_user": args.sessions,
+            "steps_per_session": args.steps,
+            "viewport": [args.width, args.height],
+            "think_ms": args.think_ms,
+            "client_cache": not args.no_client_cache,
+            "seed": args.seed,
+        },
+        "requests": total,
+        "duration_s": round(wall_s, 3),
+        "throughput_rps": round(total / wall_s, 2) if wall_s > 0 else 0.0,
+        "throughput_mb_s": round(stats.bytes / 1e6 / wall_s, 3) if wall_s > 0 else 0.0,
+        "bytes": stats.bytes,
+        "latency_ms": {
+            "p50": round(_percentile(lat, 50), 2),
+            "p95": round(_percentile(lat, 95), 2),
+            "p99": round(_percentile(lat, 99), 2),
+            "max": round(lat[-1], 2) if lat else 0.0,
+            "mean": round(sum(lat) / total, 2) if total else 0.0,
+        },
+        "status": dict(sorted(stats.status.items())),
+        "exceptions": stats.exceptions,
+        # 404 is normal for sparse tilesets (mb-util only writes non-empty tiles)
+        "missing_rate": round(missing / total, 4) if total else 0.0,
+        "error_rate": round(failed / total, 4) if total else 0.0,
+    }
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Replay synthetic pan/zoom sessions against a local tile server.")
+    p.add_argument("--url-template", default="http://localhost:8000/out_tiles/tiles/{z}/{x}/{y}.pbf",
+                   help="Tile URL with {z}/{x}/{y} placeholders")
+    p.add_argument("--users", type=int, default=8, help="Concurrent virtual users")
+    p.add_argument("--sessions", type=int, default=3, help="Sessions per user")
+    p.add_argument("--steps", type=int, default=25, help="Pan/zoom actions per session")
+    p.add_argument("--width", type=int, default=1280, help="Viewport width in px")
+    p.add_argument("--height", type=int, default=720, help="Viewport height in px (map height in the app)")
+    p.add_argument("--think-ms", type=float, default=0.0, help="Mean think time between views (0 = closed loop)")
+    p.add_argument("--timeout", type=float, default=10.0, help="Per-request timeout in seconds")
+    p.add_argument("--no-client-cache", action="store_true", help="Re-request tiles already fetched in a session")
+    p.add_argument("--seed", type=int, default=42, help="RNG seed; same seed replays the same sessions")
+    p.add_argument("--json-out", default=None, help="Write the report to this JSON file")
+    return p.parse_args()
+
+def main():
+    args = parse_args()
+    rng = random.Random(args.seed)
+
+    plans: List[List[List[List[Tuple[int, int, int]]]]] = []
+    for _ in range(args.users):
+        user_sessions = []
+        for _ in range(args.sessions):
+            views = generate_session(rng, args.steps, args.width, args.height)
+            user_sessions.append(session_requests(views, args.width, args.height, not args.no_client_cache))
+        plans.append(user_sessions)
+    n_planned = sum(len(b) for u in plans for s in u for b in s)
+    info(f"Planned {n_planned} tile requests from {args.users} users x {args.sessions} sessions")
+
+    stats = _Stats()
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.users) as pool:
+        futs = [
+            pool.submit(run_user, i, args.url_template, plans[i], args.think_ms, args.timeout, stats, args.seed)
+            for i in range(args.users)
+        ]
+        for f in futs:
+            f.result()
+    wall = time.perf_counter() - t0
+
+    report = build_report(stats, wall, args)
+    lat = report["latency_ms"]
+    info(f"{report['requests']} requests in {report['duration_s']} s → {report['throughput_rps']} req/s, "
+         f"{report['throughput_mb_s']} MB/s")
+    info(f"latency ms p50={lat['p50']} p95={lat['p95']} p99={lat['p99']} max={lat['max']}")
+    info(f"status={report['status']} exceptions={report['exceptions']} "
+         f"missing_rate={report['missing_rate']} error_rate={report['error_rate']}")
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        info(f"Report written to {args.json_out}")
+
+    if report["requests"] and report["error_rate"] == 1.0:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
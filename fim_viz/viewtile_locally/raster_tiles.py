@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Raster XYZ preview tiles rendered straight from the benchmark COGs.
+
+For each /raster/{z}/{x}/{y}.png request the renderer:
+  - finds the COGs whose footprint intersects the tile (footprints are read once)
+  - picks the coarsest overview that is still at least as fine as the tile pixels
+  - reads only the internal blocks the tile touches (LRU cache of decoded blocks)
+  - resamples nearest-neighbour into Web Mercator and colours wet pixels by tier
+
+COGs come from the catalog records written by fim_viz/cog_convert.py
+(`cog_status == "ok"`, `cog_url` = https:// or file:// URL).
+
+Requirements:
+  - Python: rasterio (GDAL), pyproj, numpy — pip install -r requirements-raster.txt
+"""
+from __future__ import annotations
+import json
+import math
+import struct
+import sys
+import threading
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+import numpy as np
+from pyproj import Transformer
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from utilis.tier_colors import DEFAULT_TIER_COLOR, TIER_COLORS
+
+TILE_SIZE = 256
+MIN_RASTER_ZOOM = 8          # below this a tile spans too many rasters to be a useful preview
+BLOCK_CACHE_SIZE = 1024      # decoded blocks (~1 MiB each at 512 px uint32)
+WET_ALPHA = 200
+HALF_WORLD = 20037508.342789244   # Web Mercator half extent (m)
+
+# HELPERS
+def tile_bounds_3857(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """(minx, miny, maxx, maxy) of an XYZ tile in EPSG:3857 metres."""
+    span = 2 * HALF_WORLD / (2 ** z)
+    minx = -HALF_WORLD + x * span
+    maxy = HALF_WORLD - y * span
+    return minx, maxy - span, minx + span, maxy
+
+def tile_pixel_centers(z: int, x: int, y: int, size: int = TILE_SIZE) -> Tuple[np.ndarray, np.ndarray]:
+    minx, miny, maxx, maxy = tile_bounds_3857(z, x, y)
+    res = (maxx - minx) / size
+    xs = minx + (np.arange(size) + 0.5) * res
+    ys = maxy - (np.arange(size) + 0.5) * res
+    gx, gy = np.meshgrid(xs, ys)
+    return gx.ravel(), gy.ravel()
+
+def hex_rgba(color: str, alpha: int) -> Tuple[int, int, int, int]:
+    c = color.lstrip("#")
+    return int(c[0:2], 16), int(c[2:4], 16), int(c[4:6], 16), alpha
+
+def encode_png(rgba: np.ndarray, level: int = 6) -> bytes:
+    """Minimal RGBA8 PNG encoder (filter type 0 per row)."""
+    h, w, _ = rgba.shape
+    raw = np.concatenate([np.zeros((h, 1), dtype=np.uint8), rgba.reshape(h, w * 4)], axis=1).tobytes()
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", w, h, 8, 6, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(raw, level))
+            + chunk(b"IEND", b""))
+
+EMPTY_PNG = encode_png(np.zeros((TILE_SIZE, TILE_SIZE, 4), dtype=np.uint8))
+
+def _open_target(url: str) -> str:
+    """rasterio path for a cog_url: local path for file://, the URL itself otherwise (GDAL /vsicurl/)."""
+    parts = urlsplit(url)
+    return unquote(parts.path) if parts.scheme == "file" else url
+
+def choose_level(factors: List[int], decimation: float) -> Tuple[Optional[int], int]:
+    """(overview index or None for full resolution, factor) of the coarsest level finer than `decimation`."""
+    level, factor = None, 1
+    for i, f in enumerate(factors):
+        if f <= decimation:
+            level, factor = i, f
+    return level, factor
+
+# BLOCK CACHE
+class BlockCache:
+    """LRU of decoded COG blocks keyed by (raster, overview level, block row, block col)."""
+    def __init__(self, maxsize: int = BLOCK_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[np.ndarray]:
+        with self._lock:
+            arr = self._data.get(key)
+            if arr is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return arr
+
+    def put(self, key: tuple, arr: np.ndarray):
+        with self._lock:
+            self._data[key] = arr
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+# COG RASTER
+class CogRaster:
+    """One COG: footprint in EPSG:3857, overview factors and cached block reads per level."""
+    def __init__(self, url: str, tier: str, cache: BlockCache):
+        import rasterio
+
+        self.url = url
+        self.tier = tier
+        self.color = hex_rgba(TIER_COLORS.get(tier, DEFAULT_TIER_COLOR), WET_ALPHA)
+        self._cache = cache
+        self._lock = threading.Lock()
+        self._datasets: Dict[Optional[int], Any] = {}
+
+        ds = rasterio.open(_open_target(url))
+        self._datasets[None] = ds
+        self.crs = ds.crs
+        self.res = abs(ds.transform.a)
+        self.factors = [int(f) for f in ds.overviews(1)]
+        self.nodata = ds.nodata
+        to_3857 = Transformer.from_crs(ds.crs, "EPSG:3857", always_xy=True)
+        self.bounds_3857 = to_3857.transform_bounds(*ds.bounds)
+        self._from_3857 = Transformer.from_crs("EPSG:3857", ds.crs, always_xy=True)
+
+    def intersects(self, b: Tuple[float, float, float, float]) -> bool:
+        x0, y0, x1, y1 = self.bounds_3857
+        return not (x1 < b[0] or x0 > b[2] or y1 < b[1] or y0 > b[3])
+
+    def _dataset(self, level: Optional[int]):
+        import rasterio
+
+        ds = self._datasets.get(level)
+        if ds is None:
+            ds = self._datasets[level] = rasterio.open(_open_target(self.url), overview_level=level)
+        return ds
+
+    def _block(self, level: Optional[int], r: int, c: int):
+        key = (self.url, level, r, c)
+        arr = self._cache.get(key)
+        if arr is None:
+            from rasterio.windows import Window
+
+            with self._lock:
+                ds = self._dataset(level)
+                bh, bw = ds.block_shapes[0]
+                win = Window(c * bw, r * bh, min(bw, ds.width - c * bw), min(bh, ds.height - r * bh))
+                arr = ds.read(1, window=win)
+            self._cache.put(key, arr)
+        return arr
+
+    def wet_mask(self, xs: np.ndarray, ys: np.ndarray, tile_res_m: float) -> np.ndarray:
+        """Boolean mask over the tile pixels (EPSG:3857 centers) where this raster is wet."""
+        sx, sy = self._from_3857.transform(xs, ys)
+        # source pixel size is in source CRS units; compare with the tile pixel reprojected there
+        sx0, _ = self._from_3857.transform(xs[:1] + tile_res_m, ys[:1])
+        tile_res_src = abs(float(sx0[0]) - float(sx[0])) or self.res
+        level, _ = choose_level(self.factors, tile_res_src / self.res)
+
+        with self._lock:
+            ds = self._dataset(level)
+            inv = ~ds.transform
+            height, width = ds.height, ds.width
+            bh, bw = ds.block_shapes[0]
+        cols = np.floor(inv.a * sx + inv.b * sy + inv.c).astype(np.int64)
+        rows = np.floor(inv.d * sx + inv.e * sy + inv.f).astype(np.int64)
+        inside = (cols >= 0) & (cols < width) & (rows >= 0) & (rows < height)
+
+        wet = np.zeros(xs.shape, dtype=bool)
+        if not inside.any():
+            return wet
+        idx = np.flatnonzero(inside)
+        br, bc = rows[idx] // bh, cols[idx] // bw
+        block_id = br * ((width + bw - 1) // bw) + bc
+        for b in np.unique(block_id):
+            sel = idx[block_id == b]
+            r, c = int(rows[sel[0]] // bh), int(cols[sel[0]] // bw)
+            vals = self._block(level, r, c)[rows[sel] - r * bh, cols[sel] - c * bw]
+            ok = vals > 0
+            if self.nodata is not None and not (isinstance(self.nodata, float) and math.isnan(self.nodata)):
+                ok &= vals != self.nodata
+            wet[sel] = ok
+        return wet
+
+# RENDERER
+class RasterTileRenderer:
+    """XYZ PNG tiles from all COGs listed in a catalog (cog_status == "ok")."""
+    def __init__(self, records: Iterable[Dict[str, Any]], cache_blocks: int = BLOCK_CACHE_SIZE, open_workers: int = 16):
+        self.cache = BlockCache(cache_blocks)
+        todo = [(r["cog_url"], r.get("tier") or "") for r in records
+                if r.get("cog_status") == "ok" and r.get("cog_url")]
+        todo = list(dict.fromkeys(todo))
+
+        def load(item):
+            try:
+                return CogRaster(item[0], item[1], self.cache)
+            except Exception as e:
+                print(f"[WARN] {item[0]}: {type(e).__name__}: {e}", flush=True)
+                return None
+
+        with ThreadPoolExecutor(max_workers=open_workers) as pool:
+            self.rasters: List[CogRaster] = [r for r in pool.map(load, todo) if r is not None]
+
+    @classmethod
+    def from_catalog(cls, path: str, **kw) -> "RasterTileRenderer":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f).get("records", []), **kw)
+
+    def render(self, z: int, x: int, y: int, tiers: Optional[set] = None) -> bytes:
+        if z < MIN_RASTER_ZOOM:
+            return EMPTY_PNG
+        bounds = tile_bounds_3857(z, x, y)
+        hits = [r for r in self.rasters if r.intersects(bounds) and (not tiers or r.tier in tiers)]
+        if not hits:
+            return EMPTY_PNG
+
+        xs, ys = tile_pixel_centers(z, x, y)
+        tile_res = (bounds[2] - bounds[0]) / TILE_SIZE
+        rgba = np.zeros((TILE_SIZE * TILE_SIZE, 4), dtype=np.uint8)
+        for r in hits:
+            rgba[r.wet_mask(xs, ys, tile_res)] = r.color
+        return encode_png(rgba.reshape(TILE_SIZE, TILE_SIZE, 4))
@@ -1,12 +1,25 @@
 #!/usr/bin/env python3
+"""
+Local tile server for fim_viz: static files (gzipped .pbf vector tiles) plus,
+with --catalog, raster preview tiles at /raster/{z}/{x}/{y}.png rendered from COGs.
+
+USAGE (examples):
+python serve_tiles.py
+python serve_tiles.py --port 8000 --catalog ../../catalog_core.json
+"""
 from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+import argparse
 import os
 import mimetypes
 import pathlib
+import re
 
 ROOT = str(pathlib.Path(__file__).resolve().parents[1])
+RASTER_RE = re.compile(r"^/raster/(\d+)/(\d+)/(\d+)\.png(?:\?(.*))?$")
 
 class GzipPbfHandler(SimpleHTTPRequestHandler):
+    renderer = None   # RasterTileRenderer when started with --catalog
+
     def translate_path(self, path):
         # Serve from this folder (fim_viz)
         full = os.path.join(ROOT, path.lstrip("/"))
@@ -23,7 +36,32 @@ class GzipPbfHandler(SimpleHTTPRequestHandler):
             return "application/x-protobuf"
         return super().guess_type(path)
 
+    def do_raster(self, m):
+        if self.renderer is None:
+            self.send_error(404, "raster tiles disabled (start with --catalog)")
+            return
+        z, x, y = (int(v) for v in m.group(1, 2, 3))
+        tiers = None
+        for part in (m.group(4) or "").split("&"):
+            if part.startswith("tiers="):
+                tiers = {t for t in part[6:].split(",") if t} or None
+        try:
+            body = self.renderer.render(z, x, y, tiers)
+        except Exception as e:
+            self.send_error(500, f"{type(e).__name__}: {e}")
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "public, max-age=3600")
+        self.end_headers()
+        self.wfile.write(body)
+
     def do_GET(self):
+        m = RASTER_RE.match(self.path)
+        if m:
+            self.do_raster(m)
+            return
         # Let the parent build headers, then add gzip for .pbf
         supercls = super(GzipPbfHandler, self)
         path = self.translate_path(self.path)
@@ -39,9 +77,22 @@ class GzipPbfHandler(SimpleHTTPRequestHandler):
         else:
             super().do_GET()
 
+def parse_args():
+    p = argparse.ArgumentParser(description="Serve fim_viz vector tiles and raster previews locally.")
+    p.add_argument("--port", type=int, default=8000)
+    p.add_argument("--catalog", default=None,
+                   help="catalog_core.json with cog_url/cog_status (from cog_convert.py); enables /raster tiles")
+    return p.parse_args()
+
 def main():
+    args = parse_args()
+    if args.catalog:
+        from raster_tiles import RasterTileRenderer
+
+        GzipPbfHandler.renderer = RasterTileRenderer.from_catalog(os.path.abspath(args.catalog))
+        print(f"Raster previews from {len(GzipPbfHandler.renderer.rasters):,} COGs")
     os.chdir(ROOT)
-    port = 8000
+    port = args.port
     with ThreadingHTTPServer(("0.0.0.0", port), GzipPbfHandler) as httpd:
         print(f"Serving on http://localhost:{port}")
         httpd.serve_forever()
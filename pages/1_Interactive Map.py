@@ -1,24 +1,28 @@
 from __future__ import annotations
-import hashlib
 import datetime as dt
-from io import BytesIO
-from typing import Dict, Any, Iterable, List, Tuple, Optional
-
-import requests
-import pandas as pd
-import geopandas as gpd
-from shapely.geometry import mapping
+import os
+import tempfile
+from typing import Dict, Any, List, Tuple, Optional
 
 import streamlit as st
-from streamlit_folium import st_folium
+import streamlit.components.v1 as components
 import folium
-from folium.features import GeoJson
-from folium.plugins import MarkerCluster
-from branca.element import Element, MacroElement
-from jinja2 import Template
-import json
+from branca.element import Element
 
 from utilis.ui import inject_globalfont
+from utilis.catalog_store import get_catalog_store
+from utilis.catalog_index import get_catalog_index, ymd_int, ymd_date
+from utilis.clustering import CLUSTER_MAX_ZOOM
+from utilis.popups import detail_html
+from utilis.record_table import SORTABLE_COLUMNS, page_count
+from utilis.map_cache import get_render_cache, map_payload, st_folium_payload
+from utilis.map_layers import (
+    DEFAULT_TIER_COLOR, RENDER_GEOJSON, RENDER_MARKERS, TIER_COLORS, SitePointLayer, VectorGridProtobuf,
+    cluster_marker, extent_filter, filter_channel_html, site_marker,
+)
+from utilis.spatial_index import (
+    ViewCell, bbox_from_leaflet, bbox_from_view, fit_view, select_in_view, view_cell, view_cell_bbox, viewport_px,
+)
 inject_globalfont(font_size_px=18, sidebar_font_size_px=20)
 
 # CONFIG
@@ -26,17 +30,23 @@ BUCKET    = "sdmlab"
 CORE_KEY  = "FIM_Database/FIM_Viz/catalog_core.json"
 TILES_KEY = "FIM_Database/FIM_Viz/tiles"
 
+# Raster previews from COGs (fim_viz/viewtile_locally/serve_tiles.py --catalog)
+RASTER_TILES_URL = os.environ.get("FIM_RASTER_TILES", "http://localhost:8000/raster/{z}/{x}/{y}.png")
+RASTER_MIN_ZOOM  = 8
+
 # Max features to draw at once
 BASE_FEATURE_CAP = 10
 
-TIER_COLORS = {
-    "Tier_1": "#1b9e77",
-    "Tier_2": "#d95f02",
-    "Tier_3": "#7570b3",
-    "Tier_4": "#e7298a",
-    "Tier_5": "#66a61e",
-}
-DEFAULT_TIER_COLOR = "#2c7fb8"
+# Records and payload per bulk zip from the page (the CLI has no cap); the
+# finished archive is held in memory per session until the user downloads it,
+# plus one copy in Streamlit's media store, so the byte cap stays small
+BULK_MAX_RECORDS = 1000
+BULK_MAX_BYTES = 32 * 2**20
+
+# Initial map view (CONUS)
+HOME_CENTER = [39.8283, -98.5795]
+HOME_ZOOM   = 5.0
+MAP_HEIGHT  = 720
 
 BASEMAPS = {
     "OpenStreetMap": dict(tiles="OpenStreetMap", attr="© OpenStreetMap"),
@@ -56,117 +66,6 @@ def http_url(key: str) -> str:
     from urllib.parse import quote
     return f"https://{BUCKET}.s3.amazonaws.com/{quote(key, safe='/')}"
 
-@st.cache_data(show_spinner=False, ttl=86400)
-def fetch_json(url: str) -> Dict[str, Any]:
-    r = requests.get(url, timeout=120)
-    r.raise_for_status()
-    return r.json()
-
-@st.cache_data(show_spinner=False)
-def fingerprint_ids(ids: Iterable[str]) -> str:
-    arr = sorted([str(x) for x in ids])
-    return hashlib.sha1(("\n".join(arr)).encode("utf-8")).hexdigest()
-
-# Custom vector grid layer for folium
-class VectorGridProtobuf(MacroElement):
-    _template = Template("""
-        {% macro script(this, kwargs) %}
-        (function ensureVectorGrid(cb){
-          if (window.L && L.vectorGrid) { cb(); return; }
-          var s = document.createElement('script');
-          s.src = "https://unpkg.com/leaflet.vectorgrid/dist/Leaflet.VectorGrid.bundled.js";
-          s.onload = cb; document.head.appendChild(s);
-        })(function(){
-          var map       = {{ this._parent.get_name() }};
-          var urlTpl    = {{ this.tiles_url|tojson }};
-          var lyrId     = {{ this.layer_name|tojson }};
-          var colorMap  = {{ this.tier_colors|safe }};
-          var defaultC  = {{ this.default_color|tojson }};
-          var maxNative = {{ this.max_native }};
-
-          // filters coming from Python
-          var TIER_SET  = new Set({{ this.allowed_tiers|safe }});
-          var DATE_MIN  = {{ this.date_min }};
-          var DATE_MAX  = {{ this.date_max }};
-
-          function matches(props){
-            // 1) Tier
-            if (TIER_SET.size > 0) {
-              if (!TIER_SET.has(String(props.tier || ""))) return false;
-            }
-            // 2) Date range (YYYYMMDD int) — missing dates are allowed
-            var ets = Number(props.event_ts);
-            if (Number.isFinite(ets)) {
-              if (ets < DATE_MIN || ets > DATE_MAX) return false;
-            }
-            return true;
-          }
-
-          var style = {};
-          style[lyrId] = function(props){
-            if (!matches(props)) {
-                return { stroke:false, fill:false, opacity:0, fillOpacity:0, weight:0 };
-            }
-            var c = (props && props.tier && colorMap[props.tier]) ? colorMap[props.tier] : defaultC;
-            return {
-                stroke:true,       // no borders
-                weight:0.5,
-                color:c,
-                opacity:1,          // border invisible
-                fill:true,
-                fillColor:c,
-                fillOpacity:0.5,   // fill visible
-                lineCap:'round',
-                lineJoin:'round',
-                smoothFactor:10.0    // smooth geometry edges
-            };
-
-          };
-
-          var grid = L.vectorGrid.protobuf(urlTpl, {
-            vectorTileLayerStyles: style,
-            interactive: true,
-            maxNativeZoom: maxNative,
-            maxZoom: 22,
-            rendererFactory: L.svg.tile
-          })
-          .on('click', function(e){
-            var p = (e.layer && e.layer.properties) || {};
-            var html = "<div style='font:13px system-ui'><b>"+(p.tier||"")+
-                       "</b> — "+(p.site_id||"")+
-                       "<br/>ID: "+(p.feature_id||"")+
-                       (p.event_date ? "<br/>Date: "+p.event_date : "") +
-                       "</div>";
-            L.popup().setLatLng(e.latlng).setContent(html).openOn(map);
-          })
-          .addTo(map);
-
-          window.__fimGrid = grid;
-        });
-        {% endmacro %}
-    """)
-    def __init__(
-        self,
-        tiles_url: str,
-        layer_name: str = "fim_extents",
-        tier_colors: Optional[Dict[str,str]] = None,
-        max_native: int = 14,
-        allowed_tiers: Optional[List[str]] = None,
-        date_min: int = 0,
-        date_max: int = 99999999
-    ):
-        super().__init__()
-        if tier_colors is None:
-            tier_colors = TIER_COLORS
-        self.tiles_url      = tiles_url
-        self.layer_name     = layer_name
-        self.tier_colors    = json.dumps(tier_colors)
-        self.default_color  = DEFAULT_TIER_COLOR
-        self.max_native     = max_native
-        self.allowed_tiers  = json.dumps([str(x) for x in (allowed_tiers or [])])
-        self.date_min       = int(date_min)
-        self.date_max       = int(date_max)
-        
 # Streamlit page boot
 st.set_page_config(page_title="Interactive FIM Vizualizer", page_icon="🌊", layout="wide")
 st.title("Benchmark FIMs")
@@ -174,34 +73,41 @@ st.title("Benchmark FIMs")
 # Session defaults
 ss = st.session_state
 if "saved_center" not in ss:
-    ss.saved_center = [39.8283, -98.5795]
+    ss.saved_center = list(HOME_CENTER)
 if "saved_zoom" not in ss:
-    ss.saved_zoom = 5.0
+    ss.saved_zoom = HOME_ZOOM
 if "fim_show" not in ss:
     ss.fim_show = False
+if "raster_show" not in ss:
+    ss.raster_show = False
 if "filters_changed" not in ss:
     ss.filters_changed = True 
 if "map_built_once" not in ss:
     ss.map_built_once = False
 
-# Sidebar cache control
+# Shared catalog: one immutable copy per process, sessions keep only its version
+store   = get_catalog_store(os.environ.get("FIM_CATALOG_URL") or http_url(CORE_KEY))
+catalog = store.current()
+
 with st.sidebar:
     st.header("Data")
     if st.button("Reload Data", use_container_width=True):
-        fetch_json.clear()
-        for k in ("catalog_records", "core_errors"):
-            ss.pop(k, None)
-        ss.filters_changed = True
-        st.success("Cache cleared. Data will reload now.")
+        # Conditional request: an unchanged catalog (304) keeps every derived cache
+        catalog, changed = store.reload()
+        if changed:
+            get_catalog_index.clear()
+            get_render_cache().clear()
+            st.success("New catalog version found. Data will reload now.")
+        else:
+            st.success("Catalog is up to date.")
 
-# Load catalog
-if "catalog_records" not in ss:
-    core = fetch_json(http_url(CORE_KEY))
-    ss.catalog_records = core.get("records", [])
-    ss.core_errors     = core.get("errors", [])
+# Another session (or the freshness check) may have loaded a newer version
+if ss.get("catalog_version") != catalog.version:
+    ss.catalog_version = catalog.version
+    ss.filters_changed = True
 
-records: List[Dict[str, Any]] = ss.catalog_records
-load_errors = ss.get("core_errors", [])
+records = catalog.records
+load_errors = catalog.errors
 
 if load_errors:
     with st.expander(f"{len(load_errors)} metadata issue(s) — click for details", expanded=False):
@@ -216,11 +122,11 @@ if not records:
     st.stop()
 
 # Filters
-all_tiers = sorted({r.get("tier", "Unknown_Tier") for r in records})
-dates_all = sorted([r["date_ymd"] for r in records if (r.get("tier") != "Tier_4") and r.get("date_ymd")])
-min_date = dt.date.fromisoformat(dates_all[0]) if dates_all else dt.date(2000, 1, 1)
-max_date = dt.date.fromisoformat(dates_all[-1]) if dates_all else dt.date.today()
-rp_all   = sorted({r.get("return_period") for r in records if r.get("tier") == "Tier_4" and r.get("return_period") is not None})
+cat_idx   = get_catalog_index(catalog.key, records)
+all_tiers = cat_idx.tiers
+min_date  = ymd_date(cat_idx.date_min) if cat_idx.date_min else dt.date(2000, 1, 1)
+max_date  = ymd_date(cat_idx.date_max) if cat_idx.date_max else dt.date.today()
+rp_all    = cat_idx.return_periods
 
 with st.sidebar:
     st.header("Filters")
@@ -242,15 +148,77 @@ with st.sidebar:
         else:
             sel_rps = None
 
+        # Indexed search: facet options carry catalog-wide counts
+        search_idx = cat_idx.search
+        facet_sel: Dict[str, List[str]] = {}
+        with st.expander("Search by location, source and text", expanded=False):
+            search_text = st.text_input("Description / file name", placeholder="e.g. harvey, sentinel")
+            huc_prefix  = st.text_input("HUC code (any level)", placeholder="e.g. 03 or 03020201")
+            for facet, label in (("state", "State"), ("basin", "River basin"), ("source", "Source")):
+                counts = search_idx.facet_counts(facet)
+                if counts:
+                    facet_sel[facet] = st.multiselect(
+                        label, options=list(counts), format_func=lambda v, c=counts: f"{v} ({c[v]:,})"
+                    )
+
         show_polys = st.checkbox("Show Flood Inundation Mapping Extent", value=ss.get("fim_show", False))
+        show_rasters = st.checkbox(
+            "Show FIM raster preview", value=ss.get("raster_show", False),
+            help=f"Raster tiles rendered from the COGs by the preview tile server, from zoom {RASTER_MIN_ZOOM}.",
+        )
 
         apply_filters = st.form_submit_button("Apply Filters", use_container_width=True)
 
+    # HUC drill-down: counts and extents come precomputed from the HUC tree
+    huc_tree = cat_idx.huc
+    huc_sel: Optional[str] = None
+    site_sel: Optional[str] = None
+    huc_limit = False
+    if huc_tree.roots:
+        st.header("Browse by HUC")
+        def huc_label(code: Optional[str]) -> str:
+            return "All" if code is None else f"{code} ({huc_tree.node(code).count:,})"
+        huc2 = st.selectbox("HUC2 region", [None, *huc_tree.codes_at(2)], format_func=huc_label)
+        huc_sel = huc2
+        if huc2 is not None:
+            huc8 = st.selectbox(
+                "HUC8 subbasin", [None, *(n.code for n in huc_tree.descendants(huc2, 8))], format_func=huc_label
+            )
+            huc_sel = huc8 or huc2
+        if huc_sel is not None and huc_sel != huc2:
+            site_counts = dict(huc_tree.sites(huc_sel))
+            site_sel = st.selectbox(
+                "Site", [None, *site_counts], format_func=lambda v: "All" if v is None else f"{v} ({site_counts[v]:,})"
+            )
+        huc_limit = st.checkbox("Limit map and table to this selection", value=False, disabled=huc_sel is None)
+        if st.button("Fly to selection", use_container_width=True, disabled=huc_sel is None):
+            if site_sel is not None:
+                rows = huc_tree.site_rows(huc_sel, site_sel)
+                located = (cat_idx.lat[rows] != 0) | (cat_idx.lon[rows] != 0)
+                lat, lon = cat_idx.lat[rows][located], cat_idx.lon[rows][located]
+                bounds = (float(lat.min()), float(lon.min()), float(lat.max()), float(lon.max())) if lat.size else None
+            else:
+                bounds = huc_tree.node(huc_sel).bbox
+            if bounds is None:
+                st.info("No site in this selection has a location.")
+            else:
+                center, zoom = fit_view(bounds, height_px=MAP_HEIGHT)
+                ss.saved_center = list(center)
+                ss.saved_zoom = float(zoom)
+                ss.filters_changed = True
+                st.rerun()
+
     st.header("Basemap")
     basemap_choice = st.selectbox("Select basemap", list(BASEMAPS.keys()), index=2)
+    render_mode = st.radio(
+        "Site rendering", [RENDER_MARKERS, RENDER_GEOJSON], index=0,
+        help="GeoJSON draws every filtered site in view as one canvas layer, without clusters "
+             "or a per-zoom cap. Markers cluster at low zoom and cap the sites drawn per view."
+    )
 
 # persist flood extent toggle
 ss.fim_show = show_polys
+ss.raster_show = show_rasters
 
 # Date range unpack
 if isinstance(dr, tuple) and len(dr) == 2:
@@ -258,36 +226,22 @@ if isinstance(dr, tuple) and len(dr) == 2:
 else:
     start_date, end_date = min_date, max_date
 
-def in_date_range(r) -> bool:
-    iso = r.get("date_ymd")
-    if not iso:
-        return False
-    try:
-        d = dt.date.fromisoformat(iso)
-    except Exception:
-        return False
-    return (start_date <= d <= end_date)
-
-def pass_filters(r) -> bool:
-    rtier = r.get("tier")
-    if rtier not in sel_tiers:
-        return False
-    if rtier == "Tier_4":
-        if sel_rps is None:
-            return True
-        rp = r.get("return_period")
-        return (rp in sel_rps) if (rp is not None) else False
-    else:
-        if dr is None:
-            return True
-        return in_date_range(r)
-
 if apply_filters:
     ss.filters_changed = True
 
-filtered = [r for r in records if pass_filters(r)]
-filtered_ids = [str(r["id"]) for r in filtered]
-ids_key = fingerprint_ids(filtered_ids)
+filtered_rows, ids_key = cat_idx.filter(
+    sel_tiers,
+    date_range=None if dr is None else (ymd_int(start_date), ymd_int(end_date)),
+    return_periods=sel_rps,
+    search=search_idx.query_key(search_text, facet_sel, huc_prefix),
+)
+if huc_sel is not None and huc_limit:
+    in_huc = huc_tree.rows(huc_sel) if site_sel is None else huc_tree.site_rows(huc_sel, site_sel)
+    filtered_rows = filtered_rows[cat_idx.mask_of(in_huc)[filtered_rows]]
+    ids_key = f"{ids_key}|huc={huc_sel}|site={site_sel or ''}"
+if (huc_sel, site_sel, huc_sel is not None and huc_limit) != ss.get("huc_view"):
+    ss.huc_view = (huc_sel, site_sel, huc_sel is not None and huc_limit)
+    ss.filters_changed = True
 
 # Map helpers
 def feature_cap_by_zoom(zoom: float) -> int:
@@ -301,12 +255,42 @@ def feature_cap_by_zoom(zoom: float) -> int:
         return 30
     return BASE_FEATURE_CAP
 
-@st.fragment
-def render_map():
-    # Base map
+def latlng_key(lat: float, lon: float) -> Tuple[float, float]:
+    return round(float(lat), 5), round(float(lon), 5)
+
+def sync_view_from_map():
+    """Adopt the viewport the map last reported, so buttons and marker queries start from it."""
+    view = ss.get("fim_map") or {}
+    center, zoom = view.get("center"), view.get("zoom")
+    if not center or zoom is None or view == ss.get("view_synced"):
+        return
+    ss.view_synced = view
+    ss.saved_center = [float(center["lat"]), float(center["lng"])]
+    ss.saved_zoom = float(zoom)
+
+    # Clicking a cluster zooms to the level where it splits
+    clicked = view.get("last_object_clicked")
+    if clicked and clicked != ss.get("click_handled"):
+        ss.click_handled = clicked
+        target = ss.get("cluster_targets", {}).get(latlng_key(clicked["lat"], clicked["lng"]))
+        if target is not None:
+            ss.saved_center = [float(clicked["lat"]), float(clicked["lng"])]
+            ss.saved_zoom = float(target)
+
+def build_map_entry(
+    cell: ViewCell,
+    show_extents: bool,
+    render_mode: str = RENDER_MARKERS,
+    show_rasters: bool = False,
+) -> Dict[str, Any]:
+    """Build the folium map for one view cell and render it to a cacheable st_folium payload."""
+    zoom_level, area_bbox = cell[0], view_cell_bbox(cell)
+
+    # Base map: fixed home view so panning/zooming never changes the map script;
+    # the live view is driven through st_folium's center/zoom arguments.
     m = folium.Map(
-        location=ss.saved_center,
-        zoom_start=ss.saved_zoom,
+        location=HOME_CENTER,
+        zoom_start=HOME_ZOOM,
         tiles=None,
         control_scale=True,
         prefer_canvas=True
@@ -314,107 +298,69 @@ def render_map():
     bm = BASEMAPS[basemap_choice]
     folium.TileLayer(tiles=bm["tiles"], name=basemap_choice, control=False, attr=bm["attr"], show=True).add_to(m)
 
-    current_cap = feature_cap_by_zoom(float(ss.saved_zoom))
-
-    # Markers
-    def popup_html(r: dict) -> str:
-        tif_url = r.get("tif_url"); json_url = r.get("json_url")
-        fields = [
-            ("File Name", r.get("file_name")),
-            ("Resolution (m)", r.get("resolution_m")),
-            ("State", r.get("state")),
-            ("Description", r.get("description")),
-            ("River Basin Name", r.get("river_basin")),
-            ("Source", r.get("source")),
-            ("Date", r.get("date_ymd") or r.get("date_raw")),
-            ("Return Period (years)", r.get("return_period") if r.get("tier") == "Tier_4" else None),
-            ("Quality", r.get("quality")),
-        ]
-        rows = "".join(
-            f"<tr><th style='text-align:left;vertical-align:top;padding-right:8px'>{k}</th>"
-            f"<td style='text-align:left'>{'' if v is None else v}</td></tr>"
-            for k, v in fields
+    # Markers, sent as a dynamic feature group: marker updates do not re-mount the map
+    markers_fg = folium.FeatureGroup(name="Benchmark FIM Sites", show=True)
+    selected = cat_idx.mask_of(filtered_rows)
+    cluster_targets: Dict[Tuple[float, float], int] = {}
+    sites: List[Dict[str, Any]] = []
+    n_drawn = n_in_view = 0
+    if render_mode == RENDER_GEOJSON:
+        # One canvas layer is cheap per point: every selected site in view, no clusters, no cap
+        in_view = cat_idx.spatial.query(area_bbox)
+        sites = cat_idx.take(in_view[selected[in_view]])
+    elif zoom_level <= CLUSTER_MAX_ZOOM:
+        # Server-side clusters: payload scales with clusters on screen, not catalog size
+        cl_idx = cat_idx.clusters
+        in_view = cat_idx.spatial.query(cl_idx.aligned_bbox(area_bbox, zoom_level))
+        in_view = in_view[selected[in_view]]
+        for c in cl_idx.clusters(in_view, zoom_level):
+            if c["row"] is not None:
+                sites.append(records[c["row"]])
+            else:
+                cluster_targets[latlng_key(c["lat"], c["lon"])] = c["expand_zoom"]
+                cluster_marker(c).add_to(markers_fg)
+    else:
+        # Past the cluster hierarchy: individual sites in view, spread and ranked by priority
+        vis_rows, n_in_view = select_in_view(
+            cat_idx.spatial, selected, cat_idx.priority, area_bbox, feature_cap_by_zoom(zoom_level)
         )
-        refs = r.get("references") or []
-        refs_html = ""
-        if refs:
-            refs_html = "<div style='margin-top:6px'><b>References</b><div style='margin:4px 0;padding-left:12px'>"
-            for ref in refs:
-                refs_html += f"<div style='margin-bottom:6px'>{ref}</div>"
-            refs_html += "</div></div>"
-
-        buttons_html = ""
-        if tif_url:
-            buttons_html += f"""
-            <a href="{tif_url}" target="_blank" rel="noopener"
-               style="text-decoration:none;display:inline-block;background:#2563eb;color:#fff;
-                      padding:8px 10px;border-radius:6px;font-weight:600;margin-right:8px;">
-              ⬇ Download Benchmark FIM (.tif)
-            </a>"""
-        if json_url:
-            buttons_html += f"""
-            <a href="{json_url}" target="_blank" rel="noopener"
-               style="text-decoration:none;display:inline-block;background:#059669;color:#fff;
-                      padding:8px 10px;border-radius:6px;font-weight:600;">
-              ⬇ Download Metadata (.json)
-            </a>"""
-
-        return f"""
-        <div style="font-family:system-ui,-apple-system,Segoe UI,Roboto,Arial,sans-serif; font-size:13px; max-width:420px">
-            <table>{rows}</table>
-            {'<hr style="margin:6px 0" />' if refs_html or buttons_html else ''}
-            {refs_html}
-            {buttons_html}
-        </div>
-        """
-
-    markers_fg = MarkerCluster(
-        name="Benchmark FIM Sites",
-        show=True,
-        disableClusteringAtZoom=10
-    )
-    count = 0
-    for r in filtered:
-        if count >= current_cap:
-            break
-        lat = float(r.get("centroid_lat", 0))
-        lon = float(r.get("centroid_lon", 0))
-        color = TIER_COLORS.get(r.get("tier"), DEFAULT_TIER_COLOR)
-        folium.CircleMarker(
-            location=[lat, lon],
-            radius=8, color="black", weight=1.5, fill=True, fill_color=color, fill_opacity=0.9,
-            tooltip=f"{r.get('tier')} — {r.get('site')}",
-            popup=folium.Popup(popup_html(r), max_width=500),
-        ).add_to(markers_fg)
-        count += 1
-    markers_fg.add_to(m)
-
-    # Vector tiles hosting from s3
-    if ss.fim_show:
-        allowed_tiers = list(set(sel_tiers))
-        date_min = int((start_date or dt.date(1900,1,1)).strftime("%Y%m%d"))
-        date_max = int((end_date   or dt.date(2100,1,1)).strftime("%Y%m%d"))
+        sites = cat_idx.take(vis_rows)
+        n_drawn = len(vis_rows)
 
+    if render_mode == RENDER_GEOJSON:
+        # One FeatureCollection on a canvas renderer instead of one JS object per site
+        if sites:
+            markers_fg.add_child(SitePointLayer(sites, cat_idx.tiers, TIER_COLORS))
+    else:
+        for r in sites:
+            site_marker(r).add_to(markers_fg)
+
+    # Vector tiles hosting from s3; the tier/date filter is pushed separately (see render_map)
+    if show_extents:
         # Put the vector grid into a FeatureGroup so it appears in LayerControl
         vg_group = folium.FeatureGroup(name="Benchmark FIM Extents", show=True)
         vg = VectorGridProtobuf(
             tiles_url= "https://sdmlab.s3.amazonaws.com/FIM_Database/FIM_Viz/tiles/{z}/{x}/{y}.pbf",
             layer_name="fim_extents",
             max_native=14,
-            allowed_tiers=allowed_tiers,
-            date_min=date_min,
-            date_max=date_max
         )
         vg_group.add_child(vg)
         vg_group.add_to(m)
 
+    # Raster previews: unfiltered, so the map script (and loaded tiles) survive filter changes
+    if show_rasters:
+        folium.TileLayer(
+            tiles=RASTER_TILES_URL, name="Benchmark FIM Rasters", attr="SDML benchmark FIMs",
+            overlay=True, control=True, show=True, min_zoom=RASTER_MIN_ZOOM,
+        ).add_to(m)
+
     # Legend
     legend_items = "".join(
         f"<div style='display:flex;align-items:center;margin-bottom:6px'>"
         f"<span style='display:inline-block;width:16px;height:16px;background:{TIER_COLORS.get(t, DEFAULT_TIER_COLOR)};"
         f"border:1px solid #000;margin-right:8px'></span>"
         f"<span style='font-size:14px'>{t}</span></div>"
-        for t in sorted(set(r.get("tier") for r in filtered))
+        for t in cat_idx.tiers_in(filtered_rows)
     )
 
     legend_html = f"""
@@ -426,16 +372,57 @@ def render_map():
     """
     m.get_root().html.add_child(Element(legend_html))
 
-    folium.LayerControl(collapsed=False).add_to(m)
+    return {
+        "payload": map_payload(m, [markers_fg], folium.LayerControl(collapsed=False)),
+        "cluster_targets": cluster_targets,
+        "n_drawn": n_drawn,
+        "n_in_view": n_in_view,
+    }
+
+@st.fragment
+def render_map():
+    sync_view_from_map()
+    view_zoom = float(ss.saved_zoom)
+    view_bbox = bbox_from_leaflet((ss.get("fim_map") or {}).get("bounds")) \
+        or bbox_from_view(ss.saved_center, view_zoom, height_px=MAP_HEIGHT)
+    cell = view_cell(ss.saved_center, view_zoom, *viewport_px(view_bbox, view_zoom))
+
+    # Cache hit skips folium construction and rendering entirely. The extent filter is not
+    # part of the map script, so changing it keeps the mounted map and its loaded tiles.
+    cache_key = (catalog.key, ids_key, basemap_choice, cell, ss.fim_show, render_mode, ss.raster_show)
+    entry = get_render_cache().get_or_build(
+        cache_key, lambda: build_map_entry(cell, ss.fim_show, render_mode, ss.raster_show)
+    )
+    ss.cluster_targets = entry["cluster_targets"]
 
     # Render in Streamlit
-    st_folium(
-        m,
+    map_state = st_folium_payload(
+        entry["payload"],
         width=None,
-        height=720,
+        height=MAP_HEIGHT,
         key="fim_map",
-        returned_objects=[]
+        center=ss.saved_center,
+        zoom=ss.saved_zoom,
+        returned_objects=["bounds", "zoom", "center", "last_object_clicked", "last_object_clicked_popup"]
     )
+    if ss.fim_show:
+        # Restyle the live vector grid in place (setFeatureStyle) through the filter channel
+        components.html(filter_channel_html(extent_filter(
+            sel_tiers,
+            int((start_date or dt.date(1900,1,1)).strftime("%Y%m%d")),
+            int((end_date   or dt.date(2100,1,1)).strftime("%Y%m%d")),
+        )), height=0)
+    if entry["n_in_view"] > entry["n_drawn"]:
+        st.caption(f"Showing {entry['n_drawn']:,} of {entry['n_in_view']:,} sites in this area — zoom in to see the rest.")
+
+    # Details of the clicked site, rendered on demand from the per-id cache
+    picked = ((map_state or {}).get("last_object_clicked_popup") or "").strip()
+    row = cat_idx.row_of_id.get(picked)
+    if row is not None:
+        r = records[row]
+        with st.container(border=True):
+            st.markdown(f"**{r.get('tier')} — {r.get('site')}**")
+            st.html(detail_html(catalog.key, picked, r))
 
     if ss.filters_changed or not ss.map_built_once:
         ss.map_built_once = True
@@ -444,104 +431,36 @@ def render_map():
 render_map()
 
 #Render the table
-PLATFORM_BY_TIER = {
-    "Tier_1": "Hand Labeled Aerial Imagery",
-    "Tier_2": "Planet Satellite Imagery",
-    "Tier_3": "Sentinel-1 Imagery",
-    "Tier_4": "Synthetic HEC-RAS 1D",
-}
-
-def dash(x):
-    """Return a dash for empty values, else the value itself."""
-    if x is None:
-        return "–"
-    if isinstance(x, str) and x.strip() == "":
-        return "–"
-    return x
-
-def to_date_key(r: dict) -> int:
-    ets = r.get("event_ts")
-    if isinstance(ets, (int, float)) and int(ets) > 0:
-        return int(ets)
-    for k in ("event_date", "date_ymd"):
-        v = r.get(k)
-        if isinstance(v, str) and v:
-            try:
-                d = dt.date.fromisoformat(v)
-                return int(d.strftime("%Y%m%d"))
-            except Exception:
-                pass
-    v = r.get("date_raw")
-    if isinstance(v, (int, float)) and int(v) > 0:
-        return int(v)
-    if isinstance(v, str) and v.isdigit():
-        return int(v)
-    return 0
-
-def nice_date_and_year(r: dict) -> tuple[str, str]:
-    for k in ("event_date", "date_ymd"):
-        v = r.get(k)
-        if isinstance(v, str) and v:
-            try:
-                y = str(dt.date.fromisoformat(v).year)
-            except Exception:
-                y = v[:4] if len(v) >= 4 else ""
-            return v, y
-    raw = r.get("date_raw") or ""
-    if isinstance(raw, (int, float)):
-        raw = str(int(raw))
-    year = raw[:4] if isinstance(raw, str) and len(raw) >= 4 else ""
-    if isinstance(raw, str) and len(raw) == 8 and raw.isdigit():
-        disp = f"{raw[0:4]}-{raw[4:6]}-{raw[6:8]}"
-    else:
-        disp = raw if raw else ""
-    return disp, year
-
-def row_from_record(r: dict) -> dict:
-    date_disp, year = nice_date_and_year(r)
-    basin = r.get("basin")
-    if not basin:
-        basin = r.get("river_basin")
-    platform = PLATFORM_BY_TIER.get(r.get("tier"), "–")
-    return {
-        "River/Basin": dash(basin),
-        "State": dash(r.get("state")),
-        "Year": dash(year),
-        "Date": dash(date_disp),
-        "Resolution (m)": r.get("resolution_m") if isinstance(r.get("resolution_m"), (int, float)) else "–",
-        "HUC8": dash(r.get("huc8")),
-        "Quality": dash(r.get("quality") or r.get("tier")),
-        "Platform": platform,
-        "Download FIM (TIF)": dash(r.get("tif_url")),
-        "Metadata (JSON)": dash(r.get("json_url") or r.get("metadata_url")),
-        "_DateKey": to_date_key(r),  
-    }
-    
-table_rows = [row_from_record(r) for r in filtered]
-df_full = pd.DataFrame(table_rows)
-
-if not df_full.empty:
-    df_full = df_full.sort_values("_DateKey", ascending=False, kind="mergesort")
-    df_display = df_full.drop(columns=["_DateKey"])
-else:
-    df_display = df_full
-
-# Pagination
 ROWS_PER_PAGE = 50
 if "table_page" not in ss:
     ss.table_page = 0
 
-total_pages = max(1, (len(df_display) + ROWS_PER_PAGE - 1) // ROWS_PER_PAGE)
-start_idx = ss.table_page * ROWS_PER_PAGE
-end_idx = min(start_idx + ROWS_PER_PAGE, len(df_display))
-df_page = df_display.iloc[start_idx:end_idx]
-
-# Show current page
 st.markdown("# Benchmark FIM Records on Tabular View")
 st.write("")
 st.markdown("<hr style='border:0.5px solid rgba(44,127,184,0.35); margin:1rem 0;' />", unsafe_allow_html=True)
 st.write("")
 
+t1, t2, t3 = st.columns([3, 2, 1])
+with t1:
+    table_search = st.text_input("Search records", placeholder="Basin, state, HUC8, date, site…")
+with t2:
+    table_sort = st.selectbox("Sort by", SORTABLE_COLUMNS, index=0)
+with t3:
+    table_desc = st.toggle("Descending", value=True)
+
+# Built once per catalog; the sorted/searched view is cached per filter fingerprint
+rec_table  = cat_idx.table
+table_view = rec_table.view(filtered_rows, ids_key, table_sort, table_desc, table_search)
+
+view_key = (ids_key, table_sort, table_desc, table_search)
+if ss.get("table_view_key") != view_key:
+    ss.table_view_key = view_key
+    ss.table_page = 0
+
+total_pages = page_count(table_view, ROWS_PER_PAGE)
+ss.table_page = min(ss.table_page, total_pages - 1)
+df_page = rec_table.page(table_view, ss.table_page, ROWS_PER_PAGE)
+
 # dataframe styling
 st.markdown(
     """
@@ -586,7 +505,56 @@ with c3:
         ss.table_page += 1
         st.rerun()
 
-st.caption(f"Page {ss.table_page + 1} of {total_pages} — Showing {len(df_page):,} of {len(df_display):,} records")
+st.caption(f"Page {ss.table_page + 1} of {total_pages} — Showing {len(df_page):,} of {len(table_view):,} records")
+
+# Bulk download: the current table view as one zip, streamed to a temp file
+st.markdown("### Download selection")
+b1, b2, b3 = st.columns([1, 1, 2])
+with b1:
+    bulk_tif = st.checkbox("FIM rasters (TIF)", value=True)
+with b2:
+    bulk_json = st.checkbox("Metadata (JSON)", value=True)
+bulk_rows = table_view[:BULK_MAX_RECORDS]
+with b3:
+    if len(table_view) > BULK_MAX_RECORDS:
+        st.caption(
+            f"Only the first {BULK_MAX_RECORDS:,} records in table order are included; "
+            "use `python -m utilis.bulk_download` for larger exports."
+        )
+    st.caption(
+        f"Archives from the page are capped at {BULK_MAX_BYTES / 2**20:,.0f} MiB; files beyond that are listed "
+        "as skipped. Use `python -m utilis.bulk_download` for larger exports, it streams straight to disk."
+    )
+if st.button(f"Prepare zip of {len(bulk_rows):,} records", disabled=not len(bulk_rows) or not (bulk_tif or bulk_json)):
+    from utilis.bulk_download import ERRORS_NAME, items_for, stream_zip
+
+    bulk_items = items_for(records, bulk_rows, include_tif=bulk_tif, include_json=bulk_json)
+    bar = st.progress(0.0, text=f"Downloading {len(bulk_items):,} files…")
+    def bulk_progress(done: int, total: int, nbytes: int, name: str):
+        bar.progress(done / total, text=f"{done:,}/{total:,} files, {nbytes / 2**20:,.1f} MiB — {name}")
+
+    ss.pop("bulk_zip", None)
+    # anonymous temp file: removed on close, whatever happens to the session
+    with tempfile.TemporaryFile(prefix="fim_selection_", suffix=".zip") as tmp:
+        bulk_res = stream_zip(bulk_items, tmp, progress=bulk_progress, max_bytes=BULK_MAX_BYTES)
+        tmp.seek(0)
+        ss.bulk_zip = tmp.read()
+    bar.progress(1.0, text=f"{bulk_res.files:,} files, {bulk_res.bytes / 2**20:,.1f} MiB in {bulk_res.seconds:.1f} s")
+    over_cap = sum(1 for _, msg in bulk_res.failed if "archive limit" in msg)
+    if over_cap:
+        st.warning(
+            f"{over_cap:,} file(s) did not fit the {BULK_MAX_BYTES / 2**20:,.0f} MiB page limit; "
+            "use `python -m utilis.bulk_download` for the full selection."
+        )
+    if len(bulk_res.failed) > over_cap:
+        st.warning(f"{len(bulk_res.failed) - over_cap:,} file(s) could not be downloaded; see {ERRORS_NAME} in the archive.")
+
+if ss.get("bulk_zip"):
+    # handed over once: the click drops the archive from the session
+    st.download_button(
+        "Download zip", data=ss.bulk_zip, file_name="fim_selection.zip", mime="application/zip",
+        on_click=lambda: ss.pop("bulk_zip", None),
+    )
 
 
 # MAP ACTIONS
@@ -597,14 +565,17 @@ with st.sidebar:
         if st.button("Zoom −", use_container_width=True):
             ss.saved_zoom = max(2.0, float(ss.saved_zoom) - 1.0)
             ss.filters_changed = True
+            st.rerun()
     with colB:
         if st.button("Zoom +", use_container_width=True):
             ss.saved_zoom = min(18.0, float(ss.saved_zoom) + 1.0)
             ss.filters_changed = True
+            st.rerun()
 
     if st.button("Center on USA", use_container_width=True):
-        ss.saved_center = [39.8283, -98.5795]
-        ss.saved_zoom = 5.0
+        ss.saved_center = list(HOME_CENTER)
+        ss.saved_zoom = HOME_ZOOM
         ss.filters_changed = True
+        st.rerun()
 
 
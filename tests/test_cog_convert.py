@@ -0,0 +1,78 @@
+"""
+End-to-end check of fim_viz/cog_convert.py on a synthetic GeoTIFF (offline mode).
+
+Needs rasterio (pip install -r requirements-raster.txt); skipped otherwise.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+rasterio = pytest.importorskip("rasterio")
+np = pytest.importorskip("numpy")
+from rasterio.transform import Affine  # noqa: E402
+
+ROOT = Path(__file__).resolve().parents[1]
+SCRIPT = ROOT / "fim_viz" / "cog_convert.py"
+PREFIX = "FIM_Database/Tier_1/site_a"
+NAME = "BM_site_a.tif"
+
+def _write_geotiff(path: Path, size: int = 1200):
+    data = np.zeros((size, size), dtype="uint8")
+    data[size // 4: 3 * size // 4, size // 3: 2 * size // 3] = 1    # a flooded block
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with rasterio.open(
+        path, "w", driver="GTiff", width=size, height=size, count=1, dtype="uint8",
+        crs="EPSG:4326", transform=Affine(1e-4, 0.0, -95.0, 0.0, -1e-4, 30.0), nodata=255,
+    ) as ds:
+        ds.write(data, 1)
+
+def _run(tmp: Path, catalog: Path, manifest: Path) -> str:
+    proc = subprocess.run(
+        [sys.executable, str(SCRIPT), "--catalog", str(catalog), "--manifest", str(manifest),
+         "--src-root", str(tmp / "mirror"), "--out-root", str(tmp / "cogs"), "--workers", "1"],
+        capture_output=True, text=True, timeout=300,
+    )
+    assert proc.returncode == 0, proc.stdout + proc.stderr
+    return proc.stdout
+
+def test_convert_writes_manifest_and_records(tmp_path: Path):
+    src = tmp_path / "mirror" / PREFIX / NAME
+    _write_geotiff(src)
+    catalog = tmp_path / "catalog_core.json"
+    catalog.write_text(json.dumps({"records": [{"s3_prefix": PREFIX + "/", "file_name": NAME}]}))
+    manifest = tmp_path / "cog_manifest.json"
+
+    _run(tmp_path, catalog, manifest)
+
+    man = json.loads(manifest.read_text())
+    assert man["version"] == 1
+    key = f"{PREFIX}/{NAME}"
+    entry = man["entries"][key]
+    checksum = "sha256:" + hashlib.sha256(src.read_bytes()).hexdigest()
+    assert entry["status"] == "ok", entry.get("error")
+    assert entry["checksum"] == checksum
+    assert entry["cog_key"] == f"{PREFIX}/cog/{NAME}"
+    assert entry["blocksize"] == [512, 512]
+    assert entry["overviews"] and entry["overviews"][0] == 2
+    assert entry["options"]["COMPRESS"] == "DEFLATE"
+
+    cog = tmp_path / "cogs" / entry["cog_key"]
+    assert cog.is_file() and cog.stat().st_size == entry["bytes"]
+    with rasterio.open(cog) as ds:
+        assert ds.read(1)[600, 600] == 1
+
+    rec = json.loads(catalog.read_text())["records"][0]
+    assert rec["cog_status"] == "ok"
+    assert rec["cog_url"].startswith("file://") and rec["cog_url"].endswith(entry["cog_key"])
+    assert rec["cog_checksum"] == checksum
+    assert rec["cog_overviews"] == entry["overviews"]
+
+    # unchanged source: nothing is converted the second time
+    out = _run(tmp_path, catalog, manifest)
+    assert "0 to convert, 1 unchanged (skipped)" in out
+    assert json.loads(manifest.read_text())["entries"][key]["converted_at"] == entry["converted_at"]
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Bulk export of catalog files (FIM .tif + metadata .json) as one zip archive.
+
+Files are fetched concurrently (bounded by `workers`) and streamed into the zip
+chunk by chunk: each in-flight download holds at most `queue_chunks` chunks, so
+memory stays bounded no matter how large the files are. Entries are written in
+the order downloads start responding; a file that fails is left out (or, if it
+fails mid-stream, truncated) and listed in `_download_errors.txt`.
+
+The page uses `stream_zip`; the same engine runs from the command line.
+
+USAGE (examples):
+python -m utilis.bulk_download --tier Tier_1 --date-from 2019-01-01 --out tier1.zip
+python -m utilis.bulk_download --huc 0302 --no-json --workers 16 --out neuse.zip
+python -m utilis.bulk_download --base-url http://127.0.0.1:8000 --out local.zip   # local S3 stand-in
+"""
+from __future__ import annotations
+import argparse
+import datetime as dt
+import queue
+import re
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO, Callable, Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Union
+
+import requests
+
+from utilis.record_store import column
+from utilis.s3_client import S3HttpSession, get_session, stats
+
+DEFAULT_WORKERS = 8
+CHUNK_SIZE = 1 << 20        # 1 MiB
+QUEUE_CHUNKS = 4            # per in-flight file
+DEFAULT_TIMEOUT_S = 60
+ERRORS_NAME = "_download_errors.txt"
+
+# already-compressed payloads are stored, everything else deflated
+_STORED_SUFFIXES = (".tif", ".tiff", ".zip", ".gz", ".png", ".jpg", ".jpeg")
+
+class DownloadItem(NamedTuple):
+    url: str
+    arcname: str
+
+class BulkResult(NamedTuple):
+    files: int
+    bytes: int
+    failed: List[tuple]     # (arcname, message)
+    seconds: float
+
+# Progress callback: (files finished, files total, bytes written, current arcname)
+Progress = Callable[[int, int, int, str], None]
+
+_DONE = object()
+
+# HELPERS
+def _basename(url: str) -> str:
+    return url.split("?", 1)[0].rstrip("/").rsplit("/", 1)[-1]
+
+def items_for(
+    records: Sequence[Mapping[str, Any]],
+    rows: Optional[Iterable[int]] = None,
+    include_tif: bool = True,
+    include_json: bool = True,
+) -> List[DownloadItem]:
+    """Download items for `rows` of `records` (all when None), as <tier>/<site>/<file>; duplicates dropped."""
+    cols = {f: column(records, f) for f in ("tier", "site", "tif_url", "json_url", "metadata_url")}
+    seen: Dict[str, str] = {}
+    names = set()
+    out: List[DownloadItem] = []
+    for i in (range(len(records)) if rows is None else rows):
+        urls = []
+        if include_tif:
+            urls.append(cols["tif_url"][i])
+        if include_json:
+            urls.append(cols["json_url"][i] or cols["metadata_url"][i])
+        folder = f"{cols['tier'][i] or 'Unknown'}/{cols['site'][i] or 'unknown_site'}"
+        for url in urls:
+            if not url or url in seen:
+                continue
+            name = f"{folder}/{_basename(url)}"
+            while name in names:
+                stem, dot, ext = name.rpartition(".")
+                name = f"{stem}_dup.{ext}" if dot else f"{name}_dup"
+            seen[url] = name
+            names.add(name)
+            out.append(DownloadItem(url, name))
+    return out
+
+def _compression(arcname: str) -> int:
+    return zipfile.ZIP_STORED if arcname.lower().endswith(_STORED_SUFFIXES) else zipfile.ZIP_DEFLATED
+
+# PUBLIC: streaming zip engine
+def stream_zip(
+    items: Sequence[DownloadItem],
+    out: Union[str, BinaryIO],
+    workers: int = DEFAULT_WORKERS,
+    chunk_size: int = CHUNK_SIZE,
+    queue_chunks: int = QUEUE_CHUNKS,
+    timeout: float = DEFAULT_TIMEOUT_S,
+    progress: Optional[Progress] = None,
+    session: Optional[requests.Session] = None,
+    max_bytes: Optional[int] = None,
+) -> BulkResult:
+    """
+    Download `items` with up to `workers` concurrent requests and write them into
+    the zip `out` (path or writable binary file) as chunks arrive.
+
+    With `max_bytes`, files that would push the archive payload past it are
+    skipped (listed in the error file) instead of downloaded.
+
+    Runs the zip writer in the calling thread, so `progress` may touch UI state.
+    """
+    t0 = time.perf_counter()
+    sess = session
+    if sess is None:
+        sess = S3HttpSession(max_pool=workers)
+
+    # one message per item: (item, chunk queue) once the response is open, or (item, error)
+    ready: "queue.Queue[tuple]" = queue.Queue()
+    stop = threading.Event()
+
+    def put(q: queue.Queue, x: Any, skip: Optional[threading.Event] = None) -> bool:
+        while not stop.is_set() and not (skip is not None and skip.is_set()):
+            try:
+                q.put(x, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def fetch(item: DownloadItem):
+        chunks: Optional[queue.Queue] = None
+        try:
+            if stop.is_set():
+                raise RuntimeError("cancelled")
+            with sess.get(item.url, stream=True, timeout=timeout) as resp:
+                if resp.status_code != 200:
+                    raise RuntimeError(f"HTTP {resp.status_code}")
+                chunks = queue.Queue(maxsize=queue_chunks)
+                skip = threading.Event()   # set by the writer to drop this file
+                size = int(resp.headers.get("Content-Length") or 0) or None
+                ready.put((item, (chunks, size, skip)))
+                for chunk in resp.iter_content(chunk_size):
+                    if chunk and not put(chunks, chunk, skip):
+                        return
+                put(chunks, _DONE, skip)
+        except Exception as e:   # surfaced to the writer, which owns the error list
+            msg = str(e) if isinstance(e, RuntimeError) else f"{type(e).__name__}: {e}"
+            if chunks is None:
+                ready.put((item, msg))
+            else:
+                put(chunks, RuntimeError(msg))
+
+    failed: List[tuple] = []
+    n_files = n_bytes = 0
+    pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="bulk-dl")
+    try:
+        for item in items:
+            pool.submit(fetch, item)
+        with zipfile.ZipFile(out, "w", allowZip64=True) as zf:
+            for done in range(1, len(items) + 1):
+                item, src = ready.get()
+                if not isinstance(src, str) and max_bytes is not None and n_bytes + (src[1] or 0) > max_bytes:
+                    src[2].set()   # (chunks, size, skip): drop it before any byte is written
+                    src = f"skipped: archive limit of {max_bytes / 2**20:,.0f} MiB"
+                if isinstance(src, str):
+                    failed.append((item.arcname, src))
+                else:
+                    chunks, _, skip = src
+                    info = zipfile.ZipInfo(item.arcname, date_time=time.localtime()[:6])
+                    info.compress_type = _compression(item.arcname)
+                    complete = False
+                    with zf.open(info, "w", force_zip64=True) as dst:
+                        while True:
+                            chunk = chunks.get()
+                            if chunk is _DONE:
+                                complete = True
+                                break
+                            if isinstance(chunk, Exception):
+                                failed.append((item.arcname, f"truncated: {chunk}"))
+                                break
+                            if max_bytes is not None and n_bytes + len(chunk) > max_bytes:
+                                # no Content-Length up front: cut the entry at the limit
+                                skip.set()
+                                failed.append((item.arcname, f"truncated: archive limit of {max_bytes / 2**20:,.0f} MiB"))
+                                break
+                            dst.write(chunk)
+                            n_bytes += len(chunk)
+                    n_files += complete
+                if progress is not None:
+                    progress(done, len(items), n_bytes, item.arcname)
+            if failed:
+                zf.writestr(ERRORS_NAME, "".join(f"{name}\t{msg}\n" for name, msg in failed))
+    finally:
+        # releases workers blocked on a full queue if the writer stopped early
+        stop.set()
+        pool.shutdown(wait=True, cancel_futures=True)
+        if session is None:
+            sess.close()
+    return BulkResult(n_files, n_bytes, failed, time.perf_counter() - t0)
+
+# CLI
+_S3_HOST_RE = re.compile(r"^https?://[^/]+\.amazonaws\.com")
+
+def _parse_date(s: Optional[str]) -> Optional[int]:
+    return int(dt.date.fromisoformat(s).strftime("%Y%m%d")) if s else None
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Download filtered FIMs from the catalog as one zip archive.")
+    p.add_argument("--catalog-url", default="https://sdmlab.s3.amazonaws.com/FIM_Database/FIM_Viz/catalog_core.json")
+    p.add_argument("--out", required=True, help="Output .zip path")
+    p.add_argument("--tier", nargs="*", default=None, help="Tiers to include (default: all)")
+    p.add_argument("--date-from", default=None, help="YYYY-MM-DD (non-synthetic tiers)")
+    p.add_argument("--date-to", default=None, help="YYYY-MM-DD (non-synthetic tiers)")
+    p.add_argument("--search", default="", help="Description / file name text")
+    p.add_argument("--huc", default="", help="HUC code prefix (any level)")
+    p.add_argument("--no-tif", action="store_true")
+    p.add_argument("--no-json", action="store_true")
+    p.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    p.add_argument("--base-url", default=None,
+                   help="Replace https://<bucket>.s3.amazonaws.com in file URLs (e.g. a local S3 stand-in)")
+    p.add_argument("--limit", type=int, default=None, help="Only the first N matching records")
+    return p.parse_args()
+
+def main():
+    from utilis.catalog_index import CatalogIndex
+    from utilis.record_store import RecordStore, bucket_of
+
+    args = parse_args()
+    resp = get_session().get(args.catalog_url, timeout=DEFAULT_TIMEOUT_S)
+    resp.raise_for_status()
+    records = RecordStore(resp.json().get("records", []), bucket_of(args.catalog_url))
+    idx = CatalogIndex(records)
+
+    date_range = None
+    if args.date_from or args.date_to:
+        date_range = (_parse_date(args.date_from) or 0, _parse_date(args.date_to) or 99999999)
+    rows, _ = idx.filter(
+        args.tier or idx.tiers, date_range=date_range,
+        search=idx.search.query_key(args.search, None, args.huc),
+    )
+    rows = rows[:args.limit] if args.limit else rows
+    items = items_for(records, rows, include_tif=not args.no_tif, include_json=not args.no_json)
+    if args.base_url:
+        base = args.base_url.rstrip("/")
+        items = [DownloadItem(_S3_HOST_RE.sub(base, it.url, count=1), it.arcname) for it in items]
+    print(f"[INFO] {len(rows):,} records matched → {len(items):,} files", flush=True)
+
+    last = [0.0]
+    def report(done: int, total: int, nbytes: int, name: str):
+        now = time.perf_counter()
+        if done == total or now - last[0] >= 1.0:
+            last[0] = now
+            print(f"[INFO] {done:,}/{total:,} files, {nbytes / 2**20:,.1f} MiB — {name}", flush=True)
+
+    res = stream_zip(items, args.out, workers=args.workers, progress=report)
+    print(f"[INFO] Wrote {args.out}: {res.files:,} files, {res.bytes / 2**20:,.1f} MiB in {res.seconds:.1f} s", flush=True)
+    for name, msg in res.failed:
+        print(f"[WARN] {name}: {msg}", flush=True)
+    s = stats()
+    print(f"[INFO] S3: {s['requests']:,} requests, {s['retries']:,} retries, {s['throttles']:,} throttled", flush=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+from __future__ import annotations
+import datetime as dt
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import cached_property
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import streamlit as st
+
+from utilis.clustering import ClusterIndex
+from utilis.huc_index import HucTree
+from utilis.record_store import column
+from utilis.record_table import RecordTable
+from utilis.search_index import SearchIndex, SearchQuery
+from utilis.spatial_index import GridIndex
+
+SYNTHETIC_TIER = "Tier_4"
+UNKNOWN_TIER   = "Unknown_Tier"
+FILTER_CACHE_SIZE = 64
+
+# HELPERS
+def _date_key(iso: Any, ets: Any) -> int:
+    """YYYYMMDD int for a record's flood date, 0 when missing or unparsable."""
+    if isinstance(iso, str) and iso:
+        try:
+            return int(dt.date.fromisoformat(iso).strftime("%Y%m%d"))
+        except ValueError:
+            return 0
+    if isinstance(ets, (int, float)) and int(ets) > 0:
+        return int(ets)
+    return 0
+
+def ymd_int(d: Optional[dt.date]) -> Optional[int]:
+    return int(d.strftime("%Y%m%d")) if d is not None else None
+
+def ymd_date(v: int) -> dt.date:
+    return dt.date(v // 10000, (v // 100) % 100, v % 100)
+
+# COLUMNAR INDEX
+class CatalogIndex:
+    """
+    Columnar view over the catalog records, built once per catalog load.
+
+    Columns (one row per record, same order as `records`):
+        tier_code      int16   index into `tiers`
+        event_ts       int32   YYYYMMDD, 0 when missing
+        return_period  int32   years, 0 when missing
+        lat, lon       float64 centroid
+        priority       int64   display rank (newest flood first, then id)
+
+    Filters are boolean-mask operations; results are cached per filter tuple.
+    """
+    def __init__(self, records: Sequence[Dict[str, Any]]):
+        self.records = records
+        n = len(records)
+
+        tier_col = column(records, "tier", UNKNOWN_TIER)
+        self.tiers: List[str] = sorted(set(tier_col))
+        code_of = {t: i for i, t in enumerate(self.tiers)}
+        self.tier_code = np.fromiter((code_of[t] for t in tier_col), dtype=np.int16, count=n)
+        iso = [a or b for a, b in zip(column(records, "date_ymd"), column(records, "event_date"))]
+        self.event_ts = np.fromiter(
+            (_date_key(a, b) for a, b in zip(iso, column(records, "event_ts"))), dtype=np.int32, count=n
+        )
+        self.return_period = np.fromiter(
+            (int(v) if v is not None else 0 for v in column(records, "return_period")),
+            dtype=np.int32, count=n,
+        )
+        self.lat = np.fromiter((float(v or 0) for v in column(records, "centroid_lat")), dtype=np.float64, count=n)
+        self.lon = np.fromiter((float(v or 0) for v in column(records, "centroid_lon")), dtype=np.float64, count=n)
+        self.ids = [str(v if v is not None else i) for i, v in enumerate(column(records, "id"))]
+
+        # deterministic marker priority: dated events newest first, then by id
+        id_rank = np.argsort(np.argsort(np.asarray(self.ids, dtype=object), kind="stable"), kind="stable")
+        order = np.lexsort((id_rank, -self.event_ts.astype(np.int64)))
+        self.priority = np.empty(n, dtype=np.int64)
+        self.priority[order] = np.arange(n)
+
+        self.synthetic_code = code_of.get(SYNTHETIC_TIER, -1)
+        is_synth = self.tier_code == self.synthetic_code
+
+        dated = self.event_ts[(~is_synth) & (self.event_ts > 0)]
+        self.date_min: Optional[int] = int(dated.min()) if dated.size else None
+        self.date_max: Optional[int] = int(dated.max()) if dated.size else None
+
+        rps = self.return_period[is_synth & (self.return_period > 0)]
+        self.return_periods: List[int] = [int(v) for v in np.unique(rps)]
+
+        self._catalog_digest = hashlib.sha1("\n".join(self.ids).encode("utf-8")).digest()
+        self._cache: "OrderedDict[tuple, Tuple[np.ndarray, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def _mask(
+        self,
+        tiers: Tuple[str, ...],
+        date_range: Optional[Tuple[int, int]],
+        return_periods: Optional[Tuple[int, ...]],
+        search: Optional[SearchQuery] = None,
+    ) -> np.ndarray:
+        codes = [self.tiers.index(t) for t in tiers if t in self.tiers]
+        in_tier = np.isin(self.tier_code, np.asarray(codes, dtype=np.int16))
+        is_synth = self.tier_code == self.synthetic_code
+
+        if return_periods is None:
+            synth_ok = np.ones(len(self), dtype=bool)
+        else:
+            synth_ok = np.isin(self.return_period, np.asarray(return_periods, dtype=np.int32)) & (self.return_period > 0)
+
+        if date_range is None:
+            dated_ok = np.ones(len(self), dtype=bool)
+        else:
+            lo, hi = date_range
+            dated_ok = (self.event_ts > 0) & (self.event_ts >= lo) & (self.event_ts <= hi)
+
+        mask = in_tier & np.where(is_synth, synth_ok, dated_ok)
+        hits = self.search.mask(search) if search is not None else None
+        return mask if hits is None else mask & hits
+
+    def filter(
+        self,
+        tiers: Iterable[str],
+        date_range: Optional[Tuple[int, int]] = None,
+        return_periods: Optional[Iterable[int]] = None,
+        search: Optional[SearchQuery] = None,
+    ) -> Tuple[np.ndarray, str]:
+        """
+        Row positions passing the filters plus a fingerprint of that selection.
+
+        Same semantics as the page's former per-record filter:
+          - tier must be selected,
+          - Tier_4 rows are filtered by return period (None = no filter),
+          - other rows by YYYYMMDD date range (None = no filter; undated rows fail),
+          - `search` (SearchIndex.query_key) narrows further by facets, HUC and text.
+        """
+        key = (
+            tuple(sorted(set(tiers))),
+            None if date_range is None else (int(date_range[0]), int(date_range[1])),
+            None if return_periods is None else tuple(sorted({int(v) for v in return_periods})),
+            None if search is None or self.search.is_empty(search) else search,
+        )
+        with self._lock:
+            hit = self._cache.get(key)
+            if hit is not None:
+                self._cache.move_to_end(key)
+                return hit
+
+        rows = np.flatnonzero(self._mask(*key))
+        fp = hashlib.sha1(self._catalog_digest + rows.astype(np.int64).tobytes()).hexdigest()
+        with self._lock:
+            self._cache[key] = (rows, fp)
+            while len(self._cache) > FILTER_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return rows, fp
+
+    @cached_property
+    def spatial(self) -> GridIndex:
+        return GridIndex(self.lat, self.lon)
+
+    @cached_property
+    def clusters(self) -> ClusterIndex:
+        return ClusterIndex(self.lat, self.lon, self.tier_code, self.tiers)
+
+    @cached_property
+    def search(self) -> SearchIndex:
+        return SearchIndex(self.records)
+
+    @cached_property
+    def huc(self) -> HucTree:
+        return HucTree(self.records, self.lat, self.lon)
+
+    @cached_property
+    def table(self) -> RecordTable:
+        return RecordTable(self.records)
+
+    @cached_property
+    def row_of_id(self) -> Dict[str, int]:
+        return {rid: i for i, rid in enumerate(self.ids)}
+
+    def mask_of(self, rows: np.ndarray) -> np.ndarray:
+        m = np.zeros(len(self), dtype=bool)
+        m[rows] = True
+        return m
+
+    def take(self, rows: np.ndarray) -> List[Dict[str, Any]]:
+        return [self.records[i] for i in rows]
+
+    def tiers_in(self, rows: np.ndarray) -> List[str]:
+        return [self.tiers[c] for c in np.unique(self.tier_code[rows])]
+
+# PUBLIC: shared index
+@st.cache_resource(show_spinner=False, max_entries=4)
+def get_catalog_index(catalog_key: str, _records: Sequence[Dict[str, Any]]) -> CatalogIndex:
+    """
+    Cached: one CatalogIndex per catalog_key, shared by every session.
+    `_records` is not hashed; callers must change `catalog_key` when the catalog changes.
+    """
+    return CatalogIndex(_records)
@@ -0,0 +1,74 @@
+from __future__ import annotations
+import hashlib
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import streamlit as st
+
+from utilis.http_cache import DEFAULT_MAX_AGE_S, get_fetcher
+from utilis.record_store import RecordStore, bucket_of
+
+# IMMUTABLE CATALOG
+class Catalog:
+    """
+    One loaded version of catalog_core.json, shared read-only by every session.
+
+    `version` is a process-wide counter bumped whenever a new body is loaded;
+    `key` identifies the content and keys every derived cache (indexes, popups, maps).
+    """
+    __slots__ = ("records", "errors", "key", "version", "updated_at")
+
+    def __init__(self, core: Dict[str, Any], key: str, version: int):
+        self.records: RecordStore = core["records"]
+        self.errors: Tuple[Any, ...] = tuple(core.get("errors", []))
+        self.updated_at: str = str(core.get("updated_at", ""))
+        self.key = key
+        self.version = version
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+# STORE
+class CatalogStore:
+    """
+    Holds the current Catalog for one URL. Sessions keep only `catalog.version`
+    and compare it with `store.version` to notice a reload done by anyone.
+    """
+    def __init__(self, url: str, max_age: float = DEFAULT_MAX_AGE_S):
+        self.url = url
+        self.max_age = max_age
+        self.version = 0
+        self._catalog: Optional[Catalog] = None
+        self._lock = threading.Lock()
+
+    def _compact(self, core: Dict[str, Any]) -> Dict[str, Any]:
+        """Keep records as a RecordStore; the parsed dicts are dropped after this."""
+        return {**core, "records": RecordStore(core.get("records", []), bucket_of(self.url))}
+
+    def _load(self, force: bool) -> Tuple[Catalog, bool]:
+        fetched = get_fetcher().get_json(self.url, max_age=self.max_age, force=force, transform=self._compact)
+        with self._lock:
+            cur = self._catalog
+            if cur is not None and not fetched.changed:
+                return cur, False
+            core = fetched.data
+            key = hashlib.sha1(
+                f"{self.url}|{fetched.version}|{core.get('updated_at', '')}|{len(core.get('records', []))}".encode("utf-8")
+            ).hexdigest()
+            if cur is not None and cur.key == key:
+                return cur, False
+            self.version += 1
+            self._catalog = Catalog(core, key, self.version)
+            return self._catalog, True
+
+    def current(self) -> Catalog:
+        """The shared catalog; revalidated against the server once `max_age` has passed."""
+        return self._load(force=False)[0]
+
+    def reload(self) -> Tuple[Catalog, bool]:
+        """Revalidate now. Returns (catalog, changed); an unchanged catalog keeps its version."""
+        return self._load(force=True)
+
+@st.cache_resource(show_spinner=False)
+def get_catalog_store(url: str, max_age: float = DEFAULT_MAX_AGE_S) -> CatalogStore:
+    return CatalogStore(url, max_age)
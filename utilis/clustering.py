@@ -0,0 +1,115 @@
+from __future__ import annotations
+import math
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+from utilis.spatial_index import BBox
+
+CLUSTER_MAX_ZOOM = 16   # beyond this every site is drawn individually
+CELL_PX = 64            # cluster radius in screen pixels (4 cells per 256 px tile)
+_CELL_BITS = int(math.log2(256 // CELL_PX))
+_LEAF_BITS = CLUSTER_MAX_ZOOM + _CELL_BITS
+
+# HELPERS
+def _mercator_xy(lat: np.ndarray, lon: np.ndarray):
+    """Normalized Web Mercator in [0, 1)."""
+    x = (np.asarray(lon, dtype=np.float64) + 180.0) / 360.0
+    s = np.sin(np.radians(np.clip(np.asarray(lat, dtype=np.float64), -85.05112878, 85.05112878)))
+    y = 0.5 - np.log((1 + s) / (1 - s)) / (4 * np.pi)
+    return np.clip(x, 0.0, 1.0 - 1e-12), np.clip(y, 0.0, 1.0 - 1e-12)
+
+def _cell_lat(cy: int, bits: int) -> float:
+    n = math.pi - 2.0 * math.pi * cy / (1 << bits)
+    return math.degrees(math.atan(math.sinh(n)))
+
+def _bit_length(v: np.ndarray) -> np.ndarray:
+    out = np.zeros(v.shape, dtype=np.int64)
+    nz = v > 0
+    out[nz] = np.floor(np.log2(v[nz])).astype(np.int64) + 1
+    return out
+
+# CLUSTER INDEX
+class ClusterIndex:
+    """
+    Supercluster-style point hierarchy over catalog centroids for zoom 0..CLUSTER_MAX_ZOOM.
+
+    Each point gets one leaf cell (CELL_PX-sized cells at CLUSTER_MAX_ZOOM). Cells nest
+    exactly between zooms, so the cluster of a point at zoom z is its leaf cell shifted
+    right by (CLUSTER_MAX_ZOOM - z): the whole hierarchy is two int64 columns, and a
+    filtered/viewport query is a vectorized group-by over the visible rows only.
+    """
+    def __init__(self, lat: np.ndarray, lon: np.ndarray, tier_code: np.ndarray, tiers: Sequence[str]):
+        self.lat = lat
+        self.lon = lon
+        self.tier_code = tier_code
+        self.tiers = list(tiers)
+        x, y = _mercator_xy(lat, lon)
+        self.cx = np.floor(x * (1 << _LEAF_BITS)).astype(np.int64)
+        self.cy = np.floor(y * (1 << _LEAF_BITS)).astype(np.int64)
+
+    @staticmethod
+    def level(zoom: float) -> int:
+        return int(min(max(math.floor(zoom), 0), CLUSTER_MAX_ZOOM))
+
+    def aligned_bbox(self, bbox: BBox, zoom: float) -> BBox:
+        """Grow bbox outward to cluster-cell edges so edge clusters keep all their members."""
+        bits = self.level(zoom) + _CELL_BITS
+        south, west, north, east = bbox
+        (x0, x1), (y1, y0) = _mercator_xy([south, north], [west, east])
+        n = 1 << bits
+        cx0, cx1 = math.floor(x0 * n), math.floor(x1 * n) + 1
+        cy0, cy1 = math.floor(y0 * n), math.floor(y1 * n) + 1
+        return (
+            _cell_lat(cy1, bits), max(cx0 / n * 360.0 - 180.0, -180.0),
+            _cell_lat(cy0, bits), min(cx1 / n * 360.0 - 180.0, 180.0),
+        )
+
+    def clusters(self, rows: np.ndarray, zoom: float) -> List[Dict[str, Any]]:
+        """
+        Aggregate `rows` into clusters at `zoom`.
+
+        Returns one dict per cluster:
+            lat, lon       member centroid
+            count          number of sites
+            tiers          {tier: count}
+            expand_zoom    zoom at which the cluster first splits (CLUSTER_MAX_ZOOM + 1 if never)
+            row            the record row for single-site clusters, else None
+        """
+        if rows.size == 0:
+            return []
+        z = self.level(zoom)
+        shift = CLUSTER_MAX_ZOOM - z
+        cx, cy = self.cx[rows], self.cy[rows]
+        key = ((cx >> shift) << (_LEAF_BITS + 1)) | (cy >> shift)
+        order = np.argsort(key, kind="stable")
+        key, rows, cx, cy = key[order], rows[order], cx[order], cy[order]
+        starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+
+        count = np.diff(np.r_[starts, key.size])
+        lat = np.add.reduceat(self.lat[rows], starts) / count
+        lon = np.add.reduceat(self.lon[rows], starts) / count
+
+        # first zoom where members fall in different cells: highest differing leaf bit
+        spread = np.maximum(
+            _bit_length(np.maximum.reduceat(cx, starts) ^ np.minimum.reduceat(cx, starts)),
+            _bit_length(np.maximum.reduceat(cy, starts) ^ np.minimum.reduceat(cy, starts)),
+        )
+        expand = np.where(spread > 0, CLUSTER_MAX_ZOOM - spread + 1, CLUSTER_MAX_ZOOM + 1)
+
+        n_tiers = len(self.tiers)
+        group = np.repeat(np.arange(starts.size), count)
+        per_tier = np.bincount(group * n_tiers + self.tier_code[rows], minlength=starts.size * n_tiers)
+        per_tier = per_tier.reshape(starts.size, n_tiers)
+
+        out = []
+        for i in range(starts.size):
+            out.append({
+                "lat": float(lat[i]),
+                "lon": float(lon[i]),
+                "count": int(count[i]),
+                "tiers": {self.tiers[t]: int(c) for t, c in enumerate(per_tier[i]) if c},
+                "expand_zoom": int(expand[i]),
+                "row": int(rows[starts[i]]) if count[i] == 1 else None,
+            })
+        return out
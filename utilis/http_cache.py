@@ -0,0 +1,117 @@
+from __future__ import annotations
+import hashlib
+import threading
+import time
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+import streamlit as st
+
+from utilis.s3_client import get_session
+
+DEFAULT_MAX_AGE_S = 86400
+DEFAULT_TIMEOUT_S = 120
+
+# br is only decoded by urllib3 when a brotli package is installed
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "gzip, br"
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = "gzip, br"
+    except ImportError:
+        ACCEPT_ENCODING = "gzip"
+
+class FetchResult(NamedTuple):
+    data: Any
+    version: str        # ETag, or sha1 of the body when the server sends none
+    status: int         # 200, 304, or 0 when served from memory without a request
+    changed: bool       # False when the previous parsed body was reused
+
+class _Entry:
+    __slots__ = ("data", "version", "etag", "last_modified", "checked_at", "lock")
+
+    def __init__(self):
+        self.data: Any = None
+        self.version = ""
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        self.checked_at = 0.0
+        self.lock = threading.Lock()
+
+# CONDITIONAL FETCHER
+class ConditionalFetcher:
+    """
+    JSON over HTTP with revalidation.
+
+    Keeps the parsed body and validators (ETag / Last-Modified) per URL. Within
+    `max_age` the parsed body is returned without a request; after that, or when
+    forced, a conditional GET is sent and a 304 reuses the parsed body as is.
+    """
+    def __init__(self, timeout: float = DEFAULT_TIMEOUT_S):
+        self.timeout = timeout
+        self.requests = 0
+        self.not_modified = 0
+        self._session = get_session()
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, url: str) -> _Entry:
+        with self._lock:
+            e = self._entries.get(url)
+            if e is None:
+                e = self._entries[url] = _Entry()
+            return e
+
+    def get_json(
+        self,
+        url: str,
+        max_age: float = DEFAULT_MAX_AGE_S,
+        force: bool = False,
+        transform: Optional[Callable[[Any], Any]] = None,
+    ) -> FetchResult:
+        """
+        Parsed JSON at `url`. `transform`, if given, is applied once per new body and
+        its result is what gets kept, so callers can hold a compact form instead.
+        """
+        e = self._entry(url)
+        # one request per URL at a time; concurrent callers wait and reuse its result
+        with e.lock:
+            fresh = e.data is not None and (time.time() - e.checked_at) < max_age
+            if fresh and not force:
+                return FetchResult(e.data, e.version, 0, False)
+
+            headers = {"Accept-Encoding": ACCEPT_ENCODING}
+            if e.data is not None:
+                if e.etag:
+                    headers["If-None-Match"] = e.etag
+                if e.last_modified:
+                    headers["If-Modified-Since"] = e.last_modified
+
+            r = self._session.get(url, headers=headers, timeout=self.timeout)
+            self.requests += 1
+            e.checked_at = time.time()
+            if r.status_code == 304 and e.data is not None:
+                self.not_modified += 1
+                return FetchResult(e.data, e.version, 304, False)
+            r.raise_for_status()
+
+            body = r.content
+            etag = r.headers.get("ETag")
+            version = etag or hashlib.sha1(body).hexdigest()
+            last_modified = r.headers.get("Last-Modified")
+            if e.data is not None and version == e.version:
+                e.etag, e.last_modified = etag, last_modified
+                return FetchResult(e.data, e.version, r.status_code, False)
+
+            # validators move only with the data: a body that fails to parse or
+            # transform must not turn later revalidations into 304s for stale data
+            data = r.json()
+            data = transform(data) if transform else data
+            e.data, e.version, e.etag, e.last_modified = data, version, etag, last_modified
+            return FetchResult(e.data, e.version, r.status_code, True)
+
+@st.cache_resource(show_spinner=False)
+def get_fetcher() -> ConditionalFetcher:
+    """One fetcher per process, so every session shares the cached bodies and validators."""
+    return ConditionalFetcher()
@@ -0,0 +1,156 @@
+from __future__ import annotations
+import bisect
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from utilis.record_store import column
+from utilis.search_index import HUC_FIELDS
+from utilis.spatial_index import BBox
+
+HUC_LEVELS = tuple(int(f[3:]) for f in HUC_FIELDS)   # 2, 4, ..., 12
+
+# HELPERS
+def _deepest(codes: Sequence[Any]) -> str:
+    """First well-formed HUC code in huc12..huc2 order, '' if none."""
+    for c in codes:
+        if c:
+            s = str(c).strip()
+            if s.isdigit() and len(s) in HUC_LEVELS:
+                return s
+    return ""
+
+class HucNode(NamedTuple):
+    code: str
+    start: int            # slice of HucTree.order
+    end: int
+    bbox: Optional[BBox]  # None when no record under it has a centroid
+
+    @property
+    def level(self) -> int:
+        return len(self.code)
+
+    @property
+    def count(self) -> int:
+        return self.end - self.start
+
+class _Level:
+    """All nodes of one HUC level: sorted codes with their slices and extents."""
+    __slots__ = ("codes", "start", "end", "bbox")
+
+    def __init__(self, codes: List[str], start: np.ndarray, end: np.ndarray, bbox: np.ndarray):
+        self.codes = codes
+        self.start = start
+        self.end = end
+        self.bbox = bbox
+
+    def find(self, code: str) -> int:
+        i = bisect.bisect_left(self.codes, code)
+        return i if i < len(self.codes) and self.codes[i] == code else -1
+
+    def span(self, prefix: str) -> Tuple[int, int]:
+        lo = bisect.bisect_left(self.codes, prefix)
+        return lo, bisect.bisect_left(self.codes, prefix + ":", lo)   # ':' sorts after '9'
+
+    def nodes(self, lo: int, hi: int) -> List[HucNode]:
+        return [
+            HucNode(c, a, b, None if e[0] != e[0] else tuple(e))   # NaN: no located record
+            for c, a, b, e in zip(self.codes[lo:hi], self.start[lo:hi].tolist(),
+                                  self.end[lo:hi].tolist(), self.bbox[lo:hi].tolist())
+        ]
+
+# HUC TREE
+class HucTree:
+    """
+    Prefix tree over each record's deepest HUC code.
+
+    Rows are sorted by that code, so every HUC at any level owns one contiguous
+    slice [start, end) of `order`. Nodes are stored per level as sorted code
+    lists with start/end/extent arrays: lookup is one bisect, counts and
+    extents are precomputed, and no query scans the records.
+
+    Extents are (south, west, north, east) over records with a centroid
+    (lat/lon of exactly 0 counts as missing).
+    """
+    def __init__(self, records: Sequence[Mapping[str, Any]], lat: np.ndarray, lon: np.ndarray):
+        huc_cols = [column(records, f) for f in reversed(HUC_FIELDS)]
+        codes = np.array([_deepest(c) for c in zip(*huc_cols)], dtype="<U12")
+        has = np.flatnonzero(np.char.str_len(codes) > 0)
+        self.order = has[np.argsort(codes[has], kind="stable")]
+        self.codes = codes[self.order]
+        site = column(records, "site", "")
+        self.site = np.asarray([str(site[i] or "") for i in self.order.tolist()], dtype=object)
+
+        # NaN for missing centroids, plus one trailing NaN so a slice may end at len()
+        located = (lat != 0) | (lon != 0)
+        lat_s = np.append(np.where(located, lat, np.nan)[self.order], np.nan)
+        lon_s = np.append(np.where(located, lon, np.nan)[self.order], np.nan)
+
+        depth = np.char.str_len(self.codes)
+        self.levels: Dict[int, _Level] = {}
+        for level in HUC_LEVELS:
+            prefixes = np.unique(self.codes[depth >= level].astype(f"<U{level}"))
+            if prefixes.size == 0:
+                continue
+            starts = np.searchsorted(self.codes, prefixes, side="left")
+            ends = np.searchsorted(self.codes, np.char.add(prefixes, ":"), side="left")
+            # reduceat over interleaved [start, end) bounds: even outputs are the node slices
+            bounds = np.column_stack((starts, ends)).ravel()
+            with np.errstate(invalid="ignore"):
+                bbox = np.column_stack((
+                    np.fmin.reduceat(lat_s, bounds)[::2], np.fmin.reduceat(lon_s, bounds)[::2],
+                    np.fmax.reduceat(lat_s, bounds)[::2], np.fmax.reduceat(lon_s, bounds)[::2],
+                ))
+            self.levels[level] = _Level(prefixes.tolist(), starts, ends, bbox)
+
+    def __len__(self) -> int:
+        return sum(len(lv.codes) for lv in self.levels.values())
+
+    @property
+    def roots(self) -> List[str]:
+        """Codes at the shallowest level present (HUC2 for a complete catalog)."""
+        return self.levels[min(self.levels)].codes if self.levels else []
+
+    def codes_at(self, level: int) -> List[str]:
+        lv = self.levels.get(level)
+        return lv.codes if lv is not None else []
+
+    def node(self, code: str) -> Optional[HucNode]:
+        code = str(code)
+        lv = self.levels.get(len(code))
+        i = lv.find(code) if lv is not None else -1
+        return lv.nodes(i, i + 1)[0] if i >= 0 else None
+
+    def rows(self, code: str) -> np.ndarray:
+        """Record rows under a HUC (any level), ascending."""
+        n = self.node(code)
+        return np.sort(self.order[n.start:n.end]) if n is not None else np.empty(0, dtype=np.int64)
+
+    def descendants(self, code: str, level: int) -> List[HucNode]:
+        """Nodes at `level` under `code`, in code order."""
+        lv = self.levels.get(level)
+        if lv is None or level <= len(code):
+            return []
+        lo, hi = lv.span(code)
+        return lv.nodes(lo, hi)
+
+    def children(self, code: str) -> List[HucNode]:
+        """Nodes at the next level present below `code`."""
+        deeper = [lv for lv in self.levels if lv > len(code)]
+        return self.descendants(code, min(deeper)) if deeper else []
+
+    def sites(self, code: str) -> List[Tuple[str, int]]:
+        """(site, count) under a HUC, most records first."""
+        n = self.node(code)
+        if n is None or n.count == 0:
+            return []
+        names, counts = np.unique(self.site[n.start:n.end], return_counts=True)
+        order = np.lexsort((np.arange(names.size), -counts))
+        return [(str(names[i]), int(counts[i])) for i in order if names[i]]
+
+    def site_rows(self, code: str, site: str) -> np.ndarray:
+        n = self.node(code)
+        if n is None:
+            return np.empty(0, dtype=np.int64)
+        hit = self.site[n.start:n.end] == str(site)
+        return np.sort(self.order[n.start:n.end][hit])
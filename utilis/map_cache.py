@@ -0,0 +1,192 @@
+from __future__ import annotations
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional
+
+import branca
+import folium
+import streamlit as st
+import streamlit_folium as stf
+
+MAP_CACHE_SIZE = 48
+
+# map_payload / st_folium_payload mirror private internals of this streamlit-folium
+# minor release (pinned in requirements.txt). Any other version, or one missing these
+# names, falls back to plain st_folium: cached folium objects, re-rendered per run.
+STF_TESTED = "0.25"
+_STF_PRIVATE = (
+    "_get_html", "_get_header", "_get_map_string", "get_full_id", "_get_feature_group_string",
+    "_get_layer_control_string", "generate_js_hash", "_component_func",
+)
+
+def _stf_version() -> str:
+    from importlib.metadata import PackageNotFoundError, version
+    try:
+        return version("streamlit-folium")
+    except PackageNotFoundError:
+        return ""
+
+PAYLOAD_CACHING = (
+    _stf_version().startswith(STF_TESTED + ".") and all(hasattr(stf, name) for name in _STF_PRIVATE)
+)
+
+# HELPERS
+def _asset_links(m: folium.Map):
+    """CSS/JS links st_folium loads for the map's plugins (same walk as st_folium)."""
+    css_links: List[str] = []
+    js_links: List[str] = []
+
+    def walk(el):
+        if isinstance(el, branca.colormap.ColorMap):
+            js_links.insert(0, "https://cdnjs.cloudflare.com/ajax/libs/d3/3.5.5/d3.min.js")
+            js_links.insert(0, "https://d3js.org/d3.v4.min.js")
+        css_links.extend([href for _, href in getattr(el, "default_css", [])])
+        js_links.extend([src for _, src in getattr(el, "default_js", [])])
+        for child in getattr(el, "_children", {}).values():
+            walk(child)
+
+    walk(m)
+    return css_links, js_links
+
+# PUBLIC: render once, replay many times
+def map_payload(
+    m: folium.Map,
+    feature_groups: Optional[List[folium.FeatureGroup]] = None,
+    layer_control: Optional[folium.LayerControl] = None,
+) -> Dict[str, Any]:
+    """
+    Render a folium map to the exact strings st_folium sends to its frontend.
+
+    Mirrors st_folium() of streamlit-folium 0.25 (pinned in requirements.txt) so the
+    result can be cached and replayed by `st_folium_payload` without rebuilding or
+    re-rendering any folium objects. Without PAYLOAD_CACHING the payload keeps the
+    folium objects themselves and `st_folium_payload` hands them to st_folium.
+    """
+    if not PAYLOAD_CACHING:
+        return {"fig": m, "feature_groups": feature_groups, "layer_control": layer_control}
+
+    m.get_root().render()
+    m.render()
+
+    # order matters: _get_map_string alters the folium tree, feature groups join it afterwards
+    html = stf._get_html(m)
+    header = stf._get_header(m)
+    script = stf._get_map_string(m)
+    map_id = stf.get_full_id(m)
+    try:
+        bounds = m.get_bounds()
+    except AttributeError:
+        bounds = [[None, None], [None, None]]
+    (s, w), (n, e) = bounds
+
+    fg_string = None
+    if feature_groups:
+        fg_string = "".join(
+            stf._get_feature_group_string(fg, map=m, idx=i) for i, fg in enumerate(feature_groups)
+        )
+    lc_string = stf._get_layer_control_string(layer_control, m) if layer_control is not None else None
+    css_links, js_links = _asset_links(m)
+
+    return {
+        "script": script,
+        "header": header,
+        "html": html,
+        "id": map_id,
+        "feature_group": fg_string,
+        "layer_control": lc_string,
+        "css_links": css_links,
+        "js_links": js_links,
+        "defaults": {
+            "last_clicked": None,
+            "last_object_clicked": None,
+            "last_object_clicked_tooltip": None,
+            "last_object_clicked_popup": None,
+            "all_drawings": None,
+            "last_active_drawing": None,
+            "bounds": {"_southWest": {"lat": s, "lng": w}, "_northEast": {"lat": n, "lng": e}},
+            "zoom": m.options.get("zoom"),
+            "last_circle_radius": None,
+            "last_circle_polygon": None,
+            "selected_layers": None,
+        },
+    }
+
+def st_folium_payload(
+    payload: Dict[str, Any],
+    key: str,
+    height: int = 700,
+    width: Optional[int] = None,
+    returned_objects: Optional[Iterable[str]] = None,
+    zoom: Optional[float] = None,
+    center: Optional[List[float]] = None,
+) -> Dict[str, Any]:
+    """Drop-in for st_folium() that sends a cached `map_payload` to the streamlit-folium component."""
+    returned_objects = list(returned_objects) if returned_objects is not None else None
+    if "fig" in payload:
+        return stf.st_folium(
+            payload["fig"], key=key, height=height, width=width, returned_objects=returned_objects,
+            zoom=zoom, center=center, feature_group_to_add=payload["feature_groups"],
+            layer_control=payload["layer_control"],
+        )
+    hash_key = stf.generate_js_hash(payload["script"], key, False)
+
+    def _on_change():
+        st.session_state[key] = st.session_state.get(hash_key, {})
+
+    defaults = {
+        k: v for k, v in payload["defaults"].items()
+        if returned_objects is None or k in returned_objects
+    }
+    return stf._component_func(
+        script=payload["script"],
+        header=payload["header"],
+        html=payload["html"],
+        id=payload["id"],
+        key=hash_key,
+        height=height,
+        width=width,
+        returned_objects=returned_objects,
+        default=defaults,
+        zoom=zoom,
+        center=center,
+        feature_group=payload["feature_group"],
+        return_on_hover=False,
+        layer_control=payload["layer_control"],
+        pixelated=False,
+        css_links=payload["css_links"],
+        js_links=payload["js_links"],
+        on_change=_on_change,
+    )
+
+class RenderCache:
+    """Thread-safe LRU of rendered map entries shared by all sessions."""
+    def __init__(self, maxsize: int = MAP_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key: Hashable, build: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        entry = build()
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+@st.cache_resource(show_spinner=False)
+def get_render_cache() -> RenderCache:
+    return RenderCache()
@@ -0,0 +1,287 @@
+from __future__ import annotations
+import json
+import math
+from typing import Any, Dict, List, Optional, Sequence
+
+import folium
+from branca.element import MacroElement
+from jinja2 import Template
+
+from utilis.popups import popup_stub
+from utilis.tier_colors import DEFAULT_TIER_COLOR, TIER_COLORS
+
+# Site rendering modes for the Interactive Map
+RENDER_MARKERS = "Markers"
+RENDER_GEOJSON = "GeoJSON point layer (canvas)"
+
+COORD_DECIMALS = 5   # ~1 m at the equator, far below marker size
+
+# PER-MARKER LAYERS
+def site_marker(r: Dict[str, Any]) -> folium.CircleMarker:
+    lat = float(r.get("centroid_lat", 0))
+    lon = float(r.get("centroid_lon", 0))
+    color = TIER_COLORS.get(r.get("tier"), DEFAULT_TIER_COLOR)
+    return folium.CircleMarker(
+        location=[lat, lon],
+        radius=8, color="black", weight=1.5, fill=True, fill_color=color, fill_opacity=0.9,
+        tooltip=f"{r.get('tier')} — {r.get('site')}",
+        popup=folium.Popup(popup_stub(str(r["id"])), max_width=300),
+    )
+
+def cluster_marker(c: Dict[str, Any]) -> folium.Marker:
+    dominant = max(c["tiers"], key=c["tiers"].get)
+    color = TIER_COLORS.get(dominant, DEFAULT_TIER_COLOR)
+    size = int(26 + 8 * math.log10(c["count"]))
+    html = (
+        f"<div style='width:{size}px;height:{size}px;border-radius:50%;background:{color};opacity:0.9;"
+        f"border:2px solid #fff;box-shadow:0 0 0 1.5px #000;color:#fff;font:600 12px system-ui;"
+        f"display:flex;align-items:center;justify-content:center'>{c['count']:,}</div>"
+    )
+    breakdown = ", ".join(f"{t}: {n}" for t, n in sorted(c["tiers"].items()))
+    return folium.Marker(
+        location=[c["lat"], c["lon"]],
+        icon=folium.DivIcon(html=html, icon_size=(size, size), icon_anchor=(size // 2, size // 2)),
+        tooltip=f"{c['count']:,} sites — {breakdown} (click to zoom in)",
+    )
+
+# SINGLE GEOJSON LAYER
+def sites_feature_collection(records: Sequence[Dict[str, Any]], tiers: List[str]) -> Dict[str, Any]:
+    """
+    Compact FeatureCollection for the point layer.
+    Properties are one-letter keys: i = record id, s = site, t = index into `tiers`.
+    """
+    code_of = {t: i for i, t in enumerate(tiers)}
+    feats = []
+    for r in records:
+        feats.append({
+            "type": "Feature",
+            "geometry": {
+                "type": "Point",
+                "coordinates": [
+                    round(float(r.get("centroid_lon", 0)), COORD_DECIMALS),
+                    round(float(r.get("centroid_lat", 0)), COORD_DECIMALS),
+                ],
+            },
+            "properties": {"i": str(r["id"]), "s": str(r.get("site") or ""), "t": code_of.get(r.get("tier"), -1)},
+        })
+    return {"type": "FeatureCollection", "features": feats}
+
+class SitePointLayer(MacroElement):
+    """
+    All sites as one L.geoJSON layer drawn on a single canvas renderer, styled by tier
+    on the client. Tooltip/popup content is produced lazily from feature properties;
+    the popup carries only the record id, like the per-marker mode.
+    """
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        (function(){
+          var parent   = {{ this._parent.get_name() }};
+          var data     = {{ this.data|safe }};
+          var tiers    = {{ this.tiers|safe }};
+          var colorMap = {{ this.tier_colors|safe }};
+          var defaultC = {{ this.default_color|tojson }};
+          var renderer = L.canvas({ padding: 0.5 });
+
+          function el(text, css){
+            var d = document.createElement('div');
+            if (css) d.style.cssText = css;
+            d.innerText = text;
+            return d;
+          }
+
+          var layer = L.geoJSON(data, {
+            pointToLayer: function(f, latlng){
+              var tier = tiers[f.properties.t] || "";
+              return L.circleMarker(latlng, {
+                renderer: renderer, radius: 8, color: "black", weight: 1.5,
+                fill: true, fillColor: colorMap[tier] || defaultC, fillOpacity: 0.9
+              });
+            }
+          });
+          layer.bindTooltip(function(l){
+            var p = l.feature.properties;
+            return el((tiers[p.t] || "") + " — " + p.s);
+          });
+          layer.bindPopup(function(l){
+            return el(l.feature.properties.i, "font:12px system-ui;color:#444");
+          }, { maxWidth: 300 });
+          layer.addTo(parent);
+        })();
+        {% endmacro %}
+    """)
+    def __init__(
+        self,
+        records: Sequence[Dict[str, Any]],
+        tiers: List[str],
+        tier_colors: Optional[Dict[str, str]] = None,
+    ):
+        super().__init__()
+        self._name = "SitePointLayer"
+        self.data = json.dumps(sites_feature_collection(records, tiers), separators=(",", ":")).replace("</", "<\\/")
+        self.tiers = json.dumps(list(tiers))
+        self.tier_colors = json.dumps(tier_colors or TIER_COLORS)
+        self.default_color = DEFAULT_TIER_COLOR
+
+# VECTOR TILE EXTENTS
+# Filter channel: the page keeps the current extent filter in window.parent[FILTER_GLOBAL]
+# and posts {type: FILTER_MESSAGE, filter: {...}} to every frame, so a filter change
+# restyles the live grid instead of re-mounting the map and re-fetching its tiles.
+FILTER_GLOBAL  = "__fimFilter"
+FILTER_MESSAGE = "fim-filter"
+
+def extent_filter(tiers: Sequence[str], date_min: int, date_max: int) -> Dict[str, Any]:
+    """Filter state understood by VectorGridProtobuf (dates are YYYYMMDD ints)."""
+    return {"tiers": sorted({str(t) for t in tiers}), "date_min": int(date_min), "date_max": int(date_max)}
+
+def filter_channel_html(flt: Dict[str, Any]) -> str:
+    """Script for a zero-height components.html frame that publishes `flt` to the map frame."""
+    payload = json.dumps({"type": FILTER_MESSAGE, "filter": flt}).replace("</", "<\\/")
+    return f"""<script>
+      (function(){{
+        var msg = {payload}, host = window.parent;
+        try {{ host[{json.dumps(FILTER_GLOBAL)}] = msg.filter; }} catch (e) {{}}
+        for (var i = 0; i < host.frames.length; i++) {{
+          if (host.frames[i] !== window) host.frames[i].postMessage(msg, "*");
+        }}
+      }})();
+    </script>"""
+
+class VectorGridProtobuf(MacroElement):
+    """
+    FIM extents from the .pbf tile pyramid, styled by tier.
+
+    The tier/date filter is not baked into the map script: the layer reads it from
+    window.parent[FILTER_GLOBAL] and restyles already-loaded features with
+    setFeatureStyle on each filter message (see filter_channel_html).
+    """
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        (function(){
+          var map       = {{ this._parent.get_name() }};
+          var urlTpl    = {{ this.tiles_url|tojson }};
+          var lyrId     = {{ this.layer_name|tojson }};
+          var colorMap  = {{ this.tier_colors|safe }};
+          var defaultC  = {{ this.default_color|tojson }};
+          var maxNative = {{ this.max_native }};
+          var HIDDEN    = { stroke:false, fill:false, opacity:0, fillOpacity:0, weight:0 };
+
+          // live filter state; empty tier set = all tiers
+          var FILTER = null;
+          function setFilter(f){
+            f = f || {};
+            FILTER = {
+              tiers: new Set((f.tiers || []).map(String)),
+              dmin: Number.isFinite(f.date_min) ? f.date_min : -Infinity,
+              dmax: Number.isFinite(f.date_max) ? f.date_max : Infinity
+            };
+          }
+          try { setFilter(window.parent[{{ this.filter_global|tojson }}]); } catch (e) { setFilter(null); }
+
+          function matches(props){
+            if (FILTER.tiers.size > 0 && !FILTER.tiers.has(String(props.tier || ""))) return false;
+            // Date range (YYYYMMDD int) — missing dates are allowed
+            var ets = Number(props.event_ts);
+            if (Number.isFinite(ets) && (ets < FILTER.dmin || ets > FILTER.dmax)) return false;
+            return true;
+          }
+
+          function styleFor(props){
+            if (!matches(props)) return HIDDEN;
+            var c = (props && props.tier && colorMap[props.tier]) ? colorMap[props.tier] : defaultC;
+            return {
+              stroke:true, weight:0.5, color:c, opacity:1,
+              fill:true, fillColor:c, fillOpacity:0.5,
+              lineCap:'round', lineJoin:'round', smoothFactor:10.0
+            };
+          }
+
+          // Loaded features only, to restyle them in place: seen[id] = {tier, event_ts},
+          // refs[id] = loaded tiles holding it, tileIds[tile] = its ids. getFeatureId runs for
+          // every feature of a tile just before that tile's 'tileload', so ids gathered in
+          // `pending` belong to the tile that loads next.
+          var seen = {}, refs = {}, tileIds = {}, pending = [], restyled = false;
+          function tileKey(c){ return c.x + ':' + c.y + ':' + c.z; }
+          function featureId(f){
+            var p = f.properties || {}, id = p.feature_id;
+            if (id == null) return id;
+            seen[id] = { tier: p.tier, event_ts: p.event_ts };
+            pending.push(id);
+            return id;
+          }
+          function tileLoaded(e){
+            var key = tileKey(e.coords), ids = tileIds[key] = pending;
+            pending = [];
+            for (var i = 0; i < ids.length; i++) refs[ids[i]] = (refs[ids[i]] || 0) + 1;
+          }
+          function tileUnloaded(e){
+            var key = tileKey(e.coords), ids = tileIds[key] || [];
+            delete tileIds[key];
+            for (var i = 0; i < ids.length; i++) {
+              var id = ids[i];
+              if (--refs[id] > 0) continue;
+              delete refs[id]; delete seen[id];
+              // drop the override so the feature is styled from the live filter when it reloads
+              if (restyled) grid.resetFeatureStyle(id);
+            }
+          }
+
+          var grid = null;
+          window.addEventListener('message', function(e){
+            var d = e.data;
+            if (!d || d.type !== {{ this.filter_message|tojson }}) return;
+            setFilter(d.filter);
+            if (!grid) return;
+            restyled = true;
+            for (var id in seen) grid.setFeatureStyle(id, styleFor(seen[id]));
+          });
+
+          (function ensureVectorGrid(cb){
+            if (window.L && L.vectorGrid) { cb(); return; }
+            var s = document.createElement('script');
+            s.src = "https://unpkg.com/leaflet.vectorgrid/dist/Leaflet.VectorGrid.bundled.js";
+            s.onload = cb; document.head.appendChild(s);
+          })(function(){
+            var style = {};
+            style[lyrId] = styleFor;
+            grid = L.vectorGrid.protobuf(urlTpl, {
+              vectorTileLayerStyles: style,
+              getFeatureId: featureId,
+              interactive: true,
+              maxNativeZoom: maxNative,
+              maxZoom: 22,
+              rendererFactory: L.svg.tile
+            })
+            .on('click', function(e){
+              var p = (e.layer && e.layer.properties) || {};
+              var html = "<div style='font:13px system-ui'><b>"+(p.tier||"")+
+                         "</b> — "+(p.site_id||"")+
+                         "<br/>ID: "+(p.feature_id||"")+
+                         (p.event_date ? "<br/>Date: "+p.event_date : "") +
+                         "</div>";
+              L.popup().setLatLng(e.latlng).setContent(html).openOn(map);
+            })
+            .on('tileload', tileLoaded)
+            .on('tileunload', tileUnloaded)
+            .addTo(map);
+
+            window.__fimGrid = grid;
+          });
+        })();
+        {% endmacro %}
+    """)
+    def __init__(
+        self,
+        tiles_url: str,
+        layer_name: str = "fim_extents",
+        tier_colors: Optional[Dict[str, str]] = None,
+        max_native: int = 14,
+    ):
+        super().__init__()
+        self._name = "VectorGridProtobuf"
+        self.tiles_url      = tiles_url
+        self.layer_name     = layer_name
+        self.tier_colors    = json.dumps(tier_colors or TIER_COLORS)
+        self.default_color  = DEFAULT_TIER_COLOR
+        self.max_native     = max_native
+        self.filter_global  = FILTER_GLOBAL
+        self.filter_message = FILTER_MESSAGE
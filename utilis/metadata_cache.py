@@ -0,0 +1,177 @@
+from __future__ import annotations
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import streamlit as st
+
+SCHEMA_VERSION = 1
+DEFAULT_MAX_MB = 256
+DEFAULT_PATH = os.environ.get(
+    "FIM_METADATA_CACHE", str(Path.home() / ".cache" / "fimeval_viewer" / "metadata.sqlite")
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    bucket    TEXT NOT NULL,
+    key       TEXT NOT NULL,
+    etag      TEXT NOT NULL,
+    body      BLOB,              -- zlib(JSON) of the parsed metadata, NULL for an error
+    error     TEXT,              -- message for a malformed file
+    seen_at   REAL NOT NULL,     -- last listing that contained the key (eviction order)
+    PRIMARY KEY (bucket, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS meta_seen ON meta (seen_at);
+"""
+
+# Cached entry: (etag, parsed metadata or None, error message or None)
+Entry = Tuple[str, Optional[Dict[str, Any]], Optional[str]]
+
+# METADATA CACHE
+class MetadataCache:
+    """
+    Parsed *_metadata.json bodies on disk, keyed by (bucket, key) and validated by ETag.
+
+    SQLite in WAL mode: every batch is one transaction, so a crash or a killed
+    process leaves the previous state intact. A file that fails the integrity
+    check on open is moved aside (`.corrupt`) and the cache starts empty.
+    Payload size is capped at `max_mb`; the entries seen longest ago go first.
+    """
+    def __init__(self, path: str = DEFAULT_PATH, max_mb: float = DEFAULT_MAX_MB):
+        self.path = path
+        self.max_bytes = int(max_mb * 2**20)
+        self._lock = threading.Lock()
+        self._conn = self._open()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _open(self) -> sqlite3.Connection:
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        try:
+            conn = self._connect()
+            ok = conn.execute("PRAGMA quick_check").fetchone()[0] == "ok"
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if ok and version in (0, SCHEMA_VERSION):
+                conn.executescript(_SCHEMA)
+                conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+                return conn
+            conn.close()
+        except sqlite3.DatabaseError:
+            pass
+        # unreadable or from another schema: keep it for inspection, start over
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.path + suffix):
+                os.replace(self.path + suffix, self.path + ".corrupt" + suffix)
+        conn = self._connect()
+        conn.executescript(_SCHEMA)
+        conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        return conn
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _decode(body: Optional[bytes]) -> Optional[Dict[str, Any]]:
+        return json.loads(zlib.decompress(body)) if body is not None else None
+
+    def get_many(self, bucket: str, keys: Iterable[str]) -> Dict[str, Entry]:
+        """Cached entries for `keys` (missing keys are left out)."""
+        keys = list(keys)
+        out: Dict[str, Entry] = {}
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, etag, body, error FROM meta WHERE bucket=? AND key IN ({','.join('?' * len(chunk))})",
+                    (bucket, *chunk),
+                ).fetchall()
+                for key, etag, body, error in rows:
+                    out[key] = (etag, self._decode(body), error)
+        return out
+
+    def load(self, bucket: str, prefix: str = "") -> Dict[str, Entry]:
+        """Every cached entry under `prefix`, without any request (for an instant start)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, etag, body, error FROM meta WHERE bucket=? AND key >= ? AND key < ? ORDER BY key",
+                (bucket, prefix, prefix + "\U0010ffff"),
+            ).fetchall()
+        return {key: (etag, self._decode(body), error) for key, etag, body, error in rows}
+
+    def put_many(self, bucket: str, entries: Iterable[Tuple[str, Entry]]):
+        """Store (key, (etag, meta, error)) in one transaction."""
+        now = time.time()
+        rows = [
+            (bucket, key, etag, None if meta is None else zlib.compress(json.dumps(meta).encode("utf-8")), error, now)
+            for key, (etag, meta, error) in entries
+        ]
+        if not rows:
+            return
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def touch(self, bucket: str, keys: Iterable[str]):
+        """Mark `keys` as seen in the current listing (protects them from eviction)."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("UPDATE meta SET seen_at=? WHERE bucket=? AND key=?",
+                                   ((now, bucket, k) for k in keys))
+
+    def prune(self, bucket: str, prefix: str, keep: Iterable[str]) -> int:
+        """Drop entries under `prefix` that are not in `keep` (deleted from the bucket)."""
+        gone = set(self.load_keys(bucket, prefix)) - set(keep)
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("DELETE FROM meta WHERE bucket=? AND key=?", ((bucket, k) for k in gone))
+        return len(gone)
+
+    def load_keys(self, bucket: str, prefix: str = "") -> List[str]:
+        with self._lock:
+            return [k for (k,) in self._conn.execute(
+                "SELECT key FROM meta WHERE bucket=? AND key >= ? AND key < ?",
+                (bucket, prefix, prefix + "\U0010ffff"),
+            )]
+
+    def size_bytes(self) -> int:
+        with self._lock:
+            return int(self._conn.execute(
+                "SELECT COALESCE(SUM(LENGTH(body)), 0) + COALESCE(SUM(LENGTH(error)), 0) FROM meta"
+            ).fetchone()[0])
+
+    def trim(self) -> int:
+        """Evict least recently seen entries until the payload fits `max_bytes`. Returns rows removed."""
+        size = self.size_bytes()
+        if size <= self.max_bytes:
+            return 0
+        removed = 0
+        target = int(self.max_bytes * 0.9)
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            for bucket, key, n in self._conn.execute(
+                "SELECT bucket, key, COALESCE(LENGTH(body), 0) + COALESCE(LENGTH(error), 0) FROM meta ORDER BY seen_at"
+            ).fetchall():
+                if size <= target:
+                    break
+                self._conn.execute("DELETE FROM meta WHERE bucket=? AND key=?", (bucket, key))
+                size -= n
+                removed += 1
+        with self._lock:
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self._conn.execute("VACUUM")
+        return removed
+
+@st.cache_resource(show_spinner=False)
+def get_metadata_cache(path: str = DEFAULT_PATH, max_mb: float = DEFAULT_MAX_MB) -> MetadataCache:
+    return MetadataCache(path, max_mb)
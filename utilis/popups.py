@@ -0,0 +1,71 @@
+from __future__ import annotations
+import html
+from typing import Any, Dict
+
+import streamlit as st
+
+# HELPERS
+def popup_html(r: Dict[str, Any]) -> str:
+    """Full metadata table, references and download buttons for one record."""
+    tif_url = r.get("tif_url"); json_url = r.get("json_url")
+    fields = [
+        ("File Name", r.get("file_name")),
+        ("Resolution (m)", r.get("resolution_m")),
+        ("State", r.get("state")),
+        ("Description", r.get("description")),
+        ("River Basin Name", r.get("river_basin")),
+        ("Source", r.get("source")),
+        ("Date", r.get("date_ymd") or r.get("date_raw")),
+        ("Return Period (years)", r.get("return_period") if r.get("tier") == "Tier_4" else None),
+        ("Quality", r.get("quality")),
+    ]
+    rows = "".join(
+        f"<tr><th style='text-align:left;vertical-align:top;padding-right:8px'>{k}</th>"
+        f"<td style='text-align:left'>{'' if v is None else v}</td></tr>"
+        for k, v in fields
+    )
+    refs = r.get("references") or []
+    refs_html = ""
+    if refs:
+        refs_html = "<div style='margin-top:6px'><b>References</b><div style='margin:4px 0;padding-left:12px'>"
+        for ref in refs:
+            refs_html += f"<div style='margin-bottom:6px'>{ref}</div>"
+        refs_html += "</div></div>"
+
+    buttons_html = ""
+    if tif_url:
+        buttons_html += f"""
+        <a href="{tif_url}" target="_blank" rel="noopener"
+           style="text-decoration:none;display:inline-block;background:#2563eb;color:#fff;
+                  padding:8px 10px;border-radius:6px;font-weight:600;margin-right:8px;">
+          ⬇ Download Benchmark FIM (.tif)
+        </a>"""
+    if json_url:
+        buttons_html += f"""
+        <a href="{json_url}" target="_blank" rel="noopener"
+           style="text-decoration:none;display:inline-block;background:#059669;color:#fff;
+                  padding:8px 10px;border-radius:6px;font-weight:600;">
+          ⬇ Download Metadata (.json)
+        </a>"""
+
+    return f"""
+    <div style="font-family:system-ui,-apple-system,Segoe UI,Roboto,Arial,sans-serif; font-size:13px; max-width:420px">
+        <table>{rows}</table>
+        {'<hr style="margin:6px 0" />' if refs_html or buttons_html else ''}
+        {refs_html}
+        {buttons_html}
+    </div>
+    """
+
+def popup_stub(rec_id: str) -> str:
+    """Marker popup payload: only the record id, details are rendered on demand."""
+    return f"<div style='font:12px system-ui;color:#444'>{html.escape(rec_id)}</div>"
+
+# PUBLIC: cached per-id details
+@st.cache_data(show_spinner=False, max_entries=4096)
+def detail_html(catalog_key: str, rec_id: str, _record: Dict[str, Any]) -> str:
+    """
+    Cached: popup HTML per (catalog_key, rec_id), built the first time a site is opened.
+    `_record` is not hashed; the id is unique within a catalog version.
+    """
+    return popup_html(_record)
@@ -0,0 +1,248 @@
+from __future__ import annotations
+import json
+import re
+import sys
+import threading
+import zlib
+from array import array
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Long free-text fields live in a separate, compressed table decoded on demand
+LONG_FIELDS = ("description", "date_raw", "references", "dtype", "access_rights", "extent", "geometry")
+# Low-cardinality strings shared across records
+INTERNED_FIELDS = (
+    "tier", "site", "state", "source", "basin", "river_basin", "quality",
+    "huc2", "huc4", "huc6", "huc8", "huc10", "huc12",
+)
+LONG_BLOCK_ROWS = 256
+LONG_BLOCK_CACHE = 16
+
+_ABSENT = object()
+_DERIVABLE = ("feature_id", "site_id", "s3_prefix", "json_url", "metadata_url", "tif_url")
+_S3_HOST_RE = re.compile(r"^https://([^./]+)\.s3\.amazonaws\.com/")
+
+# HELPERS
+def s3_http_url(bucket: str, key: str) -> str:
+    return f"https://{bucket}.s3.amazonaws.com/{key}"
+
+def bucket_of(url: str) -> Optional[str]:
+    """Bucket name of a virtual-hosted S3 URL, else None."""
+    m = _S3_HOST_RE.match(url or "")
+    return m.group(1) if m else None
+
+def _folder(key: Optional[str]) -> Optional[str]:
+    return key.rsplit("/", 1)[0] if isinstance(key, str) and "/" in key else None
+
+def column(records: Sequence[Mapping], field: str, default: Any = None) -> List[Any]:
+    """One field for every record; column-wise for a RecordStore, else one .get per record."""
+    if isinstance(records, RecordStore):
+        return records.column(field, default)
+    return [r.get(field, default) for r in records]
+
+# LONG TEXT TABLE
+class LongTextTable:
+    """
+    Per-record dict of long fields, stored as zlib-compressed JSON blocks of
+    LONG_BLOCK_ROWS rows. A block is decoded the first time one of its rows is
+    read and kept in a small LRU.
+    """
+    def __init__(self, rows: Sequence[Optional[Dict[str, Any]]]):
+        self.n = len(rows)
+        self._blocks: List[bytes] = [
+            zlib.compress(json.dumps(list(rows[i:i + LONG_BLOCK_ROWS]), separators=(",", ":")).encode("utf-8"))
+            for i in range(0, self.n, LONG_BLOCK_ROWS)
+        ]
+        self._decoded: "OrderedDict[int, List[Optional[Dict[str, Any]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _block(self, b: int) -> List[Optional[Dict[str, Any]]]:
+        with self._lock:
+            hit = self._decoded.get(b)
+            if hit is not None:
+                self._decoded.move_to_end(b)
+                return hit
+        rows = json.loads(zlib.decompress(self._blocks[b]))
+        with self._lock:
+            self._decoded[b] = rows
+            while len(self._decoded) > LONG_BLOCK_CACHE:
+                self._decoded.popitem(last=False)
+        return rows
+
+    def row(self, i: int) -> Dict[str, Any]:
+        return self._block(i // LONG_BLOCK_ROWS)[i % LONG_BLOCK_ROWS] or {}
+
+    def column(self, field: str, default: Any = None) -> List[Any]:
+        out: List[Any] = []
+        for b in range(len(self._blocks)):
+            out.extend((r or {}).get(field, default) for r in json.loads(zlib.decompress(self._blocks[b])))
+        return out
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(b) for b in self._blocks)
+
+# RECORD STORE
+class CompactRecord(Mapping):
+    """Read-only dict-like view of one row of a RecordStore."""
+    __slots__ = ("_store", "_row")
+
+    def __init__(self, store: "RecordStore", row: int):
+        self._store = store
+        self._row = row
+
+    def __getitem__(self, field: str) -> Any:
+        v = self._store.value(self._row, field)
+        if v is _ABSENT:
+            raise KeyError(field)
+        return v
+
+    def get(self, field: str, default: Any = None) -> Any:
+        v = self._store.value(self._row, field)
+        return default if v is _ABSENT else v
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._store.keys(self._row))
+
+    def __len__(self) -> int:
+        return len(self._store.keys(self._row))
+
+    def __repr__(self) -> str:
+        return f"CompactRecord({dict(self)!r})"
+
+class RecordStore(Sequence):
+    """
+    Catalog records as parallel columns instead of one dict per record.
+
+      - short fields: one list per field, repeated strings interned
+      - centroid: two float arrays (NaN when missing)
+      - URLs and ids derivable from bucket + s3_key (tif_url, json_url,
+        metadata_url, s3_prefix, feature_id, site_id) are not stored unless
+        they differ from the derived value
+      - LONG_FIELDS: LongTextTable, decoded lazily
+
+    Indexing returns a CompactRecord, so code written against dicts keeps working.
+    """
+    def __init__(self, records: Sequence[Dict[str, Any]], bucket: Optional[str] = None):
+        n = len(records)
+        self.bucket = bucket
+        self._n = n
+        self._cols: Dict[str, List[Any]] = {}
+        self._lat = array("d", [float("nan")]) * n
+        self._lon = array("d", [float("nan")]) * n
+        self._centroid_list = bytearray(n)
+        self._derived_present = {f: bytearray(n) for f in _DERIVABLE}
+        long_rows: List[Optional[Dict[str, Any]]] = [None] * n
+        interned = set(INTERNED_FIELDS)
+
+        for i, r in enumerate(records):
+            long = derived = None
+            for k, v in r.items():
+                if k in ("centroid_lat", "centroid_lon", "centroid"):
+                    continue
+                if k in LONG_FIELDS:
+                    if v is not None:
+                        long = long or {}
+                        long[k] = v
+                    continue
+                if k in _DERIVABLE and v is not None:
+                    derived = derived or self._derive_all(r)
+                    if derived[k] == v:
+                        self._derived_present[k][i] = 1
+                        continue
+                if k in interned and isinstance(v, str):
+                    v = sys.intern(v)
+                col = self._cols.get(k)
+                if col is None:
+                    col = self._cols[k] = [_ABSENT] * n
+                col[i] = v
+            long_rows[i] = long
+
+            c = r.get("centroid")
+            if isinstance(c, (list, tuple)) and len(c) >= 2:
+                self._centroid_list[i] = 1
+                self._lon[i], self._lat[i] = _as_float(c[0]), _as_float(c[1])
+            if r.get("centroid_lat") is not None:
+                self._lat[i] = _as_float(r["centroid_lat"])
+            if r.get("centroid_lon") is not None:
+                self._lon[i] = _as_float(r["centroid_lon"])
+
+        self._long = LongTextTable(long_rows)
+        shapes: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+        self._long_keys = [shapes.setdefault(tuple(lr), tuple(lr)) if lr else () for lr in long_rows]
+
+    # derived fields
+    def _derive_all(self, r: Mapping) -> Dict[str, Any]:
+        key, fn = r.get("s3_key"), r.get("file_name")
+        folder = _folder(key)
+        url = self.bucket is not None and isinstance(key, str)
+        return {
+            "feature_id": r.get("id"),
+            "site_id": r.get("site"),
+            "s3_prefix": folder,
+            "json_url": s3_http_url(self.bucket, key) if url else None,
+            "metadata_url": s3_http_url(self.bucket, key) if url else None,
+            "tif_url": s3_http_url(self.bucket, f"{folder}/{fn}") if url and fn and folder else None,
+        }
+
+    def value(self, i: int, field: str) -> Any:
+        col = self._cols.get(field)
+        if col is not None and col[i] is not _ABSENT:
+            return col[i]
+        if field == "centroid_lat":
+            return None if self._lat[i] != self._lat[i] else self._lat[i]
+        if field == "centroid_lon":
+            return None if self._lon[i] != self._lon[i] else self._lon[i]
+        if field == "centroid":
+            return [self._lon[i], self._lat[i]] if self._centroid_list[i] else _ABSENT
+        if field in LONG_FIELDS:
+            return self._long.row(i).get(field, _ABSENT) if field in self._long_keys[i] else _ABSENT
+        if field in _DERIVABLE and self._derived_present[field][i]:
+            return self._derive_all(CompactRecord(self, i))[field]
+        return _ABSENT
+
+    def keys(self, i: int) -> List[str]:
+        out = [k for k, col in self._cols.items() if col[i] is not _ABSENT]
+        if self._lat[i] == self._lat[i]:
+            out.append("centroid_lat")
+        if self._lon[i] == self._lon[i]:
+            out.append("centroid_lon")
+        if self._centroid_list[i]:
+            out.append("centroid")
+        out.extend(f for f in _DERIVABLE if self._derived_present[f][i])
+        out.extend(self._long_keys[i])
+        return out
+
+    def column(self, field: str, default: Any = None) -> List[Any]:
+        if field in LONG_FIELDS:
+            return self._long.column(field, default)
+        if field in ("centroid_lat", "centroid_lon"):
+            arr = self._lat if field == "centroid_lat" else self._lon
+            return [default if v != v else v for v in arr]
+        col = self._cols.get(field)
+        if col is not None and field not in _DERIVABLE:
+            return [default if v is _ABSENT else v for v in col]
+        out = []
+        for i in range(self._n):
+            v = self.value(i, field)
+            out.append(default if v is _ABSENT else v)
+        return out
+
+    def __len__(self) -> int:
+        return self._n
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [CompactRecord(self, j) for j in range(*i.indices(self._n))]
+        if i < 0:
+            i += self._n
+        if not 0 <= i < self._n:
+            raise IndexError(i)
+        return CompactRecord(self, i)
+
+def _as_float(v: Any) -> float:
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return float("nan")
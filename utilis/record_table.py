@@ -0,0 +1,206 @@
+from __future__ import annotations
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utilis.record_store import column
+
+DASH = "–"
+PLATFORM_BY_TIER = {
+    "Tier_1": "Hand Labeled Aerial Imagery",
+    "Tier_2": "Planet Satellite Imagery",
+    "Tier_3": "Sentinel-1 Imagery",
+    "Tier_4": "Synthetic HEC-RAS 1D",
+}
+
+DISPLAY_COLUMNS = [
+    "River/Basin", "State", "Year", "Date", "Resolution (m)", "HUC8",
+    "Quality", "Platform", "Download FIM (TIF)", "Metadata (JSON)",
+]
+SORT_DATE = "Date"
+SORTABLE_COLUMNS = ["Date", "River/Basin", "State", "Year", "Resolution (m)", "HUC8", "Quality", "Platform"]
+VIEW_CACHE_SIZE = 64
+
+_SOURCE_FIELDS = [
+    "id", "site", "tier", "state", "huc8", "quality", "basin", "river_basin",
+    "event_date", "date_ymd", "date_raw", "event_ts", "resolution_m",
+    "tif_url", "json_url", "metadata_url",
+]
+
+# arrow-backed strings keep the column ops vectorized; plain "string" works without pyarrow
+try:
+    import pyarrow  # noqa: F401
+    _STR = "string[pyarrow]"
+except ImportError:
+    _STR = "string"
+
+# HELPERS
+def _text(s: pd.Series) -> pd.Series:
+    """String column with None/NaN/blank as <NA>."""
+    s = s.astype(_STR)
+    return s.mask(s.str.strip().eq(""))
+
+def _is_type(s: pd.Series, *types) -> pd.Series:
+    return s.map(type).isin(types)
+
+def _iso_key(s: pd.Series) -> pd.Series:
+    """YYYYMMDD (float, NaN if unparsable) for ISO date strings."""
+    d = pd.to_datetime(s.where(_is_type(s, str)), format="ISO8601", errors="coerce")
+    return d.dt.year * 10000 + d.dt.month * 100 + d.dt.day
+
+def build_table_frame(records: Sequence[Dict[str, Any]]) -> pd.DataFrame:
+    """
+    Display table for all records (same row order), built with column operations.
+    `_DateKey` is the YYYYMMDD sort key (0 when unknown); `_Search` is lowercased search text.
+    """
+    src = pd.DataFrame({f: pd.Series(column(records, f), dtype=object) for f in _SOURCE_FIELDS})
+
+    # Date / Year: ISO event_date or date_ymd, else date_raw (YYYYMMDD shown as YYYY-MM-DD)
+    iso_src = src["event_date"].where(_is_type(src["event_date"], str))
+    iso = _text(iso_src).fillna(_text(src["date_ymd"].where(_is_type(src["date_ymd"], str))))
+    raw = src["date_raw"]
+    raw_is_num = _is_type(raw, int, float) & raw.notna()
+    raw_num = pd.to_numeric(raw.where(raw_is_num), errors="coerce")
+    raw_s = _text(raw.where(_is_type(raw, str))).fillna(
+        pd.Series(np.trunc(raw_num), index=src.index).astype("Int64").astype(_STR)
+    )
+    raw_disp = raw_s.where(
+        ~raw_s.str.fullmatch(r"\d{8}").fillna(False),
+        raw_s.str[0:4] + "-" + raw_s.str[4:6] + "-" + raw_s.str[6:8],
+    )
+    date_disp = iso.fillna(raw_disp)
+    year_src = iso.fillna(raw_s)
+    year = year_src.str[:4].where(year_src.str.len() >= 4)
+
+    # Sort key: event_ts, then ISO dates, then a numeric date_raw
+    ets = pd.to_numeric(src["event_ts"].where(_is_type(src["event_ts"], int, float)), errors="coerce")
+    raw_key = raw_num.where(raw_is_num).fillna(
+        pd.to_numeric(raw_s.where(raw_s.str.fullmatch(r"\d+").fillna(False)), errors="coerce")
+    )
+    date_key = (
+        ets.where(ets > 0)
+        .fillna(_iso_key(src["event_date"]))
+        .fillna(_iso_key(src["date_ymd"]))
+        .fillna(raw_key.where(raw_key > 0))
+        .fillna(0)
+        .astype(np.int64)
+    )
+
+    res = src["resolution_m"]
+    frame = pd.DataFrame({
+        "River/Basin": _text(src["basin"]).fillna(_text(src["river_basin"])),
+        "State": _text(src["state"]),
+        "Year": year,
+        "Date": _text(date_disp),
+        "Resolution (m)": pd.to_numeric(res.where(_is_type(res, int, float)), errors="coerce").astype(float),
+        "HUC8": _text(src["huc8"]),
+        "Quality": _text(src["quality"]).fillna(_text(src["tier"])),
+        "Platform": src["tier"].map(PLATFORM_BY_TIER).astype(_STR),
+        "Download FIM (TIF)": _text(src["tif_url"]),
+        "Metadata (JSON)": _text(src["json_url"]).fillna(_text(src["metadata_url"])),
+    })
+    search = frame[["River/Basin", "State", "Date", "HUC8", "Quality", "Platform"]].fillna("")
+    search_text = src["id"].astype(_STR).fillna("") + " " + _text(src["site"]).fillna("")
+    for c in search.columns:
+        search_text = search_text + " " + search[c]
+
+    for c in ("River/Basin", "State", "Year", "Date", "HUC8", "Quality", "Platform"):
+        frame[c] = frame[c].fillna(DASH).astype(object)
+    for c in ("Download FIM (TIF)", "Metadata (JSON)"):
+        frame[c] = frame[c].astype(object).where(frame[c].notna(), None)
+    frame["_DateKey"] = date_key.to_numpy()
+    frame["_Search"] = search_text.str.lower().to_numpy()
+    return frame
+
+# TABLE
+class RecordTable:
+    """
+    Catalog table built once per catalog, with cached sorted/searched views.
+
+    A view is an array of row positions (record order) for one filter fingerprint,
+    sort and search query; paging slices the shared frame by those positions.
+    """
+    def __init__(self, records: Sequence[Dict[str, Any]]):
+        self.frame = build_table_frame(records)
+        self._date_key = self.frame["_DateKey"].to_numpy()
+        self._search = self.frame["_Search"].to_numpy(dtype=object)
+        self._ranks: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._matches: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._views: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def _rank(self, column: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(dense rank, missing mask) of a column, computed once."""
+        hit = self._ranks.get(column)
+        if hit is None:
+            if column == SORT_DATE:
+                codes, _ = pd.factorize(self._date_key, sort=True)
+                missing = self._date_key == 0
+            else:
+                col = self.frame[column]
+                codes, _ = pd.factorize(col, sort=True)
+                missing = (codes < 0) | col.eq(DASH).to_numpy()
+            hit = (codes.astype(np.int64), np.asarray(missing, dtype=bool))
+            self._ranks[column] = hit
+        return hit
+
+    def _match(self, query: str) -> np.ndarray:
+        with self._lock:
+            hit = self._matches.get(query)
+            if hit is not None:
+                self._matches.move_to_end(query)
+                return hit
+        mask = np.fromiter((query in s for s in self._search), dtype=bool, count=len(self))
+        with self._lock:
+            self._matches[query] = mask
+            while len(self._matches) > VIEW_CACHE_SIZE:
+                self._matches.popitem(last=False)
+        return mask
+
+    def view(
+        self,
+        rows: np.ndarray,
+        fingerprint: str,
+        sort_by: str = SORT_DATE,
+        descending: bool = True,
+        search: str = "",
+    ) -> np.ndarray:
+        """
+        Row positions of `rows` matching `search`, ordered by `sort_by`.
+        Missing values sort last in both directions; ties keep newest-first date order.
+        Cached per (fingerprint, sort_by, descending, search).
+        """
+        query = (search or "").strip().lower()
+        key = (fingerprint, sort_by, bool(descending), query)
+        with self._lock:
+            hit = self._views.get(key)
+            if hit is not None:
+                self._views.move_to_end(key)
+                return hit
+
+        rows = np.asarray(rows, dtype=np.int64)
+        if query:
+            rows = rows[self._match(query)[rows]]
+        rank, missing = self._rank(sort_by if sort_by in SORTABLE_COLUMNS else SORT_DATE)
+        r = rank[rows]
+        order = np.lexsort((-self._date_key[rows], -r if descending else r, missing[rows]))
+        out = rows[order]
+
+        with self._lock:
+            self._views[key] = out
+            while len(self._views) > VIEW_CACHE_SIZE:
+                self._views.popitem(last=False)
+        return out
+
+    def page(self, view: np.ndarray, page: int, per_page: int) -> pd.DataFrame:
+        start = max(0, int(page)) * per_page
+        return self.frame.iloc[view[start:start + per_page]][DISPLAY_COLUMNS]
+
+def page_count(view: np.ndarray, per_page: int) -> int:
+    return max(1, (len(view) + per_page - 1) // per_page)
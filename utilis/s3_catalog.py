@@ -1,15 +1,31 @@
 from __future__ import annotations
 import json, re, datetime as dt
-from typing import Dict, List, Any, Tuple
-import boto3
-from botocore import UNSIGNED
-from botocore.config import Config
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
 import streamlit as st
 
+from utilis.metadata_cache import MetadataCache, get_metadata_cache
+from utilis.s3_client import get_client
+
+DEFAULT_WORKERS = 16
+BATCH_INTERVAL_S = 0.5     # how often iter_catalog hands finished records to the caller
+GEOMETRY_CACHE_SIZE = 256  # parsed FIM geometries kept in memory by GeometryStore
+
+class CatalogBatch(NamedTuple):
+    records: List[Dict[str, Any]]    # new since the previous batch
+    errors: List[Tuple[str, str]]    # new since the previous batch
+    done: int                        # metadata files fetched (or failed) so far
+    listed: int                      # metadata files listed so far
+    listing_done: bool
+    cached: int = 0                  # of `done`, served from the on-disk cache (ETag unchanged)
+
 # CACHED RESOURCES
-@st.cache_resource
 def _s3_client():
-    return boto3.client("s3", config=Config(signature_version=UNSIGNED))
+    # shared unsigned client (pooling, adaptive retry, throttle limiter); boto3 loads only here
+    return get_client(unsigned=True)
 
 # HELPERS
 def _extract_ymd(s: Any) -> str | None:
@@ -32,16 +48,16 @@ def _extract_ymd(s: Any) -> str | None:
     m = re.search(r"(?<!\d)(\d{8})(?!\d)", s)
     return m.group(1) if m else None
 
-def _list_metadata_objects(bucket: str, root_prefix: str) -> List[str]:
+def _iter_metadata_pages(bucket: str, root_prefix: str) -> Iterator[List[Tuple[str, str]]]:
+    """(key, ETag) of *_metadata.json under root_prefix, one listing page at a time."""
     s3 = _s3_client()
-    keys: List[str] = []
     paginator = s3.get_paginator("list_objects_v2")
     for page in paginator.paginate(Bucket=bucket, Prefix=root_prefix):
-        for obj in page.get("Contents", []):
-            key = obj["Key"]
-            if key.lower().endswith("_metadata.json"):
-                keys.append(key)
-    return keys
+        yield [
+            (obj["Key"], obj.get("ETag", ""))
+            for obj in page.get("Contents", [])
+            if obj["Key"].lower().endswith("_metadata.json")
+        ]
 
 # Lenient JSON fixer
 _HUC_KEY_RE = re.compile(r'"(HUC\d{1,3})"\s*:\s*(0\d+)(\s*[,\}\]])')
@@ -85,105 +101,300 @@ def _fetch_json(bucket: str, key: str) -> Dict[str, Any]:
                 f"Context:\n{context}"
             ) from e2
 
+def _tier_site(key: str) -> Tuple[str, str]:
+    parts = key.split("/")
+    tier = next((p for p in parts if p.lower().startswith("tier_")), None) or "Unknown_Tier"
+    site = parts[-2] if len(parts) >= 2 else "Unknown_Site"
+    return tier, site
+
+def _bbox(extent: Any) -> Optional[List[float]]:
+    """[xmin, ymin, xmax, ymax] of a metadata Extent, None when incomplete."""
+    if not isinstance(extent, dict):
+        return None
+    try:
+        return [float(extent[k]) for k in ("xmin", "ymin", "xmax", "ymax")]
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def _normalize(key: str, meta: Dict[str, Any], geometry: bool = True) -> Dict[str, Any]:
+    """
+    One catalog record from a parsed *_metadata.json.
+
+    geometry=False leaves out FIM_Geometry and Extent (polygons can be megabytes)
+    and keeps only `bbox` and `has_geometry`; load shapes with GeometryStore.
+    """
+    tier, site = _tier_site(key)
+
+    # Normalize fields
+    file_name = meta.get("File_Name") or meta.get("File Name")
+    res_m    = meta.get("Resolution in meter")
+    dtype    = meta.get("Datatype") or meta.get("Data type")
+    state    = meta.get("State")
+    desc     = meta.get("Description")
+    basin    = meta.get("River Basin Name") or meta.get("River Basin")
+    source   = meta.get("Source")
+    quality  = meta.get("Quality") or tier
+
+    date_raw = meta.get("Date of Flood /Synthetic Flooding Event (return period (years))") or ""
+    ymd_compact = _extract_ymd(date_raw) or _extract_ymd(file_name or "")
+    date_iso = None
+    if ymd_compact:
+        try:
+            date_iso = dt.datetime.strptime(ymd_compact, "%Y%m%d").date().isoformat()
+        except Exception:
+            date_iso = None
+
+    lon = lat = None
+    centroid = meta.get("Location of the centroid of the flood map") or []
+    if isinstance(centroid, list) and len(centroid) >= 2:
+        try:
+            lon, lat = float(centroid[0]), float(centroid[1])
+        except Exception:
+            lon = lat = None
+    if lon is None or lat is None:
+        ex = meta.get("Extent") or {}
+        xmin, ymin, xmax, ymax = ex.get("xmin"), ex.get("ymin"), ex.get("xmax"), ex.get("ymax")
+        try:
+            if all(v is not None for v in (xmin, ymin, xmax, ymax)):
+                lon = (float(xmin) + float(xmax)) / 2.0
+                lat = (float(ymin) + float(ymax)) / 2.0
+        except Exception:
+            lon = lat = None
+    if lon is None or lat is None:
+        lon, lat = 0.0, 0.0
+
+    refs = meta.get("References") or []
+    if isinstance(refs, str):
+        refs = [refs]
+    elif isinstance(refs, list):
+        refs = [str(x) for x in refs]
+    else:
+        refs = [str(refs)]
+    huc = {}
+    for k in ("HUC2","HUC4","HUC6","HUC8","HUC10","HUC12"):
+        if k in meta and meta[k] is not None:
+            huc[k.lower()] = str(meta[k])
+
+    return {
+        "tier": tier,
+        "site": site,
+        "s3_key": key,
+        "file_name": file_name,
+        "resolution_m": res_m,
+        "dtype": dtype,
+        "state": state,
+        "description": desc,
+        "river_basin": basin,
+        "source": source,
+        "date_raw": date_raw,
+        "date_ymd": date_iso,
+        "quality": quality,
+        "references": refs,
+        "centroid_lon": lon,
+        "centroid_lat": lat,
+        **({"geometry": meta.get("FIM_Geometry"), "extent": meta.get("Extent")} if geometry else
+           {"bbox": _bbox(meta.get("Extent")), "has_geometry": meta.get("FIM_Geometry") is not None}),
+        **huc,
+    }
+
+def from_cache(cache: MetadataCache, bucket: str, root_prefix: str, geometry: bool = True) -> Dict[str, Any]:
+    """The catalog as of the last crawl, from disk only (no S3 request)."""
+    records: List[Dict[str, Any]] = []
+    errors: List[Tuple[str, str]] = []
+    for key, (_, meta, error) in cache.load(bucket, root_prefix).items():
+        if meta is not None:
+            records.append(_normalize(key, meta, geometry))
+        else:
+            errors.append((key, error or ""))
+    return {"records": records, "errors": errors}
+
+# PUBLIC: incremental crawl
+def iter_catalog(
+    bucket: str,
+    root_prefix: str,
+    workers: int = DEFAULT_WORKERS,
+    interval: float = BATCH_INTERVAL_S,
+    cache: Optional[MetadataCache] = None,
+    geometry: bool = True,
+) -> Iterator[CatalogBatch]:
+    """
+    Crawl *_metadata.json under root_prefix with up to `workers` concurrent
+    fetches, yielding what finished roughly every `interval` seconds.
+
+    Fetching starts with the first listing page, so the first records arrive
+    before the listing is complete. At most 4 × workers fetches are queued at
+    once. Records come in completion order; a malformed file becomes an error
+    (key, message) and the crawl goes on.
+
+    With `cache`, a key whose listed ETag matches the cached one is served from
+    disk without a request; fetched bodies (and errors) are written back per
+    batch. After a complete listing, entries for deleted keys are pruned and
+    the cache is trimmed to its size limit.
+
+    geometry=False yields scalar-only records (see _normalize).
+    """
+    pages = _iter_metadata_pages(bucket, root_prefix)
+    max_pending = 4 * max(1, workers)
+    todo: List[Tuple[str, str]] = []
+    pending: Dict[Any, Tuple[str, str]] = {}
+    seen: List[str] = []
+    to_store: List[Tuple[str, Any]] = []
+    records: List[Dict[str, Any]] = []
+    errors: List[Tuple[str, str]] = []
+    done = listed = cached = 0
+    listing_done = False
+    last = time.perf_counter()
+
+    def take(key: str, meta: Optional[Dict[str, Any]], error: Optional[str]):
+        if meta is not None:
+            records.append(_normalize(key, meta, geometry))
+        else:
+            errors.append((key, error or ""))
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="catalog") as pool:
+        try:
+            while True:
+                while not listing_done and not todo and len(pending) < max_pending:
+                    page = next(pages, None)
+                    if page is None:
+                        listing_done = True
+                        break
+                    listed += len(page)
+                    seen.extend(k for k, _ in page)
+                    hits = cache.get_many(bucket, (k for k, _ in page)) if cache is not None else {}
+                    for key, etag in page:
+                        hit = hits.get(key)
+                        if hit is not None and hit[0] == etag:
+                            take(key, hit[1], hit[2])
+                            done += 1
+                            cached += 1
+                        else:
+                            todo.append((key, etag))
+                while todo and len(pending) < max_pending:
+                    key, etag = todo.pop()
+                    pending[pool.submit(_fetch_json, bucket, key)] = (key, etag)
+                if not pending and not todo:
+                    if listing_done:
+                        break
+                    continue
+                finished, _ = wait(list(pending), timeout=interval, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    key, etag = pending.pop(fut)
+                    done += 1
+                    try:
+                        meta, error = fut.result(), None
+                    except ValueError as ve:
+                        meta, error = None, str(ve)
+                    take(key, meta, error)
+                    to_store.append((key, (etag, meta, error)))
+                now = time.perf_counter()
+                if (records or errors) and now - last >= interval:
+                    last = now
+                    if cache is not None:
+                        cache.put_many(bucket, to_store)
+                    to_store = []
+                    yield CatalogBatch(records, errors, done, listed, listing_done, cached)
+                    records, errors = [], []
+        finally:
+            # caller stopped early: drop queued fetches
+            for fut in pending:
+                fut.cancel()
+    if cache is not None:
+        cache.put_many(bucket, to_store)
+        cache.touch(bucket, seen)
+        cache.prune(bucket, root_prefix, seen)
+        cache.trim()
+    yield CatalogBatch(records, errors, done, listed, True, cached)
+
+# GEOMETRY STORE
+class GeometryStore:
+    """
+    FIM_Geometry by metadata key, loaded only when an extent is drawn.
+
+    Reads the on-disk MetadataCache first and S3 otherwise (writing the body
+    back); the last GEOMETRY_CACHE_SIZE geometries stay parsed in memory.
+    """
+    def __init__(self, bucket: str, cache: Optional[MetadataCache] = None, maxsize: int = GEOMETRY_CACHE_SIZE):
+        self.bucket = bucket
+        self.cache = cache
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        if self.cache is not None:
+            hit = self.cache.get_many(self.bucket, [key]).get(key)
+            if hit is not None and hit[1] is not None:
+                return hit[1]
+        try:
+            meta = _fetch_json(self.bucket, key)
+        except ValueError:
+            return None
+        if self.cache is not None:
+            # no listed ETag here: the next crawl revalidates this entry
+            self.cache.put_many(self.bucket, [(key, ("", meta, None))])
+        return meta
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """GeoJSON-like FIM_Geometry of one metadata key, None if it has none."""
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                return self._data[key]
+        meta = self._load(key)
+        geom = meta.get("FIM_Geometry") if meta is not None else None
+        with self._lock:
+            self._data[key] = geom
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return geom
+
+    def extent(self, key: str) -> Optional[Dict[str, Any]]:
+        """Raw metadata Extent of one key (from disk when cached)."""
+        meta = self._load(key)
+        return meta.get("Extent") if meta is not None else None
+
+@st.cache_resource(show_spinner=False)
+def get_geometry_store(bucket: str, use_disk_cache: bool = True) -> GeometryStore:
+    return GeometryStore(bucket, get_metadata_cache() if use_disk_cache else None)
+
 # PUBLIC: build_catalog
 @st.cache_data(show_spinner=False)
-def build_catalog(bucket: str, root_prefix: str) -> Dict[str, Any]:
+def build_catalog(
+    bucket: str,
+    root_prefix: str,
+    workers: int = DEFAULT_WORKERS,
+    use_disk_cache: bool = True,
+    geometry: bool = True,
+) -> Dict[str, Any]:
     """
     Cached: lists all *_metadata.json under root_prefix (across Tier_*/*),
-    fetches and normalizes fields. Cache invalidates when (bucket, root_prefix) change
-    or you manually clear it from the app.
+    fetches them in parallel (see iter_catalog) and normalizes fields. Cache
+    invalidates when (bucket, root_prefix) change or you manually clear it from the app.
+
+    Across restarts, bodies come from the on-disk MetadataCache: only keys whose
+    ETag changed since the last crawl are fetched again.
+
+    geometry=False keeps only scalar metadata (plus `bbox`), so the cached
+    result no longer grows with polygon complexity; draw extents through
+    get_geometry_store(bucket).get(record["s3_key"]).
+
+    For progress and partial results while the crawl runs, iterate iter_catalog.
 
     Returns:
         {
-          "records": [ ...normalized dicts... ],
+          "records": [ ...normalized dicts, in key order... ],
           "errors":  [ (key, message), ... ]   # any malformed JSON files that were skipped
         }
     """
-    keys = _list_metadata_objects(bucket, root_prefix)
     records: List[Dict[str, Any]] = []
     errors: List[Tuple[str, str]] = []
+    cache = get_metadata_cache() if use_disk_cache else None
+    for batch in iter_catalog(bucket, root_prefix, workers, cache=cache, geometry=geometry):
+        records.extend(batch.records)
+        errors.extend(batch.errors)
 
-    for key in keys:
-        parts = key.split("/")
-        tier = next((p for p in parts if p.lower().startswith("tier_")), None) or "Unknown_Tier"
-        site = parts[-2] if len(parts) >= 2 else "Unknown_Site"
-
-        try:
-            meta = _fetch_json(bucket, key)
-        except ValueError as ve:
-            errors.append((key, str(ve)))
-            continue 
-
-        # Normalize fields
-        file_name = meta.get("File_Name") or meta.get("File Name")
-        res_m    = meta.get("Resolution in meter")
-        dtype    = meta.get("Datatype") or meta.get("Data type")
-        state    = meta.get("State")
-        desc     = meta.get("Description")
-        basin    = meta.get("River Basin Name") or meta.get("River Basin")
-        source   = meta.get("Source")
-        quality  = meta.get("Quality") or tier
-
-        date_raw = meta.get("Date of Flood /Synthetic Flooding Event (return period (years))") or ""
-        ymd_compact = _extract_ymd(date_raw) or _extract_ymd(file_name or "")
-        date_iso = None
-        if ymd_compact:
-            try:
-                date_iso = dt.datetime.strptime(ymd_compact, "%Y%m%d").date().isoformat()
-            except Exception:
-                date_iso = None
-
-        lon = lat = None
-        centroid = meta.get("Location of the centroid of the flood map") or []
-        if isinstance(centroid, list) and len(centroid) >= 2:
-            try:
-                lon, lat = float(centroid[0]), float(centroid[1])
-            except Exception:
-                lon = lat = None
-        if lon is None or lat is None:
-            ex = meta.get("Extent") or {}
-            xmin, ymin, xmax, ymax = ex.get("xmin"), ex.get("ymin"), ex.get("xmax"), ex.get("ymax")
-            try:
-                if all(v is not None for v in (xmin, ymin, xmax, ymax)):
-                    lon = (float(xmin) + float(xmax)) / 2.0
-                    lat = (float(ymin) + float(ymax)) / 2.0
-            except Exception:
-                lon = lat = None
-        if lon is None or lat is None:
-            lon, lat = 0.0, 0.0
-
-        refs = meta.get("References") or []
-        if isinstance(refs, str):
-            refs = [refs]
-        elif isinstance(refs, list):
-            refs = [str(x) for x in refs]
-        else:
-            refs = [str(refs)]
-        huc = {}
-        for k in ("HUC2","HUC4","HUC6","HUC8","HUC10","HUC12"):
-            if k in meta and meta[k] is not None:
-                huc[k.lower()] = str(meta[k])
-
-        records.append({
-            "tier": tier,
-            "site": site,
-            "s3_key": key,
-            "file_name": file_name,
-            "resolution_m": res_m,
-            "dtype": dtype,
-            "state": state,
-            "description": desc,
-            "river_basin": basin,
-            "source": source,
-            "date_raw": date_raw,
-            "date_ymd": date_iso,
-            "quality": quality,
-            "references": refs,
-            "centroid_lon": lon,
-            "centroid_lat": lat,
-            "geometry": meta.get("FIM_Geometry"),
-            "extent": meta.get("Extent"),
-            **huc,
-        })
-
+    records.sort(key=lambda r: r["s3_key"])
+    errors.sort()
     return {"records": records, "errors": errors}
@@ -0,0 +1,238 @@
+from __future__ import annotations
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_MAX_POOL = int(os.environ.get("FIM_S3_MAX_POOL", "32"))
+DEFAULT_MAX_ATTEMPTS = int(os.environ.get("FIM_S3_MAX_ATTEMPTS", "8"))
+ENDPOINT_URL = os.environ.get("FIM_S3_ENDPOINT") or None   # e.g. a local S3 stand-in
+THROTTLE_COOLDOWN_S = 1.0     # one halving per burst of throttled responses
+INCREASE_EVERY = 20           # clean responses per +1 on the concurrency limit
+
+THROTTLE_CODES = {"SlowDown", "Throttling", "ThrottlingException", "RequestLimitExceeded", "TooManyRequests"}
+
+# COUNTERS
+class S3Stats:
+    """Process-wide request counters for every S3 client and HTTP session made here."""
+    _FIELDS = ("calls", "requests", "throttles", "errors", "bytes_in", "bytes_out")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            for f in self._FIELDS:
+                setattr(self, f, 0)
+
+    def add(self, **kw: int):
+        with self._lock:
+            for f, n in kw.items():
+                setattr(self, f, getattr(self, f) + n)
+
+    def snapshot(self) -> Dict[str, int]:
+        """Counters; `retries` is HTTP attempts beyond the first of each call."""
+        with self._lock:
+            out = {f: getattr(self, f) for f in self._FIELDS}
+        out["retries"] = max(0, out["requests"] - out["calls"])
+        return out
+
+# CONCURRENCY LIMITER
+class ConcurrencyLimiter:
+    """
+    Adaptive cap on in-flight S3 requests (AIMD).
+
+    A throttled response (503 SlowDown and friends) halves the limit, at most
+    once per THROTTLE_COOLDOWN_S; every INCREASE_EVERY clean responses raise it
+    by one, up to `max_limit`.
+    """
+    def __init__(self, max_limit: int = DEFAULT_MAX_POOL, min_limit: int = 1):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = self.max_limit
+        self.in_flight = 0
+        self._clean = 0
+        self._last_cut = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self.in_flight >= self.limit:
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def slot(self):
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def on_throttle(self):
+        with self._cond:
+            now = time.monotonic()
+            if now - self._last_cut >= THROTTLE_COOLDOWN_S:
+                self._last_cut = now
+                self.limit = max(self.min_limit, self.limit // 2)
+            self._clean = 0
+
+    def on_success(self):
+        with self._cond:
+            self._clean += 1
+            if self._clean >= INCREASE_EVERY and self.limit < self.max_limit:
+                self._clean = 0
+                self.limit += 1
+                self._cond.notify()
+
+STATS = S3Stats()
+LIMITER = ConcurrencyLimiter(DEFAULT_MAX_POOL)
+
+def stats() -> Dict[str, Any]:
+    """Counters plus the limiter's current state."""
+    return {**STATS.snapshot(), "limit": LIMITER.limit, "in_flight": LIMITER.in_flight}
+
+# HELPERS
+def _length(headers: Any) -> int:
+    try:
+        return int((headers or {}).get("content-length") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+def _is_throttle(status: int, code: Optional[str]) -> bool:
+    return status == 503 or status == 429 or (code or "") in THROTTLE_CODES
+
+# BOTO3 CLIENTS
+def _instrument(client):
+    """
+    Route every HTTP attempt of `client` through LIMITER and STATS.
+
+    Wrapping the send of `client._endpoint.http_session` is botocore-internal and
+    relies on the boto3 pin in requirements.txt (botocore 1.40.x). If that attribute
+    is gone, attempts are only counted through events and LIMITER caps nothing.
+    """
+    events = client.meta.events
+    http = getattr(getattr(client, "_endpoint", None), "http_session", None)
+    http_send = getattr(http, "send", None)
+
+    def send(request):
+        # one slot per attempt, held only around the wire send itself
+        body = getattr(request, "body", None)
+        STATS.add(requests=1, bytes_out=len(body) if isinstance(body, (bytes, bytearray)) else 0)
+        with LIMITER.slot():
+            resp = http_send(request)
+        STATS.add(bytes_in=_length(getattr(resp, "headers", None)))
+        if getattr(resp, "status_code", 200) < 400:
+            LIMITER.on_success()
+        return resp
+
+    def before_send(request=None, **kw):
+        body = getattr(request, "body", None)
+        STATS.add(requests=1, bytes_out=len(body) if isinstance(body, (bytes, bytearray)) else 0)
+        return None   # a non-None result would short-circuit the send
+
+    def before_call(**kw):
+        STATS.add(calls=1)
+
+    def needs_retry(response=None, **kw):
+        if response is not None:
+            http_response, parsed = response
+            if not callable(http_send):
+                STATS.add(bytes_in=_length(getattr(http_response, "headers", None)))
+            code = ((parsed or {}).get("Error") or {}).get("Code")
+            if _is_throttle(getattr(http_response, "status_code", 0), code):
+                STATS.add(throttles=1)
+                LIMITER.on_throttle()
+        return None   # the retry decision stays with botocore
+
+    def after_call_error(**kw):
+        STATS.add(errors=1)
+
+    if callable(http_send):
+        http.send = send
+    else:
+        events.register("before-send.s3", before_send)
+    events.register("before-call.s3", before_call)
+    events.register("needs-retry.s3", needs_retry)
+    events.register("after-call-error.s3", after_call_error)
+    return client
+
+_clients: Dict[Tuple[Optional[str], bool], Any] = {}
+_clients_lock = threading.Lock()
+
+def get_client(profile: Optional[str] = None, unsigned: bool = False):
+    """
+    The shared boto3 S3 client for (profile, unsigned).
+
+    Connection pool of DEFAULT_MAX_POOL, adaptive retry mode (client-side rate
+    limiting with backoff on throttling) and the process-wide LIMITER / STATS.
+    """
+    key = (profile, unsigned)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            import boto3
+            from botocore import UNSIGNED
+            from botocore.config import Config
+
+            config = Config(
+                max_pool_connections=DEFAULT_MAX_POOL,
+                retries={"mode": "adaptive", "max_attempts": DEFAULT_MAX_ATTEMPTS},
+                **({"signature_version": UNSIGNED} if unsigned else {}),
+            )
+            session = boto3.session.Session(profile_name=profile) if profile else boto3.session.Session()
+            client = _clients[key] = _instrument(session.client("s3", endpoint_url=ENDPOINT_URL, config=config))
+        return client
+
+# HTTP SESSION
+class _LimitedAdapter(HTTPAdapter):
+    """HTTPAdapter taking one LIMITER slot per hop (redirects re-enter the session, not the slot)."""
+    def send(self, request, **kw):
+        STATS.add(calls=1)
+        with LIMITER.slot():
+            try:
+                resp = super().send(request, **kw)
+            except requests.RequestException:
+                STATS.add(requests=1, errors=1)
+                raise
+        history = getattr(getattr(resp.raw, "retries", None), "history", ()) or ()
+        throttled = sum(1 for h in history if _is_throttle(h.status or 0, None))
+        STATS.add(requests=1 + len(history), throttles=throttled, bytes_in=_length(resp.headers))
+        if throttled or _is_throttle(resp.status_code, None):
+            LIMITER.on_throttle()
+        else:
+            LIMITER.on_success()
+        return resp
+
+class S3HttpSession(requests.Session):
+    """requests.Session for public S3 URLs, sharing LIMITER and STATS with the boto3 clients."""
+    def __init__(self, max_pool: int = DEFAULT_MAX_POOL, max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        super().__init__()
+        retry = Retry(
+            total=max_attempts - 1, backoff_factor=0.25, status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset({"GET", "HEAD"}), respect_retry_after_header=True, raise_on_status=False,
+        )
+        adapter = _LimitedAdapter(pool_connections=max_pool, pool_maxsize=max_pool, max_retries=retry)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+
+_session: Optional[S3HttpSession] = None
+
+def get_session() -> S3HttpSession:
+    """The shared pooled HTTP session for S3 object URLs."""
+    global _session
+    with _clients_lock:
+        if _session is None:
+            _session = S3HttpSession()
+        return _session
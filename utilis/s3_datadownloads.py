@@ -1,72 +1,245 @@
 from __future__ import annotations
+import bisect
+import os
+import threading
+import time
 import urllib.parse
-from typing import Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 
 import requests
-import boto3
-from botocore import UNSIGNED
-from botocore.config import Config
-from botocore.exceptions import NoCredentialsError, ClientError
+import streamlit as st
+
+from utilis.s3_client import get_client, get_session
 
 BUCKET = "sdmlab"
 
+HEAD_TIMEOUT_S = 5.0
+RESOLVER_WORKERS = 8
+POSITIVE_TTL_S = 86400      # a found metadata key rarely moves
+NEGATIVE_TTL_S = 600        # "nothing there" is retried after 10 minutes
+MEMO_SIZE = 4096
+
 # helpers for direct S3 file links
 def s3_http_url(bucket: str, key: str) -> str:
     """Build a public-style S3 HTTPS URL (works for public buckets)."""
     return f"https://{bucket}.s3.amazonaws.com/{urllib.parse.quote(key, safe='/')}"
 
-def _head_ok(url: str, timeout: float = 5.0) -> bool:
-    """Lightweight existence check using HTTP HEAD (no creds needed)."""
-    try:
-        r = requests.head(url, allow_redirects=True, timeout=timeout)
-        return r.status_code == 200
-    except requests.RequestException:
-        return False
+# JSON RESOLVER
+class JsonResolver:
+    """
+    Finds the metadata .json of a FIM folder with shared connections and memoized answers.
+
+    All candidates (adjacent <tif>.json, a public listing, common names) are
+    checked concurrently and the first hit in priority order wins, so a lookup
+    costs one round trip instead of up to six. Answers, including "none", are
+    kept for POSITIVE_TTL_S / NEGATIVE_TTL_S.
+    """
+    def __init__(self, workers: int = RESOLVER_WORKERS, timeout: float = HEAD_TIMEOUT_S, maxsize: int = MEMO_SIZE):
+        self.timeout = timeout
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._session = get_session()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="json-resolve")
+        self._memo: "OrderedDict[tuple, Tuple[Optional[str], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _s3(self):
+        # the shared unsigned client; boto3 loads only on this path
+        return get_client(unsigned=True)
+
+    def _head(self, bucket: str, key: str) -> Optional[str]:
+        try:
+            r = self._session.head(s3_http_url(bucket, key), allow_redirects=True, timeout=self.timeout)
+            return key if r.status_code == 200 else None
+        except requests.RequestException:
+            return None
+
+    def _list_json(self, bucket: str, prefix: str, first_only: bool = False) -> Optional[List[str]]:
+        """Sorted .json keys under `prefix`; None when listing is not allowed (or unreachable)."""
+        from botocore.exceptions import BotoCoreError, ClientError
+
+        keys: List[str] = []
+        try:
+            paginator = self._s3().get_paginator("list_objects_v2")
+            for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+                for obj in page.get("Contents", []) or []:
+                    key = obj["Key"]
+                    if key.lower().endswith(".json") and not key.endswith("/"):
+                        keys.append(key)
+                        if first_only:
+                            return keys
+        except (BotoCoreError, ClientError):
+            return None
+        keys.sort()
+        return keys
+
+    def _list(self, bucket: str, folder: str) -> Optional[str]:
+        keys = self._list_json(bucket, f"{folder}/", first_only=True)
+        return keys[0] if keys else None
+
+    @staticmethod
+    def _pick(keys: List[str], folder: str, tif_filename: Optional[str]) -> Optional[str]:
+        """What the probes would find, from a sorted listing that covers `folder`."""
+        if tif_filename:
+            adjacent = f"{folder}/{tif_filename.rsplit('.', 1)[0]}.json"
+            i = bisect.bisect_left(keys, adjacent)
+            if i < len(keys) and keys[i] == adjacent:
+                return adjacent
+        i = bisect.bisect_left(keys, f"{folder}/")
+        return keys[i] if i < len(keys) and keys[i].startswith(f"{folder}/") else None
+
+    def _probes(
+        self, bucket: str, folder: str, tif_filename: Optional[str], listing: bool = True,
+    ) -> List[Callable[[], Optional[str]]]:
+        """Lookups in priority order."""
+        probes: List[Callable[[], Optional[str]]] = []
+        if tif_filename:
+            base = tif_filename.rsplit(".", 1)[0]
+            probes.append(lambda k=f"{folder}/{base}.json": self._head(bucket, k))
+        if listing:
+            probes.append(lambda: self._list(bucket, folder))
+        for name in ("metadata", "meta", "info", folder.split("/")[-1] or "metadata"):
+            probes.append(lambda k=f"{folder}/{name}.json": self._head(bucket, k))
+        return probes
+
+    @staticmethod
+    def _first(futures) -> Optional[str]:
+        """First non-None result in submission (priority) order."""
+        found = None
+        for fut in futures:
+            found = fut.result()
+            if found is not None:
+                break
+        for fut in futures:
+            fut.cancel()
+        return found
+
+    def _recall(self, memo_key: tuple) -> Tuple[bool, Optional[str]]:
+        with self._lock:
+            hit = self._memo.get(memo_key)
+            if hit is not None and hit[1] > time.monotonic():
+                self._memo.move_to_end(memo_key)
+                self.hits += 1
+                return True, hit[0]
+            self.misses += 1
+            return False, None
+
+    def _remember(self, memo_key: tuple, found: Optional[str]):
+        ttl = POSITIVE_TTL_S if found is not None else NEGATIVE_TTL_S
+        with self._lock:
+            self._memo[memo_key] = (found, time.monotonic() + ttl)
+            self._memo.move_to_end(memo_key)
+            while len(self._memo) > self.maxsize:
+                self._memo.popitem(last=False)
+
+    def resolve(self, bucket: str, folder: str, tif_filename: Optional[str]) -> Optional[str]:
+        folder = (folder or "").rstrip("/")
+        memo_key = (bucket, folder, tif_filename or "")
+        known, found = self._recall(memo_key)
+        if known:
+            return found
+        found = self._first([self._pool.submit(p) for p in self._probes(bucket, folder, tif_filename)])
+        self._remember(memo_key, found)
+        return found
+
+    def resolve_many(
+        self,
+        bucket: str,
+        items: Iterable[Tuple[str, Optional[str]]],
+        root_prefix: Optional[str] = None,
+    ) -> Dict[Tuple[str, str], Optional[str]]:
+        """
+        Resolve many (folder, tif_filename) pairs with one paginated listing per root.
+
+        `root_prefix` (default: per top-level prefix, the folders' common
+        parent) is listed once and each folder is answered from that listing
+        in memory, with the same priority as `resolve`; a folder with no .json
+        in a successful listing is a definite miss. The bucket root is never
+        listed. When the listing is refused, for folders outside `root_prefix`
+        and for top-level folders, the HEAD probes run instead, concurrently.
+
+        Returns {(folder without trailing "/", tif_filename or ""): key or None}.
+        """
+        out: Dict[Tuple[str, str], Optional[str]] = {}
+        todo: Dict[Tuple[str, str], None] = {}   # ordered set
+        for folder, tif in items:
+            item = ((folder or "").rstrip("/"), tif or "")
+            if item in out or item in todo:
+                continue
+            known, found = self._recall((bucket, *item))
+            if known:
+                out[item] = found
+            else:
+                todo[item] = None
+        if not todo:
+            return out
+
+        # listing root -> its folders; "" collects folders answered by probes
+        groups: Dict[str, List[Tuple[str, str]]] = {}
+        if root_prefix is not None:
+            root = root_prefix.rstrip("/") + "/" if root_prefix.strip("/") else ""
+            for item in todo:
+                groups.setdefault(root if root and f"{item[0]}/".startswith(root) else "", []).append(item)
+        else:
+            by_top: Dict[str, List[Tuple[str, str]]] = {}
+            for item in todo:
+                top, sep, _ = item[0].partition("/")
+                by_top.setdefault(f"{top}/" if sep else "", []).append(item)
+            for top, group in by_top.items():
+                if top:
+                    common = os.path.commonprefix([f"{f}/" for f, _ in group])
+                    top = common[:common.rfind("/") + 1]
+                groups.setdefault(top, []).extend(group)
+
+        fallback: List[Tuple[Tuple[str, str], list]] = []
+        for root, group in groups.items():
+            keys = self._list_json(bucket, root) if root else None
+            for item in group:
+                folder, tif = item
+                if keys is not None:
+                    out[item] = self._pick(keys, folder, tif)
+                    self._remember((bucket, *item), out[item])
+                else:
+                    # per-folder listing only where no root listing was tried (a refused one would repeat)
+                    probes = self._probes(bucket, folder, tif, listing=not root)
+                    fallback.append((item, [self._pool.submit(p) for p in probes]))
+        for item, futures in fallback:
+            out[item] = self._first(futures)
+            self._remember((bucket, *item), out[item])
+        return out
+
+    def clear(self):
+        with self._lock:
+            self._memo.clear()
+
+@st.cache_resource(show_spinner=False)
+def get_json_resolver() -> JsonResolver:
+    return JsonResolver()
 
 def find_json_in_folder(bucket: str, folder: str, tif_filename: str | None) -> str | None:
     """
     Find a metadata .json in the same folder without requiring AWS credentials.
 
-    Strategy:
-      1) Try <tif_basename>.json next to the .tif (HTTP HEAD).
-      2) Try to list via anonymous (UNSIGNED) boto3 if the bucket allows public ListBucket.
-      3) If listing isn't allowed, probe common names via HTTP HEAD.
+    Candidates, in priority order:
+      1) <tif_basename>.json next to the .tif (HTTP HEAD).
+      2) The first .json from an anonymous (UNSIGNED) listing, if the bucket allows public ListBucket.
+      3) Common names (metadata/meta/info/<folder>.json) via HTTP HEAD.
+    They are checked concurrently through the shared JsonResolver and the answer is memoized.
 
     Returns the JSON key (e.g., "FIM_Database/.../foo.json") or None.
     """
-    folder = (folder or "").rstrip("/")
-
-    # Prefer <basename>.json adjacent to the .tif
-    if tif_filename:
-        base = tif_filename.rsplit(".", 1)[0]
-        candidate = f"{folder}/{base}.json"
-        if _head_ok(s3_http_url(bucket, candidate)):
-            return candidate
-
-    # Attempt public ListObjectsV2 via UNSIGNED client (no creds)
-    try:
-        s3 = boto3.client("s3", config=Config(signature_version=UNSIGNED))
-        paginator = s3.get_paginator("list_objects_v2")
-        for page in paginator.paginate(Bucket=bucket, Prefix=f"{folder}/"):
-            for obj in page.get("Contents", []) or []:
-                key = obj["Key"]
-                if key.endswith("/"):
-                    continue
-                if key.lower().endswith(".json"):
-                    return key
-    except (NoCredentialsError, ClientError):
-        # If listing is forbidden for anonymous users, fall through to HEAD probes.
-        pass
-
-    # Probe a few common JSON filenames via HTTP HEAD
-    candidates = [
-        f"{folder}/metadata.json",
-        f"{folder}/meta.json",
-        f"{folder}/info.json",
-        f"{folder}/{folder.split('/')[-1] or 'metadata'}.json",
-    ]
-    for key in candidates:
-        if _head_ok(s3_http_url(bucket, key)):
-            return key
-
-    return None
+    return get_json_resolver().resolve(bucket, folder, tif_filename)
+
+def find_json_in_folders(
+    bucket: str,
+    items: Iterable[Tuple[str, Optional[str]]],
+    root_prefix: Optional[str] = None,
+) -> Dict[Tuple[str, str], Optional[str]]:
+    """
+    Batch find_json_in_folder for (folder, tif_filename) pairs sharing a root prefix:
+    one paginated listing instead of one lookup per folder (see JsonResolver.resolve_many).
+    """
+    return get_json_resolver().resolve_many(bucket, items, root_prefix)
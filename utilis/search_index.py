@@ -0,0 +1,171 @@
+from __future__ import annotations
+import bisect
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from utilis.record_store import column
+
+# facet name -> record fields, first non-empty wins
+FACET_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "state": ("state",),
+    "basin": ("river_basin", "basin"),
+    "source": ("source",),
+}
+HUC_FIELDS = ("huc2", "huc4", "huc6", "huc8", "huc10", "huc12")
+TEXT_FIELDS = ("description", "file_name")
+MIN_PREFIX = 2
+QUERY_CACHE_SIZE = 128
+
+# (text, ((facet, (values...)), ...), huc_prefix) — hashable, see SearchIndex.query_key
+SearchQuery = Tuple[str, Tuple[Tuple[str, Tuple[str, ...]], ...], str]
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# HELPERS
+def tokenize(text: Any) -> List[str]:
+    if text is None:
+        return []
+    return _TOKEN_RE.findall(str(text).lower())
+
+class _Postings:
+    """
+    Sorted vocabulary with CSR postings laid out in vocabulary order, so all rows
+    for a prefix are one contiguous slice of `rows`.
+    """
+    def __init__(self, terms: List[str], term_ids: Sequence[int], rows: Sequence[int]):
+        by_term = sorted(range(len(terms)), key=terms.__getitem__)
+        self.vocab: List[str] = [terms[i] for i in by_term]
+        rank = np.empty(len(terms), dtype=np.int64)
+        rank[by_term] = np.arange(len(terms))
+
+        r = rank[np.asarray(term_ids, dtype=np.int64)]
+        rows = np.asarray(rows, dtype=np.int32)
+        order = np.lexsort((rows, r))
+        self.rows = rows[order]
+        self.offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(r, minlength=len(terms)), out=self.offsets[1:])
+
+    @classmethod
+    def from_rows(cls, terms_per_row: Iterable[Iterable[str]]) -> "_Postings":
+        ids: Dict[str, int] = {}
+        term_ids: List[int] = []
+        rows: List[int] = []
+        for i, terms in enumerate(terms_per_row):
+            for t in terms:
+                term_ids.append(ids.setdefault(t, len(ids)))
+                rows.append(i)
+        return cls(list(ids), term_ids, rows)
+
+    def span(self, term: str, prefix: bool) -> Tuple[int, int]:
+        lo = bisect.bisect_left(self.vocab, term)
+        if prefix:
+            hi = bisect.bisect_left(self.vocab, term + "\uffff", lo)
+        else:
+            hi = lo + 1 if lo < len(self.vocab) and self.vocab[lo] == term else lo
+        return int(self.offsets[lo]), int(self.offsets[hi])
+
+    def mark(self, out: np.ndarray, term: str, prefix: bool) -> np.ndarray:
+        a, b = self.span(term, prefix)
+        out[self.rows[a:b]] = True
+        return out
+
+# SEARCH INDEX
+class SearchIndex:
+    """
+    Inverted index over facet fields, HUC codes and tokenized description/file_name.
+
+      - facets: exact postings per value, plus an int32 code column for counts
+      - HUC: the deepest HUC code per record, so a prefix matches every record under it
+      - text: lowercased alphanumeric tokens; query tokens are ANDed, each one
+        prefix-matched once it has MIN_PREFIX characters
+
+    Query results are boolean row masks, cached per query.
+    """
+    def __init__(self, records: Sequence[Mapping[str, Any]]):
+        n = self.n = len(records)
+
+        self.values: Dict[str, List[str]] = {}
+        self.codes: Dict[str, np.ndarray] = {}
+        self.facets: Dict[str, _Postings] = {}
+        for facet, fields in FACET_FIELDS.items():
+            merged: List[Any] = [None] * n
+            for f in reversed(fields):
+                merged = [v if v not in (None, "") else m for v, m in zip(column(records, f), merged)]
+            vals = sorted({str(v) for v in merged if v not in (None, "")})
+            code_of = {v: i for i, v in enumerate(vals)}
+            self.values[facet] = vals
+            self.codes[facet] = codes = np.fromiter(
+                (code_of[str(v)] if v not in (None, "") else -1 for v in merged), dtype=np.int32, count=n
+            )
+            present = np.flatnonzero(codes >= 0)
+            self.facets[facet] = _Postings(vals, codes[present], present)
+
+        # A record's HUCs are prefixes of its deepest one, so indexing the deepest code
+        # (plus any inconsistent shallower code) makes a HUC prefix one contiguous slice.
+        huc_cols = [column(records, f) for f in reversed(HUC_FIELDS)]
+        def huc_terms(codes):
+            deepest = next((str(c) for c in codes if c), None)
+            return {deepest, *(str(c) for c in codes if c and not deepest.startswith(str(c)))} if deepest else ()
+        self.huc = _Postings.from_rows(huc_terms(codes) for codes in zip(*huc_cols))
+
+        text_cols = [column(records, f) for f in TEXT_FIELDS]
+        self.text = _Postings.from_rows(
+            {t for v in vals if v for t in tokenize(v)} for vals in zip(*text_cols)
+        )
+
+        self._cache: "OrderedDict[SearchQuery, Optional[np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def query_key(
+        text: str = "",
+        facets: Optional[Mapping[str, Iterable[str]]] = None,
+        huc_prefix: str = "",
+    ) -> SearchQuery:
+        """Normalized, hashable query (usable as a cache key)."""
+        fac = tuple(sorted(
+            (k, tuple(sorted(set(map(str, v))))) for k, v in (facets or {}).items() if v
+        ))
+        return " ".join(tokenize(text)), fac, "".join(ch for ch in str(huc_prefix or "") if ch.isdigit())
+
+    def is_empty(self, q: SearchQuery) -> bool:
+        return not (q[0] or q[1] or q[2])
+
+    def mask(self, q: SearchQuery) -> Optional[np.ndarray]:
+        """Boolean row mask for a query_key(); None when the query has no constraint."""
+        if self.is_empty(q):
+            return None
+        with self._lock:
+            if q in self._cache:
+                self._cache.move_to_end(q)
+                return self._cache[q]
+
+        text, facets, huc_prefix = q
+        out = np.ones(self.n, dtype=bool)
+        for tok in text.split():
+            out &= self.text.mark(np.zeros(self.n, dtype=bool), tok, prefix=len(tok) >= MIN_PREFIX)
+        for facet, vals in facets:
+            hit = np.zeros(self.n, dtype=bool)
+            if facet in self.facets:
+                for v in vals:
+                    self.facets[facet].mark(hit, v, prefix=False)
+            out &= hit
+        if huc_prefix:
+            out &= self.huc.mark(np.zeros(self.n, dtype=bool), huc_prefix, prefix=True)
+
+        with self._lock:
+            self._cache[q] = out
+            while len(self._cache) > QUERY_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return out
+
+    def facet_counts(self, facet: str, rows: Optional[np.ndarray] = None) -> Dict[str, int]:
+        """{value: count} for a facet over `rows` (all records when None), most frequent first."""
+        codes = self.codes[facet] if rows is None else self.codes[facet][rows]
+        counts = np.bincount(codes[codes >= 0], minlength=len(self.values[facet]))
+        order = np.lexsort((np.arange(counts.size), -counts))
+        return {self.values[facet][i]: int(counts[i]) for i in order if counts[i]}
@@ -0,0 +1,163 @@
+from __future__ import annotations
+import math
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+# (south, west, north, east) in degrees
+BBox = Tuple[float, float, float, float]
+
+TILE_SIZE = 256
+
+# HELPERS
+def _to_pixel(lat: float, lon: float, zoom: float) -> Tuple[float, float]:
+    scale = TILE_SIZE * (2 ** float(zoom))
+    s = math.sin(math.radians(max(min(float(lat), 85.0), -85.0)))
+    return (float(lon) + 180.0) / 360.0 * scale, (0.5 - math.log((1 + s) / (1 - s)) / (4 * math.pi)) * scale
+
+def _to_lonlat(x: float, y: float, zoom: float) -> Tuple[float, float]:
+    scale = TILE_SIZE * (2 ** float(zoom))
+    n = math.pi - 2.0 * math.pi * y / scale
+    return x / scale * 360.0 - 180.0, math.degrees(math.atan(math.sinh(n)))
+
+def _pixel_bbox(cx: float, cy: float, w: float, h: float, zoom: float) -> BBox:
+    west, north = _to_lonlat(cx - w / 2, cy - h / 2, zoom)
+    east, south = _to_lonlat(cx + w / 2, cy + h / 2, zoom)
+    return max(south, -85.0), max(west, -180.0), min(north, 85.0), min(east, 180.0)
+
+def bbox_from_view(center: Tuple[float, float], zoom: float, width_px: int = 1280, height_px: int = 720) -> BBox:
+    """Approximate viewport bounds for a Leaflet view (Web Mercator), used before the map reports its bounds."""
+    cx, cy = _to_pixel(center[0], center[1], zoom)
+    return _pixel_bbox(cx, cy, width_px, height_px, zoom)
+
+def viewport_px(bbox: BBox, zoom: float) -> Tuple[int, int]:
+    """Viewport size in pixels at `zoom`, rounded up to whole tiles so it is stable across small pans."""
+    south, west, north, east = bbox
+    x0, y0 = _to_pixel(north, west, zoom)
+    x1, y1 = _to_pixel(south, east, zoom)
+    return (
+        max(1, math.ceil((x1 - x0) / TILE_SIZE)) * TILE_SIZE,
+        max(1, math.ceil((y1 - y0) / TILE_SIZE)) * TILE_SIZE,
+    )
+
+# View cells: a half-viewport grid at integer zoom. Any view whose center falls in a
+# cell is covered by that cell's area (cell center +/- 0.75 viewport), so marker
+# layers computed for the area can be reused while the user pans inside the cell.
+ViewCell = Tuple[int, int, int, int, int]   # zoom, ix, iy, width_px, height_px
+
+def view_cell(center: Tuple[float, float], zoom: float, width_px: int, height_px: int) -> ViewCell:
+    z = int(math.floor(zoom))
+    cx, cy = _to_pixel(center[0], center[1], z)
+    return z, int(cx // (width_px / 2)), int(cy // (height_px / 2)), int(width_px), int(height_px)
+
+def view_cell_bbox(cell: ViewCell) -> BBox:
+    z, ix, iy, w, h = cell
+    return _pixel_bbox((ix + 0.5) * w / 2, (iy + 0.5) * h / 2, 1.5 * w, 1.5 * h, z)
+
+def bbox_from_leaflet(bounds: Optional[Dict[str, Any]]) -> Optional[BBox]:
+    """Parse st_folium's {"_southWest": {...}, "_northEast": {...}} bounds; None if incomplete."""
+    if not bounds:
+        return None
+    try:
+        sw, ne = bounds["_southWest"], bounds["_northEast"]
+        south, west, north, east = float(sw["lat"]), float(sw["lng"]), float(ne["lat"]), float(ne["lng"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if east - west >= 360.0:
+        west, east = -180.0, 180.0
+    return south, max(west, -180.0), north, min(east, 180.0)
+
+def bbox_center(b: BBox) -> Tuple[float, float]:
+    return (b[0] + b[2]) / 2.0, (b[1] + b[3]) / 2.0
+
+def fit_view(b: BBox, width_px: int = 1280, height_px: int = 720, max_zoom: int = 14, padding: float = 0.85) -> Tuple[Tuple[float, float], int]:
+    """(center, zoom) of the closest integer-zoom view that shows bbox `b` (Leaflet fitBounds)."""
+    south, west, north, east = b
+    x0, y0 = _to_pixel(north, west, 0)
+    x1, y1 = _to_pixel(south, east, 0)
+    w, h = max(x1 - x0, 1e-9), max(y1 - y0, 1e-9)
+    zoom = math.floor(math.log2(min(width_px * padding / w, height_px * padding / h)))
+    cx, cy = (x0 + x1) / 2.0, (y0 + y1) / 2.0
+    lon, lat = _to_lonlat(cx, cy, 0)
+    return (lat, lon), int(max(0, min(zoom, max_zoom)))
+
+# GRID INDEX
+class GridIndex:
+    """
+    Uniform lat/lon grid over point centroids, stored CSR-style:
+    row positions sorted by cell id, so a bbox query is one searchsorted
+    per grid row plus a final exact bounds check.
+    """
+    def __init__(self, lat: np.ndarray, lon: np.ndarray, cell_deg: float = 0.5):
+        self.lat = lat
+        self.lon = lon
+        self.cell_deg = float(cell_deg)
+        self.ncols = int(math.ceil(360.0 / self.cell_deg)) + 1
+        self.nrows = int(math.ceil(180.0 / self.cell_deg)) + 1
+
+        ix, iy = self._cell(lat, lon)
+        keys = iy.astype(np.int64) * self.ncols + ix
+        self.order = np.argsort(keys, kind="stable")
+        self.keys = keys[self.order]
+
+    def _cell(self, lat, lon):
+        ix = np.clip(np.floor((np.asarray(lon) + 180.0) / self.cell_deg), 0, self.ncols - 1).astype(np.int64)
+        iy = np.clip(np.floor((np.asarray(lat) + 90.0) / self.cell_deg), 0, self.nrows - 1).astype(np.int64)
+        return ix, iy
+
+    def query(self, bbox: BBox) -> np.ndarray:
+        """Row positions whose centroid lies inside bbox, in ascending order."""
+        south, west, north, east = bbox
+        (ix0, ix1), (iy0, iy1) = self._cell([south, north], [west, east])
+        parts = []
+        for iy in range(int(iy0), int(iy1) + 1):
+            lo = np.searchsorted(self.keys, iy * self.ncols + ix0, side="left")
+            hi = np.searchsorted(self.keys, iy * self.ncols + ix1, side="right")
+            if hi > lo:
+                parts.append(self.order[lo:hi])
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        rows = np.concatenate(parts)
+        lat, lon = self.lat[rows], self.lon[rows]
+        inside = (lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)
+        return np.sort(rows[inside])
+
+# PUBLIC: viewport selection
+def select_in_view(
+    grid: GridIndex,
+    selected: np.ndarray,
+    priority: np.ndarray,
+    bbox: BBox,
+    cap: int,
+    bins: int = 8,
+) -> Tuple[np.ndarray, int]:
+    """
+    Pick at most `cap` rows inside bbox from the boolean `selected` mask.
+
+    Rows are spread over a bins x bins screen grid: every occupied screen cell gets
+    its best row (lowest `priority`) before any cell gets a second one, so no area
+    of the view is starved and zooming in always reveals the remaining sites.
+
+    Returns (rows, n_in_view).
+    """
+    rows = grid.query(bbox)
+    rows = rows[selected[rows]]
+    n_in_view = int(rows.size)
+    if n_in_view <= cap:
+        return rows[np.argsort(priority[rows], kind="stable")], n_in_view
+
+    south, west, north, east = bbox
+    fx = np.clip(((grid.lon[rows] - west) / max(east - west, 1e-9) * bins).astype(np.int64), 0, bins - 1)
+    fy = np.clip(((grid.lat[rows] - south) / max(north - south, 1e-9) * bins).astype(np.int64), 0, bins - 1)
+    cell = fy * bins + fx
+
+    # rank of each row inside its screen cell by priority
+    by_cell = np.lexsort((priority[rows], cell))
+    cell_sorted = cell[by_cell]
+    starts = np.flatnonzero(np.r_[True, cell_sorted[1:] != cell_sorted[:-1]])
+    run_start = np.repeat(starts, np.diff(np.r_[starts, cell_sorted.size]))
+    rank = np.empty_like(by_cell)
+    rank[by_cell] = np.arange(by_cell.size) - run_start
+
+    pick = np.lexsort((priority[rows], rank))[:cap]
+    return rows[pick], n_in_view
@@ -0,0 +1,12 @@
+from __future__ import annotations
+
+# Tier palette shared by the map page and the standalone tile servers; kept
+# free of imports so fim_viz scripts can use it without folium or streamlit
+TIER_COLORS = {
+    "Tier_1": "#1b9e77",
+    "Tier_2": "#d95f02",
+    "Tier_3": "#7570b3",
+    "Tier_4": "#e7298a",
+    "Tier_5": "#66a61e",
+}
+DEFAULT_TIER_COLOR = "#2c7fb8"